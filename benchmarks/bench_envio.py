@@ -0,0 +1,158 @@
+"""
+Arnés de carga de extremo a extremo: ejecuta OfertasBot.check_ofertas contra la
+Bot API falsa (benchmarks.fake_telegram) con fuentes sintéticas que devuelven
+ofertas nuevas en cada ronda, y reporta el rendimiento de envío y los
+percentiles de latencia (de la publicación en la outbox a la entrega).
+
+Uso:
+    python -m benchmarks.bench_envio [--fuentes 3] [--ofertas 200] [--rondas 3] [--canales 1]
+        [--latencia 0.05] [--prob-429 0.02] [--prob-fallo-red 0.01] [--limites-reales]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import List
+
+from telegram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramServer, argumentos_servidor
+from bot.ofertas_bot import OfertasBot
+from bot.pipeline import DealPipeline
+from config import Config
+from utils.deal import Deal
+
+TOKEN = '123456:BENCH'
+MARCAS = ('Sony', 'Samsung', 'Apple', 'Anker', 'Lenovo', 'Dell', 'Ninja', 'Levis', 'Nike', 'Bose', 'LEGO',
+          'Dyson', 'Logitech', 'Razer', 'Philips', 'Keurig', 'Instant', 'Ecovacs', 'Garmin', 'Kindle')
+PRODUCTOS = ('headphones', 'laptop', 'monitor', 'charger', 'blender', 'jeans', 'sneakers', 'speaker', 'vacuum',
+             'keyboard', 'mouse', 'router', 'tablet', 'watch', 'camera', 'drone', 'projector', 'backpack')
+ADJETIVOS = ('wireless', 'portable', 'refurbished', 'compact', 'gaming', 'ultra', 'smart', 'premium', 'mini', 'pro')
+
+
+class SyntheticSource:
+    """Fuente falsa: cada llamada devuelve `num_ofertas` ofertas nuevas con títulos distintos."""
+
+    def __init__(self, name: str, num_ofertas: int, prob_imagen: float = 0.7, semilla: int = 0):
+        self.name = name
+        self.tag = f'#{name}'
+        self.num_ofertas = num_ofertas
+        self.prob_imagen = prob_imagen
+        self.random = random.Random(semilla)
+        self.ronda = 0
+
+    def _oferta(self, i: int) -> Deal:
+        precio_original = self.random.randint(20, 900)
+        precio = round(precio_original * self.random.uniform(0.4, 0.95), 2)
+        titulo = (f"{self.random.choice(MARCAS)} {self.random.choice(ADJETIVOS)} {self.random.choice(PRODUCTOS)} "
+                  f"{self.name[:2].upper()}{self.ronda}-{i}")
+        return Deal(
+            titulo=titulo,
+            link=f"https://{self.name}.example/deal/{self.ronda}/{i}",
+            precio=f"${precio:.2f}",
+            precio_original=f"${precio_original}.00",
+            imagen=f"https://{self.name}.example/img/{self.ronda}/{i}.jpg"
+            if self.random.random() < self.prob_imagen else 'No disponible',
+            tag=self.tag,
+            fuente=self.name,
+        )
+
+    async def obtener_ofertas(self) -> List[Deal]:
+        self.ronda += 1
+        return [self._oferta(i) for i in range(self.num_ofertas)]
+
+
+def configurar(args: argparse.Namespace, base_url: str, directorio: str) -> None:
+    """Ajusta Config (atributos de clase) antes de crear el bot."""
+    canales = [f'@bench_{i}' for i in range(args.canales)]
+    Config.TOKEN = TOKEN
+    Config.CHANNEL_ID = canales[0]
+    Config.CHANNEL_ROUTES = {'*': canales}
+    Config.USER_ID = '1'
+    Config.TELEGRAM_BASE_URL = base_url
+    Config.DATABASE = str(Path(directorio) / 'bench.db')
+    Config.SCRAPERS = []
+    Config.HTTP_CACHE_FILE = None
+    Config.PARSE_WORKERS = 0
+    Config.MAX_OFERTAS_POR_EJECUCION = args.ofertas * args.fuentes
+    Config.ALBUM_BATCHING = args.albumes
+    Config.SEND_OFFER_RETRY_SLEEP_SECONDS = args.espera_reintento
+    Config.OUTBOX_BACKOFF_BASE_SECONDS = args.espera_reintento
+    if not args.limites_reales:
+        # Sin los límites de Telegram se mide el techo del propio pipeline
+        Config.TELEGRAM_GLOBAL_MSG_POR_SEGUNDO = 1e6
+        Config.TELEGRAM_GRUPO_MSG_POR_MINUTO = 1e8
+        Config.TELEGRAM_RAFAGA_POR_CHAT = 1e6
+
+
+async def ejecutar(args: argparse.Namespace) -> None:
+    servidor = FakeTelegramServer(
+        latencia=args.latencia, variacion=args.variacion, prob_429=args.prob_429, retry_after=args.retry_after,
+        prob_fallo_red=args.prob_fallo_red, max_por_segundo=args.max_por_segundo, semilla=args.semilla,
+    )
+    async with servidor:
+        with tempfile.TemporaryDirectory() as directorio:
+            configurar(args, servidor.base_url, directorio)
+            bot = OfertasBot()
+            bot.scrapers = {
+                f'fuente{i}': {'instance': SyntheticSource(f'fuente{i}', args.ofertas, semilla=args.semilla + i),
+                               'enabled': True}
+                for i in range(args.fuentes)
+            }
+            bot.pipeline = DealPipeline(bot, tamano_cola=bot.config.PIPELINE_QUEUE_SIZE)
+            bot.pipeline.latencias = deque()  # todas las muestras, no solo las últimas 1000
+            bot.bot = Bot(TOKEN, base_url=servidor.base_url)
+            await bot.db_manager.init_db()
+            await bot.bot.initialize()
+            try:
+                inicio = time.perf_counter()
+                for ronda in range(1, args.rondas + 1):
+                    inicio_ronda = time.perf_counter()
+                    enviadas_antes = bot.pipeline.estadisticas['enviadas']
+                    await bot.check_ofertas()
+                    duracion = time.perf_counter() - inicio_ronda
+                    enviadas = bot.pipeline.estadisticas['enviadas'] - enviadas_antes
+                    print(f"Ronda {ronda}: {enviadas} ofertas en {duracion:.2f} s ({enviadas / duracion:.1f} ofertas/s)")
+                total = time.perf_counter() - inicio
+            finally:
+                await bot.pipeline.detener()
+                await bot.bot.shutdown()
+                await bot.db_manager.close()
+
+    estadisticas = bot.pipeline.estadisticas
+    print(f"\nTotal: {estadisticas['enviadas']} ofertas enviadas en {total:.2f} s "
+          f"({estadisticas['enviadas'] / total:.1f} ofertas/s, {len(servidor.mensajes) / total:.1f} mensajes/s)")
+    print(f"  publicadas {estadisticas['publicadas']}, fallidas {estadisticas['fallidas']}, "
+          f"reintentos {estadisticas['reintentos']}, álbumes {estadisticas['albumes']}")
+    if bot.pipeline.latencias:
+        percentiles = ', '.join(f"p{p} {bot.pipeline.percentil_latencia(p) * 1000:.0f} ms" for p in (50, 90, 99))
+        print(f"  latencia {percentiles}, máx {max(bot.pipeline.latencias) * 1000:.0f} ms")
+    print(f"  servidor: {dict(servidor.estadisticas)}")
+
+
+def main() -> None:
+    parser = argumentos_servidor(argparse.ArgumentParser(description=__doc__,
+                                                         formatter_class=argparse.RawDescriptionHelpFormatter))
+    parser.add_argument('--fuentes', type=int, default=3)
+    parser.add_argument('--ofertas', type=int, default=200, help='Ofertas nuevas por fuente y ronda')
+    parser.add_argument('--rondas', type=int, default=3)
+    parser.add_argument('--canales', type=int, default=1, help='Canales de destino de cada oferta')
+    parser.add_argument('--albumes', action='store_true', help='Agrupar ofertas con imagen en álbumes')
+    parser.add_argument('--limites-reales', action='store_true',
+                        help='Respetar los límites de Telegram de Config en lugar de desactivarlos')
+    parser.add_argument('--espera-reintento', type=float, default=0.5,
+                        help='Espera base entre reintentos de envío (segundos)')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(ejecutar(args))
+
+
+if __name__ == '__main__':
+    main()
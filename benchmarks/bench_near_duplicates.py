@@ -0,0 +1,138 @@
+"""
+Mide la detección de casi duplicados sobre pares de títulos etiquetados, con el
+estilo de cada fuente: similitud de Jaccard exacta, la estimada por MinHash y
+precisión/exhaustividad de NearDuplicateIndex para varios umbrales. Sirve para
+elegir NEAR_DUP_UMBRAL.
+
+Uso: python -m benchmarks.bench_near_duplicates [permutaciones] [bandas]
+"""
+import statistics
+import sys
+
+from utils.near_duplicates import NearDuplicateIndex, tokenizar_titulo
+
+# Misma oferta publicada por dos fuentes distintas
+PARES_DUPLICADOS = (
+    ("Sony WH-1000XM5 Wireless Noise Canceling Headphones",
+     "Sony WH-1000XM5 Wireless Noise Canceling Over-Ear Headphones for $279.99"),
+    ("Apple AirPods Pro 2nd Gen with USB-C MagSafe Case $189",
+     "Apple AirPods Pro (2nd Generation) w/ MagSafe USB-C Case"),
+    ("Samsung 65\" Class QLED 4K Q80C Smart TV",
+     "Samsung Q80C 65-Inch QLED 4K Smart TV for $999.99 + free shipping"),
+    ("Ninja 4-Qt Air Fryer AF101",
+     "Ninja AF101 4 Quart Air Fryer $69.99"),
+    ("LEGO Star Wars Millennium Falcon 75375",
+     "LEGO Star Wars Millennium Falcon Set 75375 for $67.99"),
+    ("Anker 737 Power Bank 24,000mAh 140W",
+     "Anker 737 Power Bank (PowerCore 24K) 24000mAh 140W Portable Charger"),
+    ("Instant Pot Duo 7-in-1 6-Quart Pressure Cooker",
+     "Instant Pot Duo 7-in-1 Electric Pressure Cooker 6 Qt $59"),
+    ("Dell Inspiron 15 Laptop with Intel Core i5 16GB RAM 512GB SSD",
+     "Dell Inspiron 15 Intel Core i5 Laptop w/ 16GB RAM, 512GB SSD for $449.99"),
+    ("Samsung 990 PRO 2TB PCIe 4.0 NVMe SSD",
+     "Samsung 990 Pro 2TB NVMe PCIe Gen 4 Internal SSD $159.99"),
+    ("Levi's Men's 501 Original Fit Jeans",
+     "Levi's Men's 501 Original Fit Jeans from $29.97"),
+    ("Keurig K-Mini Single Serve Coffee Maker",
+     "Keurig K-Mini Single-Serve K-Cup Pod Coffee Maker $49.99"),
+    ("Logitech MX Master 3S Wireless Performance Mouse",
+     "Logitech MX Master 3S Performance Wireless Mouse for $79.99"),
+    ("Apple iPad 10.9\" 64GB Wi-Fi 10th Gen",
+     "Apple iPad 10th Generation 10.9-Inch Wi-Fi 64GB Tablet $349"),
+    ("Dyson V8 Cordless Stick Vacuum",
+     "Dyson V8 Cordless Stick Vacuum Cleaner $299.99 shipped"),
+    ("Crucial 32GB DDR5 4800MHz Laptop Memory Kit",
+     "Crucial 32GB Kit (2x16GB) DDR5 4800MHz SODIMM Laptop Memory"),
+    ("Bose QuietComfort Ultra Earbuds",
+     "Bose QuietComfort Ultra Wireless Noise Cancelling Earbuds for $229"),
+    ("Amazon Fire TV Stick 4K Max streaming device",
+     "Fire TV Stick 4K Max Streaming Device w/ Alexa Voice Remote $34.99"),
+    ("Nintendo Switch OLED Model with White Joy-Con",
+     "Nintendo Switch OLED Model w/ White Joy-Con Console $309"),
+    ("Garmin Forerunner 265 GPS Running Smartwatch",
+     "Garmin Forerunner 265 Running Smartwatch with GPS $349.99"),
+    ("Philips Sonicare 4100 Rechargeable Electric Toothbrush",
+     "Philips Sonicare ProtectiveClean 4100 Rechargeable Electric Toothbrush $39.96"),
+)
+
+# Productos parecidos pero distintos (otra talla, capacidad, modelo o generación)
+PARES_DISTINTOS = (
+    ("Samsung 65\" Class QLED 4K Q80C Smart TV",
+     "Samsung 55\" Class QLED 4K Q80C Smart TV"),
+    ("Samsung 990 PRO 2TB PCIe 4.0 NVMe SSD",
+     "Samsung 990 PRO 1TB PCIe 4.0 NVMe SSD"),
+    ("Ninja 4-Qt Air Fryer AF101",
+     "Ninja 6-Qt Air Fryer AF161"),
+    ("Apple iPad 10.9\" 64GB Wi-Fi 10th Gen",
+     "Apple iPad 10.9\" 256GB Wi-Fi 10th Gen"),
+    ("Sony WH-1000XM5 Wireless Noise Canceling Headphones",
+     "Sony WH-1000XM4 Wireless Noise Canceling Headphones"),
+    ("Apple AirPods Pro 2nd Gen with USB-C MagSafe Case",
+     "Apple AirPods 4th Gen with Active Noise Cancellation"),
+    ("Instant Pot Duo 7-in-1 6-Quart Pressure Cooker",
+     "Instant Pot Duo 7-in-1 8-Quart Pressure Cooker"),
+    ("LEGO Star Wars Millennium Falcon 75375",
+     "LEGO Star Wars X-Wing Starfighter 75355"),
+    ("Dell Inspiron 15 Laptop with Intel Core i5 16GB RAM 512GB SSD",
+     "Dell Inspiron 15 Laptop with Intel Core i7 16GB RAM 1TB SSD"),
+    ("Levi's Men's 501 Original Fit Jeans",
+     "Levi's Men's 505 Regular Fit Jeans"),
+    ("Logitech MX Master 3S Wireless Performance Mouse",
+     "Logitech MX Keys S Wireless Keyboard"),
+    ("Crucial 32GB DDR5 4800MHz Laptop Memory Kit",
+     "Crucial 16GB DDR5 4800MHz Laptop Memory"),
+    ("Anker 737 Power Bank 24,000mAh 140W",
+     "Anker 733 Power Bank 10,000mAh 65W"),
+    ("Dyson V8 Cordless Stick Vacuum",
+     "Dyson V15 Detect Cordless Stick Vacuum"),
+    ("Amazon Fire TV Stick 4K Max streaming device",
+     "Amazon Fire TV Stick Lite streaming device"),
+    ("Garmin Forerunner 265 GPS Running Smartwatch",
+     "Garmin Forerunner 965 GPS Running Smartwatch"),
+    ("Keurig K-Mini Single Serve Coffee Maker",
+     "Keurig K-Express Single Serve Coffee Maker"),
+    ("Bose QuietComfort Ultra Earbuds",
+     "Bose QuietComfort Ultra Headphones"),
+    ("Nintendo Switch OLED Model with White Joy-Con",
+     "Nintendo Switch Lite Console Blue"),
+    ("HP 67XL Black Ink Cartridge 2-Pack",
+     "HP 67XL Black Ink Cartridge 3-Pack"),
+)
+
+UMBRALES = (0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.7)
+
+
+def jaccard(titulo_a: str, titulo_b: str) -> float:
+    a, b = tokenizar_titulo(titulo_a), tokenizar_titulo(titulo_b)
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+def es_duplicado(indice: NearDuplicateIndex, titulo_a: str, titulo_b: str) -> bool:
+    indice.agregar('a', titulo_a, 'fuente_a')
+    try:
+        return indice.buscar(titulo_b, 'fuente_b') is not None
+    finally:
+        indice.eliminar('a')
+
+
+def main(permutaciones: int = 128, bandas: int = 32) -> None:
+    base = NearDuplicateIndex(permutaciones=permutaciones, bandas=bandas)
+    for nombre, pares in (('Duplicados', PARES_DUPLICADOS), ('Distintos', PARES_DISTINTOS)):
+        exactas = [jaccard(a, b) for a, b in pares]
+        estimadas = [base.similitud(base.firma(a), base.firma(b)) for a, b in pares]
+        errores = [e - x for e, x in zip(estimadas, exactas)]
+        print(f"{nombre}: Jaccard mín {min(exactas):.2f} / mediana {statistics.median(exactas):.2f} / "
+              f"máx {max(exactas):.2f}; error de la estimación ±{statistics.pstdev(errores):.3f}")
+
+    print(f"\n{'umbral':>6} {'detectados':>11} {'falsos +':>9} {'precisión':>10} {'exhaustividad':>14}")
+    for umbral in UMBRALES:
+        indice = NearDuplicateIndex(permutaciones=permutaciones, bandas=bandas, umbral=umbral)
+        detectados = sum(es_duplicado(indice, a, b) for a, b in PARES_DUPLICADOS)
+        falsos = sum(es_duplicado(indice, a, b) for a, b in PARES_DISTINTOS)
+        precision = detectados / (detectados + falsos) if detectados + falsos else 1.0
+        print(f"{umbral:>6.2f} {detectados:>5}/{len(PARES_DUPLICADOS):<5} {falsos:>9} "
+              f"{precision:>10.2f} {detectados / len(PARES_DUPLICADOS):>14.2f}")
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,73 @@
+"""
+Compara los backends de parseo de BaseScraper.extraer_contenedores con el
+parseo original (árbol completo con html.parser) sobre páginas sintéticas.
+
+Uso: python -m benchmarks.bench_parsers [num_tarjetas] [repeticiones]
+"""
+import logging
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.synthetic import generar_pagina
+from scrapers.base_scraper import BaseScraper, PARSER_BACKENDS
+from scrapers.slickdeals_scraper import SlickdealsScraper
+from scrapers.dealnews_scraper import DealsnewsScraper
+from scrapers.dealsofamerica_scraper import DealsOfAmericaScraper
+
+SCRAPERS = {
+    'slickdeals': SlickdealsScraper,
+    'dealnews': DealsnewsScraper,
+    'dealsofamerica': DealsOfAmericaScraper,
+}
+
+
+def _sin_timestamp(ofertas):
+    return [{k: v for k, v in oferta.a_dict().items() if k != 'timestamp'} for oferta in ofertas]
+
+
+def medir(funcion, repeticiones: int) -> tuple:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones, resultado
+
+
+def main(num_tarjetas: int = 500, repeticiones: int = 5) -> None:
+    logging.disable(logging.CRITICAL)
+    for fuente, clase in SCRAPERS.items():
+        scraper = clase(fuente, f'https://{fuente}.example/', f'#{fuente}')
+        html = generar_pagina(fuente, num_tarjetas)
+
+        def original():
+            # Ruta anterior: árbol completo con html.parser y find_all sobre todo el documento
+            scraper.extraer_contenedores = (
+                lambda html, etiqueta, clase, *args, **kwargs:
+                BeautifulSoup(html, 'html.parser').find_all(etiqueta, class_=clase)
+            )
+            try:
+                return scraper.parsear_ofertas(html)
+            finally:
+                del scraper.extraer_contenedores
+
+        base, ofertas_originales = medir(original, repeticiones)
+        referencia = _sin_timestamp(ofertas_originales)
+        print(f"\n{fuente} ({num_tarjetas} tarjetas, {len(html) / 1024:.0f} KiB)")
+        print(f"  {'html.parser (árbol completo)':<30} {base * 1000:8.1f} ms   1.00x")
+
+        for backend in PARSER_BACKENDS:
+            if BaseScraper.resolver_parser(backend) != backend:
+                print(f"  {backend:<30} no disponible")
+                continue
+            BaseScraper.configurar_parser(backend)
+            duracion, ofertas = medir(lambda: scraper.parsear_ofertas(html), repeticiones)
+            ofertas = _sin_timestamp(ofertas)
+            correcto = 'OK' if ofertas == referencia and len(ofertas) == num_tarjetas else 'DIFERENTE'
+            print(f"  {backend:<30} {duracion * 1000:8.1f} ms {base / duracion:6.2f}x  {len(ofertas)} ofertas {correcto}")
+        BaseScraper.configurar_parser('auto')
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:3]]
+    main(*argumentos)
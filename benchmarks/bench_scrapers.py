@@ -0,0 +1,213 @@
+"""
+Benchmark offline de la extracción de cada scraper: parsea las páginas de
+benchmarks/fixtures (escritas a mano imitando el marcado de cada sitio, no son
+capturas reales) y páginas generadas de miles de tarjetas, y reporta
+ofertas/segundo, memoria pico (tracemalloc) y si la extracción es correcta.
+
+Además compara la extracción en el navegador de DealsOfAmerica
+(SCRIPT_EXTRACCION_DOM, con Playwright sobre las mismas páginas) con
+`extraer_campos`; si Chromium no está instalado la comprobación se omite.
+
+Termina con código 1 si alguna extracción es incorrecta, si el navegador y el
+parser no coinciden o si el rendimiento empeora respecto a una línea base
+guardada, para usarlo como gate de regresiones.
+
+Uso:
+    python -m benchmarks.bench_scrapers [--tamanos 100,1000,5000] [--backend auto|todos|selectolax|lxml|html.parser]
+        [--repeticiones 3] [--guardar-baseline ruta.json] [--baseline ruta.json] [--tolerancia 0.3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.bench_parsers import SCRAPERS
+from benchmarks.synthetic import generar_pagina, ofertas_esperadas
+from scrapers.base_scraper import BaseScraper, PARSER_BACKENDS
+from scrapers.dealsofamerica_scraper import SCRIPT_EXTRACCION_DOM
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+# Por debajo de esta duración el ruido domina y no se compara el rendimiento (solo la corrección)
+DURACION_MINIMA_GATE_MS = 5.0
+
+
+def _campos(ofertas, campos) -> List[Dict[str, Any]]:
+    return [{campo: getattr(oferta, campo) for campo in campos} for oferta in ofertas]
+
+
+def _diferencias(obtenidas: List[Dict[str, Any]], esperadas: List[Dict[str, Any]]) -> List[str]:
+    """Descripción de las diferencias entre la extracción y lo esperado (vacía si coincide)."""
+    errores = []
+    if len(obtenidas) != len(esperadas):
+        errores.append(f"{len(obtenidas)} ofertas extraídas, se esperaban {len(esperadas)}")
+    for i, (obtenida, esperada) in enumerate(zip(obtenidas, esperadas)):
+        for campo, valor in esperada.items():
+            if obtenida[campo] != valor:
+                errores.append(f"oferta {i} campo '{campo}': {obtenida[campo]!r} != {valor!r}")
+    return errores
+
+
+def medir(funcion: Callable[[], list], repeticiones: int) -> Dict[str, Any]:
+    """Mediana del tiempo de `repeticiones` ejecuciones y memoria pico de una ejecución aparte."""
+    funcion()  # calentamiento: imports perezosos y cachés del parser
+    duraciones = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        ofertas = funcion()
+        duraciones.append(time.perf_counter() - inicio)
+    # La memoria se mide en otra ejecución: tracemalloc ralentiza y falsearía los tiempos
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    duracion = statistics.median(duraciones)
+    return {
+        'ofertas': ofertas,
+        'duracion_ms': duracion * 1000,
+        'ofertas_por_segundo': len(ofertas) / duracion if duracion > 0 else 0.0,
+        'memoria_pico_kib': pico / 1024,
+    }
+
+
+def casos(tamanos: List[int]):
+    """(fuente, nombre del caso, html, ofertas esperadas) para las fixtures y las páginas generadas."""
+    for fuente in SCRAPERS:
+        esperadas = json.loads((FIXTURES / f'{fuente}.expected.json').read_text(encoding='utf-8'))
+        yield fuente, 'fixture sintética', (FIXTURES / f'{fuente}.html').read_text(encoding='utf-8'), esperadas
+        for tamano in tamanos:
+            yield fuente, f'generada x{tamano}', generar_pagina(fuente, tamano), ofertas_esperadas(fuente, tamano)
+
+
+def ejecutar(tamanos: List[int], backends: List[str], repeticiones: int) -> Dict[str, Dict[str, Any]]:
+    resultados = {}
+    for fuente, caso, html, esperadas in casos(tamanos):
+        scraper = SCRAPERS[fuente](fuente, f'https://{fuente}.example/', f'#{fuente}')
+        campos = list(esperadas[0]) if esperadas else ['titulo']
+        print(f"\n{fuente} - {caso} ({len(html) / 1024:.0f} KiB)")
+        for backend in backends:
+            BaseScraper.configurar_parser(backend)
+            medicion = medir(lambda: scraper.parsear_ofertas(html), repeticiones)
+            errores = _diferencias(_campos(medicion.pop('ofertas'), campos), esperadas)
+            medicion['correcto'] = not errores
+            resultados[f'{fuente}/{caso}/{backend}'] = medicion
+            print(f"  {backend:<12} {medicion['duracion_ms']:9.1f} ms {medicion['ofertas_por_segundo']:11.0f} ofertas/s "
+                  f"{medicion['memoria_pico_kib']:9.0f} KiB pico  {'OK' if not errores else 'INCORRECTO'}")
+            for error in errores[:5]:
+                print(f"      {error}")
+    BaseScraper.configurar_parser('auto')
+    return resultados
+
+
+async def campos_navegador(paginas: List[str]) -> Optional[List[List[Dict[str, Any]]]]:
+    """Ejecuta SCRIPT_EXTRACCION_DOM en Chromium sobre cada página; None si no se puede lanzar."""
+    from playwright.async_api import async_playwright
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch()
+        except Exception as e:
+            print(f"\nParidad navegador/parser: no disponible ({str(e).splitlines()[0]})")
+            return None
+        try:
+            page = await browser.new_page()
+            resultados = []
+            for html in paginas:
+                await page.set_content(html)
+                resultados.append(await page.evaluate(SCRIPT_EXTRACCION_DOM))
+            return resultados
+        finally:
+            await browser.close()
+
+
+def comprobar_paridad_dom(backends: List[str], tamano: int = 50) -> List[str]:
+    """Diferencias entre SCRIPT_EXTRACCION_DOM y `extraer_campos` de DealsOfAmerica con cada backend."""
+    fuente = 'dealsofamerica'
+    paginas = {'fixture sintética': (FIXTURES / f'{fuente}.html').read_text(encoding='utf-8'),
+               f'generada x{tamano}': generar_pagina(fuente, tamano)}
+    navegador = asyncio.run(campos_navegador(list(paginas.values())))
+    if navegador is None:
+        return []
+    scraper = SCRAPERS[fuente](fuente, f'https://{fuente}.example/', f'#{fuente}')
+    fallos = []
+    print("\nParidad navegador/parser (DealsOfAmerica)")
+    for (caso, html), esperados in zip(paginas.items(), navegador):
+        for backend in backends:
+            secciones = scraper.extraer_contenedores(html, 'section', 'deal row', backend)
+            errores = _diferencias([scraper.extraer_campos(seccion) for seccion in secciones], esperados)
+            print(f"  {caso:<18} {backend:<12} {'OK' if not errores else 'DISTINTO'}")
+            for error in errores[:5]:
+                print(f"      {error}")
+            if errores:
+                fallos.append(f"{fuente}/{caso}/{backend}: el navegador y extraer_campos no coinciden")
+    return fallos
+
+
+def comparar_baseline(resultados: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                      tolerancia: float) -> List[str]:
+    """Regresiones de rendimiento o memoria respecto a la línea base, más allá de la tolerancia."""
+    regresiones = []
+    for clave, base in baseline.items():
+        actual = resultados.get(clave)
+        if actual is None:
+            continue
+        minimo = base['ofertas_por_segundo'] * (1 - tolerancia)
+        if base['duracion_ms'] >= DURACION_MINIMA_GATE_MS and actual['ofertas_por_segundo'] < minimo:
+            regresiones.append(f"{clave}: {actual['ofertas_por_segundo']:.0f} ofertas/s "
+                               f"(línea base {base['ofertas_por_segundo']:.0f})")
+        maximo = base['memoria_pico_kib'] * (1 + tolerancia)
+        if actual['memoria_pico_kib'] > maximo:
+            regresiones.append(f"{clave}: {actual['memoria_pico_kib']:.0f} KiB pico "
+                               f"(línea base {base['memoria_pico_kib']:.0f})")
+    return regresiones
+
+
+def _backends(opcion: str) -> List[str]:
+    if opcion == 'todos':
+        return [backend for backend in PARSER_BACKENDS if BaseScraper.resolver_parser(backend) == backend]
+    return [BaseScraper.resolver_parser(opcion)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', default='100,1000,5000',
+                        help='Número de tarjetas de las páginas generadas, separados por comas')
+    parser.add_argument('--backend', default='auto', choices=('auto', 'todos') + PARSER_BACKENDS)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--baseline', type=Path, help='Línea base con la que comparar (falla si hay regresiones)')
+    parser.add_argument('--guardar-baseline', type=Path, help='Guarda los resultados como nueva línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.3,
+                        help='Empeoramiento relativo admitido frente a la línea base (0.3 = 30%%)')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    tamanos = [int(tamano) for tamano in args.tamanos.split(',') if tamano.strip()]
+    backends = _backends(args.backend)
+    resultados = ejecutar(tamanos, backends, max(1, args.repeticiones))
+
+    fallos = [f"{clave}: extracción incorrecta" for clave, r in resultados.items() if not r['correcto']]
+    fallos += comprobar_paridad_dom(backends)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        fallos += comparar_baseline(resultados, baseline, args.tolerancia)
+    if args.guardar_baseline:
+        args.guardar_baseline.write_text(json.dumps(resultados, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f"\nLínea base guardada en {args.guardar_baseline}")
+
+    if fallos:
+        print("\nFALLOS:")
+        for fallo in fallos:
+            print(f"  {fallo}")
+        return 1
+    print("\nTodo correcto")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
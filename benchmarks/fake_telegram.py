@@ -0,0 +1,302 @@
+"""
+Servidor local que imita la Bot API de Telegram (sendMessage, sendPhoto,
+sendMediaGroup, getUpdates y los métodos auxiliares que usa python-telegram-bot)
+para medir envíos sin tocar Telegram. Permite simular latencia, respuestas 429
+con retry_after y fallos de red (conexiones cortadas sin respuesta).
+
+Uso independiente: python -m benchmarks.fake_telegram [--puerto 8081] [--latencia 0.05] [--prob-429 0.01]
+y arrancar el bot con TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import zlib
+from collections import Counter, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger("FakeTelegram")
+
+
+class FakeTelegramServer:
+    """
+    Bot API falsa sobre asyncio (HTTP/1.1 con keep-alive). Guarda cada mensaje
+    recibido en `mensajes` y cuenta peticiones, 429 y fallos en `estadisticas`.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 0, latencia: float = 0.0, variacion: float = 0.0,
+                 prob_429: float = 0.0, retry_after: int = 1, prob_fallo_red: float = 0.0,
+                 max_por_segundo: Optional[float] = None, semilla: Optional[int] = None):
+        self.host = host
+        self.puerto = puerto
+        self.latencia = latencia
+        self.variacion = variacion
+        self.prob_429 = prob_429
+        self.retry_after = retry_after
+        self.prob_fallo_red = prob_fallo_red
+        # Límite global como el de Telegram: por encima se responde 429
+        self.max_por_segundo = max_por_segundo
+        self.random = random.Random(semilla)
+        self.mensajes: List[Dict[str, Any]] = []
+        self.estadisticas: Counter = Counter()
+        self._envios_recientes: deque = deque()
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._siguiente_update = 1
+        self._siguiente_mensaje = 1
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self._metodos = {
+            'getme': self._get_me,
+            'deletewebhook': self._ok,
+            'setmycommands': self._ok,
+            'answercallbackquery': self._ok,
+            'close': self._ok,
+            'logout': self._ok,
+            'getupdates': self._get_updates,
+            'sendmessage': self._send_message,
+            'sendphoto': self._send_photo,
+            'sendmediagroup': self._send_media_group,
+            'editmessagetext': self._edit_message_text,
+        }
+
+    @property
+    def base_url(self) -> str:
+        """URL base para Bot(token, base_url=...): el token se añade a continuación."""
+        return f"http://{self.host}:{self.puerto}/bot"
+
+    async def iniciar(self) -> str:
+        self._servidor = await asyncio.start_server(self._atender_conexion, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        logger.info(f"Bot API falsa escuchando en {self.base_url}")
+        return self.base_url
+
+    async def detener(self) -> None:
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def __aenter__(self) -> 'FakeTelegramServer':
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *excinfo) -> None:
+        await self.detener()
+
+    def agregar_update(self, texto: str, chat_id: int = 1, usuario_id: int = 1) -> None:
+        """Encola un mensaje entrante (p. ej. un comando) para el siguiente getUpdates."""
+        self._updates.put_nowait({
+            'update_id': self._siguiente_update,
+            'message': {
+                'message_id': self._nuevo_id_mensaje(),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': usuario_id, 'is_bot': False, 'first_name': 'Bench'},
+                'text': texto,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(texto.split()[0])}]
+                if texto.startswith('/') else [],
+            },
+        })
+        self._siguiente_update += 1
+
+    # HTTP
+
+    async def _atender_conexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                peticion = await self._leer_peticion(reader)
+                if peticion is None:
+                    break
+                ruta, cabeceras, cuerpo = peticion
+                self.estadisticas['peticiones'] += 1
+                if self.latencia or self.variacion:
+                    await asyncio.sleep(max(0.0, self.latencia + self.random.uniform(-self.variacion, self.variacion)))
+                if self.prob_fallo_red and self.random.random() < self.prob_fallo_red:
+                    # Fallo de red: se corta la conexión sin responder
+                    self.estadisticas['fallos_red'] += 1
+                    break
+                estado, respuesta = await self._despachar(ruta, cabeceras, cuerpo)
+                datos = json.dumps(respuesta).encode()
+                writer.write(
+                    f"HTTP/1.1 {estado} {'OK' if estado == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(datos)}\r\n\r\n".encode() + datos
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _leer_peticion(reader: asyncio.StreamReader) -> Optional[Tuple[str, Dict[str, str], bytes]]:
+        linea = await reader.readline()
+        if not linea.strip():
+            return None
+        _, ruta, _ = linea.decode('latin-1').split(' ', 2)
+        cabeceras = {}
+        while (linea := await reader.readline()) not in (b'\r\n', b'\n', b''):
+            clave, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[clave.strip().lower()] = valor.strip()
+        cuerpo = await reader.readexactly(int(cabeceras.get('content-length', 0)))
+        return ruta, cabeceras, cuerpo
+
+    @staticmethod
+    def _parametros(cabeceras: Dict[str, str], cuerpo: bytes) -> Dict[str, Any]:
+        tipo = cabeceras.get('content-type', '')
+        if tipo.startswith('application/json'):
+            return json.loads(cuerpo or b'{}')
+        if tipo.startswith('multipart/form-data'):
+            mensaje = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {tipo}\r\n\r\n".encode() + cuerpo)
+            parametros = {}
+            for parte in mensaje.iter_parts():
+                nombre = parte.get_param('name', header='content-disposition')
+                contenido = parte.get_payload(decode=True) or b''
+                parametros[nombre] = contenido if parte.get_filename() else contenido.decode()
+            return parametros
+        return dict(parse_qsl(cuerpo.decode()))
+
+    async def _despachar(self, ruta: str, cabeceras: Dict[str, str], cuerpo: bytes) -> Tuple[int, Dict[str, Any]]:
+        metodo = ruta.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1].lower()
+        manejador = self._metodos.get(metodo)
+        if manejador is None:
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+        if metodo.startswith('send'):
+            limitado = self._limitar()
+            if limitado:
+                return limitado
+        try:
+            resultado = await manejador(self._parametros(cabeceras, cuerpo))
+        except (KeyError, ValueError) as e:
+            return 400, {'ok': False, 'error_code': 400, 'description': f'Bad Request: {e}'}
+        self.estadisticas[metodo] += 1
+        return 200, {'ok': True, 'result': resultado}
+
+    def _limitar(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Respuesta 429 si toca simularla o si se supera max_por_segundo; None si se acepta."""
+        ahora = time.monotonic()
+        excedido = False
+        if self.max_por_segundo:
+            while self._envios_recientes and ahora - self._envios_recientes[0] >= 1.0:
+                self._envios_recientes.popleft()
+            excedido = len(self._envios_recientes) >= self.max_por_segundo
+        if excedido or (self.prob_429 and self.random.random() < self.prob_429):
+            self.estadisticas['429'] += 1
+            return 429, {
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }
+        self._envios_recientes.append(ahora)
+        return None
+
+    # Métodos de la Bot API
+
+    def _nuevo_id_mensaje(self) -> int:
+        id_mensaje = self._siguiente_mensaje
+        self._siguiente_mensaje += 1
+        return id_mensaje
+
+    @staticmethod
+    def _chat(chat_id: str) -> Dict[str, Any]:
+        # Los @usernames se traducen a un id numérico estable, como hace Telegram
+        if chat_id.lstrip('-').isdigit():
+            return {'id': int(chat_id), 'type': 'channel' if chat_id.startswith('-') else 'private'}
+        return {'id': -1000000000000 - zlib.crc32(chat_id.encode()), 'type': 'channel', 'username': chat_id.lstrip('@')}
+
+    def _mensaje(self, parametros: Dict[str, Any], **campos) -> Dict[str, Any]:
+        mensaje = {
+            'message_id': self._nuevo_id_mensaje(),
+            'date': int(time.time()),
+            'chat': self._chat(str(parametros['chat_id'])),
+            **campos,
+        }
+        self.mensajes.append({'recibido': time.monotonic(), **mensaje})
+        return mensaje
+
+    @staticmethod
+    def _foto(referencia: Any) -> List[Dict[str, Any]]:
+        identificador = f"foto-{zlib.crc32(str(referencia).encode()):08x}"
+        return [{'file_id': identificador, 'file_unique_id': identificador, 'width': 800, 'height': 600}]
+
+    async def _ok(self, parametros: Dict[str, Any]) -> bool:
+        return True
+
+    async def _get_me(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        return {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot',
+                'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+
+    async def _get_updates(self, parametros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(parametros.get('offset', 0))
+        timeout = float(parametros.get('timeout', 0))
+        updates = []
+        try:
+            if self._updates.empty() and timeout:
+                updates.append(await asyncio.wait_for(self._updates.get(), timeout))
+            while not self._updates.empty():
+                updates.append(self._updates.get_nowait())
+        except asyncio.TimeoutError:
+            pass
+        return [update for update in updates if update['update_id'] >= offset]
+
+    async def _send_message(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        return self._mensaje(parametros, text=parametros['text'])
+
+    async def _send_photo(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        return self._mensaje(parametros, photo=self._foto(parametros['photo']), caption=parametros.get('caption', ''))
+
+    async def _send_media_group(self, parametros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        media = json.loads(parametros['media'])
+        if not 2 <= len(media) <= 10:
+            raise ValueError('media must include 2-10 items')
+        grupo = str(self._siguiente_mensaje)
+        return [
+            self._mensaje(parametros, media_group_id=grupo, photo=self._foto(elemento['media']),
+                          caption=elemento.get('caption', ''))
+            for elemento in media
+        ]
+
+    async def _edit_message_text(self, parametros: Dict[str, Any]) -> Dict[str, Any]:
+        return self._mensaje(parametros, text=parametros['text'])
+
+
+async def _servir(args: argparse.Namespace) -> None:
+    servidor = FakeTelegramServer(
+        host=args.host, puerto=args.puerto, latencia=args.latencia, variacion=args.variacion,
+        prob_429=args.prob_429, retry_after=args.retry_after, prob_fallo_red=args.prob_fallo_red,
+        max_por_segundo=args.max_por_segundo,
+    )
+    print(f"Bot API falsa en {await servidor.iniciar()} (Ctrl+C para salir)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.detener()
+        print(dict(servidor.estadisticas))
+
+
+def argumentos_servidor(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """Opciones de simulación compartidas por el servidor y el arnés de envío."""
+    parser.add_argument('--latencia', type=float, default=0.0, help='Segundos de latencia por petición')
+    parser.add_argument('--variacion', type=float, default=0.0, help='Variación aleatoria (+/-) de la latencia')
+    parser.add_argument('--prob-429', type=float, default=0.0, help='Probabilidad de responder 429 a un envío')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after de las respuestas 429')
+    parser.add_argument('--prob-fallo-red', type=float, default=0.0,
+                        help='Probabilidad de cortar la conexión sin responder')
+    parser.add_argument('--max-por-segundo', type=float, help='Envíos por segundo a partir de los que se responde 429')
+    return parser
+
+
+if __name__ == '__main__':
+    parser = argumentos_servidor(argparse.ArgumentParser(description=__doc__,
+                                                         formatter_class=argparse.RawDescriptionHelpFormatter))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8081)
+    try:
+        asyncio.run(_servir(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
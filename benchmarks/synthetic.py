@@ -0,0 +1,93 @@
+"""Generadores de páginas sintéticas con la estructura de cada fuente."""
+
+RELLENO = (
+    '<div class="sidebar"><ul>'
+    + ''.join(f'<li><a href="/cat/{i}">Categoría {i}</a><span class="count">{i * 3}</span></li>' for i in range(40))
+    + '</ul></div><script>var tracking = {"a": 1, "b": [1, 2, 3]};</script>'
+)
+
+
+def _pagina(tarjetas: str) -> str:
+    return (
+        '<!DOCTYPE html><html><head><title>Deals</title>'
+        '<link rel="stylesheet" href="/main.css"></head><body>'
+        f'<header>{RELLENO}</header><main>{tarjetas}</main><footer>{RELLENO}</footer></body></html>'
+    )
+
+
+def tarjeta_slickdeals(i: int) -> str:
+    return (
+        '<li class="frontpage-grid__item"><div class="dealCard">'
+        f'<img class="dealCard__image" src="https://static.slickdealscdn.com/{i}.jpg">'
+        '<div class="dealCard__content">'
+        f'<a class="dealCard__title" href="/f/{1000000 + i}-product-{i}?src=frontpage">Product {i} Wireless Headphones 2-Pack</a>'
+        f'<span class="dealCard__price">${i % 300}.99</span>'
+        f'<span class="dealCard__originalPrice">${i % 300 + 40}.99</span>'
+        f'<img class="dealCard__image" src="https://static.slickdealscdn.com/{i}.jpg">'
+        '<span class="dealCard__storeLink">Amazon</span></div></div></li>'
+    )
+
+
+def tarjeta_dealnews(i: int) -> str:
+    return (
+        '<div class="flex-cell flex-cell-size-1of1"><div class="content-card">'
+        f'<img class="native-lazy-img" src="https://c.dlnws.com/image/{i}.jpg">'
+        f'<div class="title limit-height limit-height-large-2 limit-height-small-2">Store {i} Laptop Sale</div>'
+        f'<div class="callout limit-height limit-height-large-1 limit-height-small-1">${i % 500}.00 '
+        f'<span class="callout-comparison">${i % 500 + 100}.00</span></div>'
+        f'<div class="snippet summary">Save with coupon code "SAVE{i}" at checkout.</div>'
+        f'<a class="attractor" href="https://www.dealnews.com/lw/click.html?20,2,{21000000 + i}">Shop</a>'
+        '</div></div>'
+    )
+
+
+def tarjeta_dealsofamerica(i: int) -> str:
+    return (
+        '<section class="deal row"><div class="start_div">'
+        f'<img src="https://www.dealsofamerica.com/img/{i}.jpg">'
+        f'<span class="our-price">${i % 200}.49</span><span class="list-price">${i % 200 + 25}.49</span>'
+        '</div><div class="details">'
+        f'<div class="title"><a href="/deal/{i}">Kitchen Gadget {i} Set</a></div>'
+        f'<section class="more_details">Clip coupon CODE{i:04d} for extra savings.</section>'
+        '</div></section>'
+    )
+
+
+GENERADORES = {
+    'slickdeals': tarjeta_slickdeals,
+    'dealnews': tarjeta_dealnews,
+    'dealsofamerica': tarjeta_dealsofamerica,
+}
+
+
+def generar_pagina(fuente: str, num_tarjetas: int) -> str:
+    generador = GENERADORES[fuente]
+    return _pagina(''.join(generador(i) for i in range(num_tarjetas)))
+
+
+# Campos que cada scraper debe extraer de la tarjeta i (para validar la extracción a escala)
+ESPERADOS = {
+    'slickdeals': lambda i: {
+        'titulo': f'Product {i} Wireless Headphones 2-Pack',
+        'precio_centavos': (i % 300) * 100 + 99,
+        'precio_original_centavos': (i % 300 + 40) * 100 + 99,
+        'cupon': None,
+    },
+    'dealnews': lambda i: {
+        'titulo': f'Store {i} Laptop Sale',
+        'precio_centavos': (i % 500) * 100,
+        'precio_original_centavos': (i % 500 + 100) * 100,
+        'cupon': f'SAVE{i}',
+    },
+    'dealsofamerica': lambda i: {
+        'titulo': f'Kitchen Gadget {i} Set',
+        'precio_centavos': (i % 200) * 100 + 49,
+        'precio_original_centavos': (i % 200 + 25) * 100 + 49,
+        'cupon': f'CODE{i:04d}',
+    },
+}
+
+
+def ofertas_esperadas(fuente: str, num_tarjetas: int) -> list:
+    esperado = ESPERADOS[fuente]
+    return [esperado(i) for i in range(num_tarjetas)]
@@ -9,24 +9,35 @@ def setup_handlers(application, bot):
     application.add_handler(CallbackQueryHandler(manejar_callback_fuente))
 
 
+async def _responder(bot, update: Update, texto: str, **kwargs) -> None:
+    await bot.rate_limiter.esperar(update.effective_chat.id)
+    await update.message.reply_text(texto, **kwargs)
+
+
 async def obtener_estado(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     bot = context.bot_data["bot"]
     if str(update.effective_user.id) != bot.config.USER_ID:
-        await update.message.reply_text("No tienes permiso para usar este comando.")
+        await _responder(bot, update, "No tienes permiso para usar este comando.")
         return
 
     estado = "Estado actual de las fuentes:\n"
+    programacion = bot.scheduler.estado()
     for nombre, scraper_info in bot.scrapers.items():
         estado += (
-            f"{nombre}: {'Habilitada' if scraper_info['enabled'] else 'Deshabilitada'}\n"
+            f"{nombre}: {'Habilitada' if scraper_info['enabled'] else 'Deshabilitada'}"
         )
-    await update.message.reply_text(estado)
+        if nombre in programacion:
+            estado += f" (cada {programacion[nombre]['intervalo'] / 60:.0f} min)"
+        estado += "\n"
+    outbox = await bot.db_manager.contar_outbox()
+    estado += f"Ofertas pendientes de envío: {outbox.get(bot.db_manager.OUTBOX_PENDIENTE, 0)}\n"
+    await _responder(bot, update, estado)
 
 
 async def habilitar_fuente(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     bot = context.bot_data["bot"]
     if str(update.effective_user.id) != bot.config.USER_ID:
-        await update.message.reply_text("No tienes permiso para usar este comando.")
+        await _responder(bot, update, "No tienes permiso para usar este comando.")
         return
 
     keyboard = [
@@ -36,7 +47,8 @@ async def habilitar_fuente(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         ]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
+    await _responder(
+        bot, update,
         "Selecciona la fuente a habilitar:", reply_markup=reply_markup
     )
 
@@ -46,7 +58,7 @@ async def deshabilitar_fuente(
 ) -> None:
     bot = context.bot_data["bot"]
     if str(update.effective_user.id) != bot.config.USER_ID:
-        await update.message.reply_text("No tienes permiso para usar este comando.")
+        await _responder(bot, update, "No tienes permiso para usar este comando.")
         return
 
     keyboard = [
@@ -56,7 +68,8 @@ async def deshabilitar_fuente(
         ]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
+    await _responder(
+        bot, update,
         "Selecciona la fuente a deshabilitar:", reply_markup=reply_markup
     )
 
@@ -77,7 +90,9 @@ async def manejar_callback_fuente(
         mensaje = f"Fuente {nombre_fuente} deshabilitada."
 
     try:
+        await bot.rate_limiter.esperar(query.message.chat_id)
         await query.edit_message_text(text=mensaje)
     except Exception as e:
         bot.logger.error(f"Error al editar mensaje: {e}")
+        await bot.rate_limiter.esperar(query.message.chat_id)
         await context.bot.send_message(chat_id=query.message.chat_id, text=mensaje)
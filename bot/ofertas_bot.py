@@ -1,12 +1,10 @@
 import asyncio
+import dataclasses
 import logging
-from typing import List, Dict, Any, Set
-from telegram import Bot
+from typing import List, Dict, Any, Optional
+from telegram import Bot, InputMediaPhoto
 from telegram.ext import Application
-from telegram.error import NetworkError, RetryAfter, Conflict, BadRequest, TimedOut
-import random
-import os
-import time
+from telegram.error import NetworkError, RetryAfter, Conflict, TimedOut
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from filelock import FileLock, Timeout
 import importlib
@@ -14,24 +12,71 @@ import inspect
 
 from config import Config
 from database.db_manager import DBManager
+from scrapers.base_scraper import BaseScraper
+from scrapers.browser_manager import BrowserManager
 from bot.handlers import setup_handlers
-import re
+from bot.scheduler import SourceScheduler
+from bot.pipeline import DealPipeline
+from bot.rate_limiter import TelegramRateLimiter
+from bot.selector import DealSelector
+from utils.deal import Deal
+from utils.near_duplicates import NearDuplicateIndex
 
 class OfertasBot:
     def __init__(self):
         self.config = Config()
         self.logger = logging.getLogger("OfertasBot")
-        self.db_manager = DBManager(self.config.DATABASE)
+        self.db_manager = DBManager(
+            self.config.DATABASE,
+            buffer_max_ofertas=self.config.DB_WRITE_BUFFER_SIZE,
+            buffer_max_segundos=self.config.DB_WRITE_BUFFER_MAX_SECONDS,
+            limpieza_lote=self.config.LIMPIEZA_LOTE_TAMANO,
+            limpieza_max_lotes=self.config.LIMPIEZA_MAX_LOTES,
+            cooldown_segundos=self.config.OFERTA_COOLDOWN,
+            cache_max_ids=self.config.DEDUP_CACHE_MAX_IDS,
+            retencion_dias=self.config.DIAS_LIMPIEZA_OFERTAS_ANTIGUAS,
+            bloom_capacidad=self.config.BLOOM_CAPACIDAD,
+            bloom_tasa_error=self.config.BLOOM_TASA_ERROR,
+            outbox_max_intentos=self.config.OUTBOX_MAX_INTENTOS,
+            outbox_backoff_base=self.config.OUTBOX_BACKOFF_BASE_SECONDS,
+            outbox_backoff_max=self.config.OUTBOX_BACKOFF_MAX_SECONDS,
+            historial_precios_dias=self.config.HISTORIAL_PRECIOS_DIAS,
+        )
         self.scrapers = self.init_scrapers()
+        # Títulos enviados recientemente para detectar la misma oferta publicada por otra fuente
+        self.casi_duplicados = self._crear_indice_casi_duplicados(ttl_segundos=self.config.OFERTA_COOLDOWN)
         self.application = None
         self.bot = None
         self.is_running = True
         self.lock = asyncio.Lock()
+        # Límite compartido por envíos de ofertas, notificaciones y respuestas a comandos
+        self.rate_limiter = TelegramRateLimiter(
+            global_por_segundo=self.config.TELEGRAM_GLOBAL_MSG_POR_SEGUNDO,
+            grupo_por_minuto=self.config.TELEGRAM_GRUPO_MSG_POR_MINUTO,
+            privado_por_segundo=self.config.TELEGRAM_PRIVADO_MSG_POR_SEGUNDO,
+            rafaga_chat=self.config.TELEGRAM_RAFAGA_POR_CHAT,
+        )
+        self.selector = DealSelector(
+            max_ofertas=self.config.MAX_OFERTAS_POR_EJECUCION,
+            cuota_por_fuente=self.config.SELECCION_CUOTA_POR_FUENTE,
+            peso_descuento=self.config.SELECCION_PESO_DESCUENTO,
+            peso_frescura=self.config.SELECCION_PESO_FRESCURA,
+            vida_media_segundos=self.config.SELECCION_VIDA_MEDIA_SECONDS,
+        )
+        self.scheduler = self.init_scheduler()
+        self.pipeline = DealPipeline(self, tamano_cola=self.config.PIPELINE_QUEUE_SIZE)
         self.lock_file = "ofertasbot.lock"
-        self.browser = None
+        self.browser_manager = BrowserManager(
+            headless=self.config.BROWSER_HEADLESS,
+            max_paginas=self.config.BROWSER_MAX_PAGINAS,
+            max_rss_mb=self.config.BROWSER_MAX_RSS_MB,
+        )
 
     def init_scrapers(self) -> Dict[str, Any]:
         scrapers = {}
+        BaseScraper.configurar_cache_respuestas(self.config.HTTP_CACHE_FILE)
+        BaseScraper.configurar_parser(self.config.HTML_PARSER_BACKEND)
+        BaseScraper.configurar_pool_parseo(self.config.PARSE_WORKERS)
         for scraper_config in self.config.SCRAPERS:
             try:
                 module = importlib.import_module(scraper_config["module"])
@@ -40,6 +85,8 @@ class OfertasBot:
                     name=scraper_config["name"],
                     url=scraper_config["url"],
                     tag=scraper_config["tag"],
+                    timeout=scraper_config.get("timeout", 30.0),
+                    **scraper_config.get("options", {}),
                 )
                 scrapers[scraper_config["name"]] = {
                     "instance": scraper_instance,
@@ -53,35 +100,75 @@ class OfertasBot:
                 )
         return scrapers
 
+    def init_scheduler(self) -> SourceScheduler:
+        scheduler = SourceScheduler(
+            ejecutar=self.procesar_fuente,
+            esta_habilitada=lambda nombre: self.scrapers[nombre]["enabled"],
+            factor_aceleracion=self.config.SCHEDULER_FACTOR_ACELERACION,
+            factor_frenado=self.config.SCHEDULER_FACTOR_FRENADO,
+            al_fallar=self._al_fallar_fuente,
+        )
+        for scraper_config in self.config.SCRAPERS:
+            if scraper_config["name"] not in self.scrapers:
+                continue
+            scheduler.agregar_fuente(
+                scraper_config["name"],
+                intervalo=self.config.LOOP_INTERVAL_SECONDS,
+                minimo=scraper_config.get("min_interval", self.config.SCHEDULER_MIN_INTERVAL_SECONDS),
+                maximo=scraper_config.get("max_interval", self.config.SCHEDULER_MAX_INTERVAL_SECONDS),
+            )
+        return scheduler
+
+    def _crear_indice_casi_duplicados(self, ttl_segundos: int | None = None) -> NearDuplicateIndex:
+        return NearDuplicateIndex(
+            permutaciones=self.config.NEAR_DUP_PERMUTACIONES,
+            bandas=self.config.NEAR_DUP_BANDAS,
+            umbral=self.config.NEAR_DUP_UMBRAL,
+            ttl_segundos=ttl_segundos,
+        )
+
+    async def _precargar_casi_duplicados(self) -> None:
+        for identidad, titulo, fuente, timestamp in await self.db_manager.obtener_titulos_recientes(
+            self.config.OFERTA_COOLDOWN
+        ):
+            self.casi_duplicados.agregar(identidad, titulo or '', fuente, timestamp)
+        self.logger.info(f"Índice de casi duplicados precargado con {len(self.casi_duplicados)} títulos.")
+
+    @staticmethod
+    def _necesita_navegador(scraper) -> bool:
+        return 'browser' in inspect.signature(scraper.obtener_ofertas).parameters
+
     async def launch_browser(self):
-        """Lanza el navegador si algún scraper lo necesita."""
-        for scraper_info in self.scrapers.values():
-            if scraper_info["enabled"] and hasattr(scraper_info["instance"], 'launch_browser'):
-                self.logger.info("Lanzando navegador para scrapers dinámicos...")
-                try:
-                    # Asumimos que el primer scraper con `launch_browser` puede lanzar el navegador.
-                    self.browser = await scraper_info["instance"].launch_browser()
-                    self.logger.info("Navegador Playwright lanzado exitosamente.")
-                except Exception as e:
-                    self.logger.error(
-                        f"No se pudo lanzar el navegador Playwright: {e}. "
-                        f"El scraper {scraper_info['instance'].name} será deshabilitado.",
-                        exc_info=True
-                    )
-                    # Deshabilitar este scraper si falla el navegador
-                    scraper_info["enabled"] = False
-                break
+        """Lanza el navegador si algún scraper lo necesita; si falla, se reintenta en el siguiente uso."""
+        necesitan_navegador = [
+            scraper_info for scraper_info in self.scrapers.values()
+            if scraper_info["enabled"] and self._necesita_navegador(scraper_info["instance"])
+        ]
+        if not necesitan_navegador:
+            return
+        self.logger.info("Lanzando navegador para scrapers dinámicos...")
+        try:
+            await self.browser_manager.iniciar()
+        except Exception as e:
+            nombres = ', '.join(scraper_info["instance"].name for scraper_info in necesitan_navegador)
+            # BrowserManager lanza el navegador bajo demanda: los scrapers siguen
+            # habilitados y cada uso vuelve a intentarlo
+            self.logger.error(
+                f"No se pudo lanzar el navegador Playwright: {e}. "
+                f"Se reintentará en el próximo scraping de {nombres}.",
+                exc_info=True
+            )
 
     async def close_browser(self):
-        """Cierra el navegador si está activo."""
-        if self.browser:
-            try:
-                self.logger.info("Cerrando el navegador Playwright...")
-                await self.browser.close()
-            except Exception as e:
-                self.logger.warning(f"Error al cerrar el navegador: {e}")
-            finally:
-                self.browser = None
+        """Cierra los contextos reutilizables, el navegador y el driver de Playwright."""
+        for scraper_info in self.scrapers.values():
+            if hasattr(scraper_info["instance"], 'cerrar_contexto'):
+                await scraper_info["instance"].cerrar_contexto()
+        await self.browser_manager.cerrar()
+
+    async def _obtener_ofertas_con_navegador(self, scraper) -> List[Deal]:
+        async with self.browser_manager.usar() as browser:
+            return await scraper.obtener_ofertas(browser)
 
     async def run(self) -> None:
         try:
@@ -89,15 +176,17 @@ class OfertasBot:
             with lock:
                 self.logger.info("Bloqueo adquirido exitosamente.")
                 await self.db_manager.init_db()
+                await self._precargar_casi_duplicados()
                 await self.launch_browser()  # Lanzar navegador
 
                 # Crear application con timeout robusto
                 self.application = (
                     Application.builder()
                     .token(self.config.TOKEN)
+                    .base_url(self.config.TELEGRAM_BASE_URL)
                     .build()
                 )
-                self.bot = Bot(self.config.TOKEN)
+                self.bot = Bot(self.config.TOKEN, base_url=self.config.TELEGRAM_BASE_URL)
                 self.application.bot_data["bot"] = self
                 setup_handlers(self.application, self)
                 await self.application.initialize()
@@ -115,23 +204,22 @@ class OfertasBot:
                     self.logger.error(f"Error al iniciar polling: {polling_error}", exc_info=True)
                     raise
 
+                # Cada fuente se consulta en su propia tarea con intervalo adaptativo
+                # y publica en el pipeline, que envía y persiste en segundo plano
+                self.pipeline.iniciar()
+                self.scheduler.iniciar()
+
                 while self.is_running:
                     try:
-                        await self.check_ofertas()
-                    except (NetworkError, TimedOut) as net_error:
-                        # Errores de red temporales - registrar e intentar de nuevo
-                        self.logger.warning(
-                            f"Error de red temporal en el ciclo principal: {net_error}. Reintentando..."
-                        )
-                        await asyncio.sleep(5)  # Esperar 5 segundos antes de reintentar
+                        await self.limpiar_ofertas_antiguas()
                     except Exception as e:
                         self.logger.error(
-                            f"Error en el ciclo principal: {e}", exc_info=True
+                            f"Error al limpiar ofertas antiguas: {e}", exc_info=True
                         )
-                        await self.enviar_notificacion_error(e)
-                    finally:
-                        await asyncio.sleep(self.config.LOOP_INTERVAL_SECONDS)
+                    await asyncio.sleep(self.config.LIMPIEZA_INTERVAL_SECONDS)
 
+                await self.scheduler.detener()
+                await self.pipeline.detener()
                 await self.application.stop()
                 await self.application.shutdown()
         except Timeout:
@@ -140,7 +228,12 @@ class OfertasBot:
         except Exception as e:
             self.logger.critical(f"Error fatal al iniciar el bot: {e}", exc_info=True)
         finally:
+            await self.scheduler.detener()  # Detener las tareas de las fuentes
+            await self.pipeline.detener()  # Detener las etapas del pipeline
             await self.close_browser()  # Asegurarse de cerrar el navegador
+            await BaseScraper.cerrar_cliente_http()  # Cerrar el cliente HTTP compartido
+            BaseScraper.cerrar_pool_parseo()  # Detener los procesos de parseo
+            await self.db_manager.close()  # Cerrar la conexión persistente a la base de datos
             self.logger.info("El bot se ha detenido.")
 
     def _telegram_error_callback(self, context) -> None:
@@ -165,28 +258,24 @@ class OfertasBot:
             await self.application.stop()
             await self.application.shutdown()
 
-    async def _scrape_all_sources(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Ejecuta todos los scrapers habilitados de forma concurrente y devuelve sus resultados."""
-        scraped_deals = {name: [] for name, scraper_info in self.scrapers.items() if scraper_info["enabled"]}
-        self.logger.info("Iniciando scraping concurrente de todas las fuentes habilitadas.")
+    async def _scrape_all_sources(self, nombres: Optional[List[str]] = None) -> Dict[str, List[Deal]]:
+        """Ejecuta los scrapers habilitados (todos o los indicados) de forma concurrente y devuelve sus resultados."""
+        seleccionados = {
+            name: scraper_info for name, scraper_info in self.scrapers.items()
+            if scraper_info["enabled"] and (nombres is None or name in nombres)
+        }
+        scraped_deals = {name: [] for name in seleccionados}
+        self.logger.info(f"Iniciando scraping concurrente de: {', '.join(seleccionados) or 'ninguna fuente'}.")
         
-        enabled_scrapers = [scraper_info["instance"] for scraper_info in self.scrapers.values() if scraper_info["enabled"]]
+        enabled_scrapers = [scraper_info["instance"] for scraper_info in seleccionados.values()]
         tasks = []
         for scraper in enabled_scrapers:
             method = scraper.obtener_ofertas
             is_async = inspect.iscoroutinefunction(method)
             
             # Inspeccionar la firma del método para ver si necesita el navegador
-            sig = inspect.signature(method)
-            if 'browser' in sig.parameters:
-                if not self.browser:
-                    self.logger.error(f"El scraper {scraper.name} necesita un navegador, pero no hay uno activo.")
-                    continue
-                if is_async:
-                    tasks.append(method(self.browser))
-                else:
-                    # No es ideal ejecutar una tarea de navegador en un hilo síncrono, pero se maneja
-                    tasks.append(asyncio.to_thread(method, self.browser))
+            if self._necesita_navegador(scraper):
+                tasks.append(self._obtener_ofertas_con_navegador(scraper))
             else:
                 if is_async:
                     tasks.append(method())
@@ -201,7 +290,7 @@ class OfertasBot:
         self.logger.info("Scraping concurrente finalizado.")
 
         for i, result in enumerate(results):
-            # Es necesario un mapeo más robusto si las tareas no se mantienen en orden
+            # gather devuelve los resultados en el mismo orden que las tareas
             scraper = enabled_scrapers[i]
             if isinstance(result, Exception):
                 self.logger.error(f"Error al obtener ofertas de {scraper.name}: {result}", exc_info=result)
@@ -211,165 +300,263 @@ class OfertasBot:
         
         return scraped_deals
 
-    async def _filter_new_deals(self, all_deals: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
-        """Filtra las ofertas para quedarse solo con las que no están en la base de datos."""
-        self.logger.info("Optimizando la verificación de duplicados...")
-        recent_ids = await self.db_manager.obtener_ids_recientes()
-        self.logger.info(f"Cargados {len(recent_ids)} IDs de ofertas recientes para verificación.")
+    async def _filter_new_deals(self, all_deals: Dict[str, List[Deal]]) -> Dict[str, List[Deal]]:
+        """Filtra las ofertas para quedarse solo con las que no se enviaron dentro de la ventana de retención."""
+        new_deals_by_source = {}
+        identidades_vistas = set()
+        casi_duplicados_lote = self._crear_indice_casi_duplicados()
+        self.casi_duplicados.purgar_expirados()
+        descartadas_casi_duplicadas = 0
+        repetidas = []
+        for name, deals in all_deals.items():
+            new_deals_by_source[name] = []
+            for deal in deals:
+                identidad = deal.identidad
+                # Descarta repeticiones dentro del mismo lote y ofertas ya enviadas
+                if identidad in identidades_vistas:
+                    continue
+                identidades_vistas.add(identidad)
+                if await self.db_manager.es_oferta_duplicada(identidad):
+                    if deal.precio_centavos is not None and self.config.BAJADA_PRECIO_MARGEN > 0:
+                        repetidas.append((name, deal))
+                    continue
 
-        def is_new(deal: Dict[str, Any]) -> bool:
-            deal_id = self.db_manager.generar_id_oferta(deal)
-            return deal_id not in recent_ids
+                # Descarta la misma oferta publicada por otra fuente con un título parecido
+                firma = casi_duplicados_lote.firma(deal.titulo)
+                if (self.casi_duplicados.buscar(deal.titulo, name, firma=firma)
+                        or casi_duplicados_lote.buscar(deal.titulo, name, firma=firma)):
+                    descartadas_casi_duplicadas += 1
+                    self.logger.debug(f"Oferta casi duplicada descartada: {deal.titulo} - Fuente: {name}")
+                    continue
+                casi_duplicados_lote.agregar(identidad, deal.titulo, name, firma=firma)
+                new_deals_by_source[name].append(deal)
 
-        new_deals_by_source = {
-            name: [deal for deal in deals if is_new(deal)]
-            for name, deals in all_deals.items()
-        }
+        # Ofertas ya enviadas que vuelven con un precio claramente inferior a su mínimo
+        for name, deal in await self._detectar_bajadas_precio(repetidas):
+            if casi_duplicados_lote.buscar(deal.titulo, name):
+                continue
+            casi_duplicados_lote.agregar(deal.identidad, deal.titulo, name)
+            new_deals_by_source[name].append(deal)
 
         for name, deals in new_deals_by_source.items():
             self.logger.info(f"Nuevas ofertas de {name}: {len(deals)}")
+        if descartadas_casi_duplicadas:
+            self.logger.info(f"Ofertas casi duplicadas entre fuentes descartadas: {descartadas_casi_duplicadas}")
             
         return new_deals_by_source
 
-    async def _process_new_deals(self, new_deals_by_source: Dict[str, List[Dict[str, Any]]]) -> int:
-        """Selecciona, envía y guarda las nuevas ofertas."""
-        deals_to_send = self.seleccionar_ofertas_equilibradas(
-            *[deals for deals in new_deals_by_source.values()]
+    async def _detectar_bajadas_precio(self, repetidas: List[tuple]) -> List[tuple]:
+        """
+        Devuelve las ofertas repetidas cuyo precio mejora el mínimo del historial
+        en al menos BAJADA_PRECIO_MARGEN, marcadas con ese mínimo anterior.
+        """
+        if not repetidas:
+            return []
+        minimos = await self.db_manager.obtener_minimos_precio(deal.identidad for _, deal in repetidas)
+        bajadas = []
+        for name, deal in repetidas:
+            minimo = minimos.get(deal.identidad)
+            if minimo and deal.precio_centavos < minimo * (1 - self.config.BAJADA_PRECIO_MARGEN):
+                self.logger.info(
+                    f"Bajada de precio detectada: {deal.titulo} ({minimo / 100:.2f} -> {deal.precio_centavos / 100:.2f})"
+                )
+                bajadas.append((name, dataclasses.replace(deal, precio_minimo_anterior=minimo)))
+        return bajadas
+
+    async def procesar_fuente(self, nombre: str) -> int:
+        """
+        Scrapea una sola fuente y publica el resultado en el pipeline. Devuelve el
+        número de ofertas nuevas, que el scheduler usa para adaptar el intervalo;
+        el envío continúa en segundo plano.
+        """
+        scraped_deals = await self._scrape_all_sources([nombre])
+        nuevas = await self.pipeline.publicar(nombre, scraped_deals.get(nombre, []))
+        self.logger.info(f"Fuente {nombre}: {nuevas} ofertas nuevas en cola de envío.")
+        return nuevas
+
+    async def _al_fallar_fuente(self, nombre: str, error: Exception) -> None:
+        if isinstance(error, (NetworkError, TimedOut)):
+            # Errores de red temporales: el scheduler alarga el intervalo y reintenta
+            self.logger.warning(f"Error de red temporal en la fuente {nombre}: {error}.")
+            return
+        await self.enviar_notificacion_error(error)
+
+    async def limpiar_ofertas_antiguas(self) -> int:
+        cleaned_count = await self.db_manager.limpiar_ofertas_antiguas(
+            dias=self.config.DIAS_LIMPIEZA_OFERTAS_ANTIGUAS
         )
-        self.logger.info(f"Total de ofertas a enviar: {len(deals_to_send)}")
-
-        sent_deals_count = 0
-        for deal in deals_to_send:
-            if await self.enviar_oferta_con_reintento(deal):
-                await self.db_manager.guardar_oferta(deal)
-                sent_deals_count += 1
-                self.logger.info(f"Oferta enviada y guardada: {deal['titulo']} - Fuente: {deal['tag']}")
-            else:
-                self.logger.error(f"No se pudo enviar la oferta después de varios intentos: {deal['titulo']}")
-            
-            await asyncio.sleep(self.config.SEND_OFFER_INTERVAL_SECONDS)
-        
-        return sent_deals_count
+        self.logger.info(f"Ofertas antiguas eliminadas: {cleaned_count}")
+        return cleaned_count
 
     async def check_ofertas(self) -> None:
         """
-        Orquesta el proceso completo de buscar, filtrar, enviar y limpiar ofertas.
+        Ejecuta una pasada completa sobre todas las fuentes a través del pipeline:
+        cada fuente publica en cuanto termina su scraping y se espera a que todo
+        lo publicado se haya enviado y guardado antes de limpiar.
         """
         async with self.lock:
-            # 1. Scrape all sources
-            scraped_deals = await self._scrape_all_sources()
-            
-            # 2. Filter for new deals
-            new_deals = await self._filter_new_deals(scraped_deals)
-            
-            # 3. Process and send new deals
-            sent_count = await self._process_new_deals(new_deals)
-            
-            # 4. Clean up old deals from the database
-            cleaned_count = await self.db_manager.limpiar_ofertas_antiguas(
-                dias=self.config.DIAS_LIMPIEZA_OFERTAS_ANTIGUAS
+            self.pipeline.iniciar()
+            # Cada ejecución dispone de su propio cupo de MAX_OFERTAS_POR_EJECUCION
+            self.pipeline.nuevo_periodo()
+            enviadas_antes = self.pipeline.estadisticas['enviadas']
+
+            # 1-4. Scrape, dedup, selección, envío y persistencia en paralelo
+            nombres = [name for name, scraper_info in self.scrapers.items() if scraper_info["enabled"]]
+            resultados = await asyncio.gather(
+                *(self.procesar_fuente(nombre) for nombre in nombres), return_exceptions=True
             )
-            
-            # 5. Log summary
+            for nombre, resultado in zip(nombres, resultados):
+                if isinstance(resultado, Exception):
+                    self.logger.error(f"Error al procesar la fuente {nombre}: {resultado}", exc_info=resultado)
+            await self.pipeline.esperar_vacio()
+
+            # 5. Clean up old deals from the database
+            cleaned_count = await self.limpiar_ofertas_antiguas()
+
+            # 6. Log summary
             self.logger.info("Resumen de ejecución:")
-            self.logger.info(f"  - Ofertas enviadas en esta ejecución: {sent_count}")
+            self.logger.info(f"  - Ofertas enviadas en esta ejecución: {self.pipeline.estadisticas['enviadas'] - enviadas_antes}")
             self.logger.info(f"  - Ofertas antiguas eliminadas: {cleaned_count}")
 
     def seleccionar_ofertas_equilibradas(
-        self, *listas_de_ofertas: List[List[Dict[str, Any]]]
-    ) -> List[Dict[str, Any]]:
-        
-        ofertas_seleccionadas = []
-        listas_no_vacias = [lista for lista in listas_de_ofertas if lista]
-        
-        if not listas_no_vacias:
-            return []
+        self, ofertas_por_fuente: Dict[str, List[Deal]],
+        primeras_vistas: Optional[Dict[str, float]] = None, **presupuesto: Any
+    ) -> List[Deal]:
+        """
+        Elige hasta MAX_OFERTAS_POR_EJECUCION ofertas priorizando descuento y
+        frescura, con una cuota por fuente; se devuelven de mejor a peor.
+        `presupuesto` (limite, cuotas, rellenar) acota la elección a lo que
+        queda del periodo de selección; `primeras_vistas` fija la antigüedad.
+        """
+        return self.selector.seleccionar({fuente: lista for fuente, lista in ofertas_por_fuente.items() if lista},
+                                         primeras_vistas=primeras_vistas, **presupuesto)
 
-        max_ofertas = self.config.MAX_OFERTAS_POR_EJECUCION
-        num_fuentes = len(listas_no_vacias)
-        
-        # Iteradores para cada lista de ofertas
-        iteradores = [iter(lista) for lista in listas_no_vacias]
-        
-        while len(ofertas_seleccionadas) < max_ofertas:
-            ofertas_agregadas_en_ciclo = 0
-            for i in range(num_fuentes):
-                try:
-                    oferta = next(iteradores[i])
-                    if oferta not in ofertas_seleccionadas:
-                        ofertas_seleccionadas.append(oferta)
-                        ofertas_agregadas_en_ciclo += 1
-                        if len(ofertas_seleccionadas) == max_ofertas:
-                            break
-                except StopIteration:
-                    # Esta fuente no tiene más ofertas
-                    continue
-            
-            if ofertas_agregadas_en_ciclo == 0:
-                # No hay más ofertas nuevas en ninguna fuente
-                break
-        
-        random.shuffle(ofertas_seleccionadas)
-        return ofertas_seleccionadas
-        
-    async def enviar_oferta_con_reintento(self, oferta: Dict[str, Any]) -> bool:
+    async def enviar_oferta_con_reintento(self, oferta: Deal, chat_id: Optional[str] = None) -> bool:
+        chat_id = chat_id or self.config.CHANNEL_ID
         for intento in range(self.config.SEND_OFFER_MAX_RETRIES):
             try:
                 mensaje_formateado = self.formatear_mensaje_oferta(oferta)
-                if oferta.get('imagen') and oferta['imagen'] != 'No disponible':
+                await self.rate_limiter.esperar(chat_id)
+                if self.tiene_imagen(oferta):
                     await self.bot.send_photo(
-                        chat_id=self.config.CHANNEL_ID, 
-                        photo=oferta['imagen'], 
+                        chat_id=chat_id, 
+                        photo=oferta.imagen, 
                         caption=mensaje_formateado["text"], 
                         reply_markup=mensaje_formateado["reply_markup"],
                         parse_mode=mensaje_formateado["parse_mode"]
                     )
                 else:
                     await self.bot.send_message(
-                        chat_id=self.config.CHANNEL_ID, 
+                        chat_id=chat_id, 
                         text=mensaje_formateado["text"], 
                         reply_markup=mensaje_formateado["reply_markup"],
                         parse_mode=mensaje_formateado["parse_mode"]
                     )
                 return True
             except RetryAfter as e:
-                retry_time = int(e.retry_after) + 1
-                self.logger.warning(f"Límite de velocidad alcanzado. Esperando {retry_time} segundos.")
-                await asyncio.sleep(retry_time)
+                # La pausa es global: el resto de envíos también esperan
+                self.rate_limiter.pausar(int(e.retry_after) + 1)
             except (NetworkError, Conflict) as e:
                 self.logger.error(f"Error al enviar oferta (intento {intento + 1}/{self.config.SEND_OFFER_MAX_RETRIES}): {e}")
                 if intento < self.config.SEND_OFFER_MAX_RETRIES - 1:
                     await asyncio.sleep(self.config.SEND_OFFER_RETRY_SLEEP_SECONDS * (intento + 1))
             except Exception as e:
-                self.logger.error(f"Error inesperado al enviar oferta '{oferta.get('titulo')}': {e}", exc_info=True)
+                self.logger.error(f"Error inesperado al enviar oferta '{oferta.titulo}': {e}", exc_info=True)
                 return False
         return False
 
-    def formatear_mensaje_oferta(self, oferta: Dict[str, Any]) -> Dict[str, Any]:
+    def canales_para(self, oferta: Deal) -> List[str]:
+        """
+        Canales de destino según CHANNEL_ROUTES (por nombre de fuente, tag o '*');
+        sin ninguna ruta aplicable se usa CHANNEL_ID.
+        """
+        canales: List[str] = []
+        for clave in (oferta.fuente, oferta.tag, '*'):
+            destinos = self.config.CHANNEL_ROUTES.get(clave, []) if clave else []
+            for canal in [destinos] if isinstance(destinos, (str, int)) else destinos:
+                if str(canal) not in canales:
+                    canales.append(str(canal))
+        return canales or [self.config.CHANNEL_ID]
+
+    @staticmethod
+    def tiene_imagen(oferta: Deal) -> bool:
+        return bool(oferta.imagen) and oferta.imagen != 'No disponible'
+
+    async def enviar_album_con_reintento(self, ofertas: List[Deal], chat_id: Optional[str] = None) -> bool:
+        """
+        Envía varias ofertas con imagen como un único álbum (send_media_group)
+        seguido de un mensaje con un botón de enlace por oferta. Devuelve False
+        si no se pudo enviar, para que se recurra a los envíos individuales.
+        """
+        chat_id = chat_id or self.config.CHANNEL_ID
+        formato = self.formatear_album_ofertas(ofertas)
+        media = [
+            InputMediaPhoto(
+                media=oferta.imagen,
+                caption=formato["caption"] if i == 0 else None,
+                parse_mode=formato["parse_mode"] if i == 0 else None,
+            )
+            for i, oferta in enumerate(ofertas)
+        ]
+        album_enviado = False
+        for intento in range(self.config.SEND_OFFER_MAX_RETRIES):
+            try:
+                if not album_enviado:
+                    await self.rate_limiter.esperar(chat_id)
+                    await self.bot.send_media_group(chat_id=chat_id, media=media)
+                    album_enviado = True
+                await self.rate_limiter.esperar(chat_id)
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=formato["text"],
+                    reply_markup=formato["reply_markup"],
+                    parse_mode=formato["parse_mode"],
+                )
+                return True
+            except RetryAfter as e:
+                self.rate_limiter.pausar(int(e.retry_after) + 1)
+            except (NetworkError, Conflict) as e:
+                self.logger.error(f"Error al enviar álbum (intento {intento + 1}/{self.config.SEND_OFFER_MAX_RETRIES}): {e}")
+                if intento < self.config.SEND_OFFER_MAX_RETRIES - 1:
+                    await asyncio.sleep(self.config.SEND_OFFER_RETRY_SLEEP_SECONDS * (intento + 1))
+            except Exception as e:
+                # Típicamente una imagen que Telegram no acepta: se envían por separado
+                self.logger.warning(f"No se pudo enviar el álbum de {len(ofertas)} ofertas: {e}")
+                break
+        # Si el álbum ya salió, las ofertas se consideran publicadas aunque falten los enlaces
+        return album_enviado
+
+    def formatear_mensaje_oferta(self, oferta: Deal) -> Dict[str, Any]:
         emoji_map = {
             "#DealNews": "📰",
             "#Slickdeals": "🔥",
             "#DealsOfAmerica": "🇺🇸",
         }
-        emoji_tag = emoji_map.get(oferta['tag'], '✨')
+        emoji_tag = emoji_map.get(oferta.tag, '✨')
         
         # Usamos HTML para un formato más rico.
         mensaje = f"{emoji_tag} <b>¡NUEVA OFERTA!</b> {emoji_tag}\n\n"
-        mensaje += f"🔥 <b>{oferta['titulo']}</b>\n\n"
-        mensaje += f"💰 <b>Precio: {oferta['precio']}</b>\n"
+        mensaje += f"🔥 <b>{oferta.titulo}</b>\n\n"
+        mensaje += f"💰 <b>Precio: {oferta.precio}</b>"
+        if oferta.descuento:
+            mensaje += f" (-{oferta.descuento:.0f}%)"
+        mensaje += "\n"
+
+        if oferta.precio_original and oferta.precio_original != oferta.precio:
+            mensaje += f"💸 Antes: <del>{oferta.precio_original}</del>\n"
 
-        if oferta.get('precio_original') and oferta['precio_original'] != oferta['precio']:
-            mensaje += f"💸 Antes: <del>{oferta['precio_original']}</del>\n"
+        if oferta.precio_minimo_anterior:
+            mensaje += f"📉 <b>¡Bajó de precio!</b> Mínimo anterior: ${oferta.precio_minimo_anterior / 100:.2f}\n"
 
-        if oferta.get('cupon'):
-            mensaje += f"\n🎟️ <b>CUPÓN</b>: <code>{oferta['cupon']}</code>\n"
+        if oferta.cupon:
+            mensaje += f"\n🎟️ <b>CUPÓN</b>: <code>{oferta.cupon}</code>\n"
 
-        if oferta.get('info_cupon'):
-            info_cupon_texto = oferta['info_cupon'][:250]
+        if oferta.info_cupon:
+            info_cupon_texto = oferta.info_cupon[:250]
             mensaje += f"\nℹ️ <i>Info adicional: {info_cupon_texto}...</i>\n"
 
         # Crear el botón inline
-        keyboard = [[InlineKeyboardButton("🔗 Ver Oferta 🔗", url=oferta['link'])]]
+        keyboard = [[InlineKeyboardButton("🔗 Ver Oferta 🔗", url=oferta.link)]]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
         return {
@@ -378,11 +565,40 @@ class OfertasBot:
             "parse_mode": 'HTML'
         }
 
+    def formatear_album_ofertas(self, ofertas: List[Deal]) -> Dict[str, Any]:
+        # Leyenda compacta numerada; los enlaces van en un mensaje aparte porque
+        # los álbumes no admiten botones
+        lineas = []
+        for i, oferta in enumerate(ofertas, 1):
+            titulo = oferta.titulo if len(oferta.titulo) <= 80 else oferta.titulo[:77] + "..."
+            linea = f"{i}. {titulo} — <b>{oferta.precio}</b>"
+            if oferta.cupon:
+                linea += f" 🎟️ <code>{oferta.cupon}</code>"
+            lineas.append(linea)
+        caption = "🔥 <b>¡NUEVAS OFERTAS!</b> 🔥\n\n"
+        for linea in lineas:
+            # Límite de Telegram para la leyenda de un medio
+            if len(caption) + len(linea) + 1 > 1024:
+                break
+            caption += linea + "\n"
+
+        botones = [
+            InlineKeyboardButton(f"🔗 {i}", url=oferta.link) for i, oferta in enumerate(ofertas, 1)
+        ]
+        keyboard = [botones[i:i + 5] for i in range(0, len(botones), 5)]
+        return {
+            "caption": caption,
+            "text": "👆 Enlaces de las ofertas del álbum:",
+            "reply_markup": InlineKeyboardMarkup(keyboard),
+            "parse_mode": 'HTML',
+        }
+
     async def enviar_notificacion_error(self, error: Exception) -> None:
         mensaje = f"🚨 <b>Error en el bot de ofertas</b> 🚨\n\n"
         mensaje += f"Detalles del error:\n"
         mensaje += f"<code>{type(error).__name__}</code>: <code>{str(error)}</code>"
         try:
+            await self.rate_limiter.esperar(self.config.CHANNEL_ID)
             await self.bot.send_message(
                 chat_id=self.config.CHANNEL_ID, text=mensaje, parse_mode="HTML"
             )
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.deal import Deal
+
+
+class DealPipeline:
+    """
+    Pipeline productor/consumidor que desacopla el scraping del envío.
+    Etapas conectadas por colas acotadas (con contrapresión):
+
+        scrape -> dedup -> selección -> outbox -> envío -> persistencia
+
+    Los productores (las tareas de cada fuente) publican lo scrapeado y solo
+    esperan a que su lote pase la deduplicación; el envío y la persistencia
+    avanzan a su propio ritmo sin bloquear el siguiente scraping. Las ofertas
+    seleccionadas pasan por la outbox de la base de datos, de modo que el envío
+    se reanuda tras un reinicio y los fallos se reintentan con backoff.
+    """
+
+    def __init__(self, bot, tamano_cola: int = 100):
+        self.bot = bot
+        self.config = bot.config
+        self.logger = logging.getLogger("OfertasBot")
+        self.cola_scrapeadas: asyncio.Queue = asyncio.Queue(maxsize=max(1, len(bot.scrapers)) * 2)
+        self.cola_candidatas: asyncio.Queue = asyncio.Queue(maxsize=tamano_cola)
+        self.cola_persistencia: asyncio.Queue = asyncio.Queue(maxsize=tamano_cola)
+        # Identidades aceptadas que aún no se han enviado (o descartado)
+        self._en_curso: Set[str] = set()
+        self._casi_duplicados_en_curso = bot._crear_indice_casi_duplicados()
+        # Momento de publicación de las ofertas en la outbox, para medir la latencia
+        self._publicado: Dict[str, float] = {}
+        # Cupo de MAX_OFERTAS_POR_EJECUCION del periodo en curso, repartido entre lotes
+        self._inicio_periodo = time.monotonic()
+        self._seleccionadas_periodo: Dict[str, int] = {}
+        self._fuentes_periodo: Set[str] = set()
+        self._hay_envios = asyncio.Event()
+        self._outbox_inactivo = asyncio.Event()
+        self._tareas: List[asyncio.Task] = []
+        self.estadisticas = {
+            'publicadas': 0, 'nuevas': 0, 'descartadas': 0, 'enviadas': 0, 'albumes': 0, 'reintentos': 0, 'fallidas': 0
+        }
+        # Segundos entre la publicación de una oferta y su envío
+        self.latencias: deque = deque(maxlen=1000)
+
+    def iniciar(self) -> None:
+        if self._tareas:
+            return
+        etapas = {
+            'dedup': self._etapa_dedup,
+            'seleccion': self._etapa_seleccion,
+            'envio': self._etapa_envio,
+            'persistencia': self._etapa_persistencia,
+        }
+        self._tareas = [asyncio.create_task(etapa(), name=f"pipeline-{nombre}") for nombre, etapa in etapas.items()]
+
+    async def detener(self) -> None:
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        await self.bot.db_manager.vaciar_buffer()
+
+    async def publicar(self, fuente: str, ofertas: List[Deal]) -> int:
+        """Entrega lo scrapeado de una fuente y devuelve cuántas ofertas nuevas aportó."""
+        futuro = asyncio.get_running_loop().create_future()
+        self.estadisticas['publicadas'] += len(ofertas)
+        await self.cola_scrapeadas.put((fuente, ofertas, time.monotonic(), futuro))
+        return await futuro
+
+    async def esperar_vacio(self) -> None:
+        """
+        Espera a que todo lo publicado haya atravesado todas las etapas. Las
+        ofertas que esperan un reintento programado permanecen en la outbox.
+        """
+        for cola in (self.cola_scrapeadas, self.cola_candidatas):
+            await cola.join()
+        await self._outbox_inactivo.wait()
+        await self.cola_persistencia.join()
+
+    def nuevo_periodo(self) -> None:
+        """
+        Empieza un periodo de selección con el cupo completo. check_ofertas abre
+        uno por ejecución; con el scheduler se renueva cada SELECCION_PERIODO_SECONDS.
+        """
+        self._inicio_periodo = time.monotonic()
+        self._seleccionadas_periodo.clear()
+        self._fuentes_periodo.clear()
+
+    def _presupuesto_periodo(self, fuentes: Iterable[str]) -> Dict[str, Any]:
+        """
+        Límite, cupos por fuente y si se pueden rellenar huecos con lo que queda
+        del periodo. Los huecos solo se rellenan cuando todas las fuentes activas
+        han publicado: si no, la primera fuente en llegar agotaría el cupo.
+        """
+        if time.monotonic() - self._inicio_periodo >= self.config.SELECCION_PERIODO_SECONDS:
+            self.nuevo_periodo()
+        activas = {nombre for nombre, info in self.bot.scrapers.items() if info['enabled']} | set(fuentes)
+        cuota = self.bot.selector.cuota(len(activas))
+        return {
+            'limite': self.config.MAX_OFERTAS_POR_EJECUCION - sum(self._seleccionadas_periodo.values()),
+            'cuotas': {fuente: cuota - self._seleccionadas_periodo.get(fuente, 0) for fuente in fuentes},
+            'rellenar': activas <= self._fuentes_periodo,
+        }
+
+    def _liberar(self, identidad: str) -> None:
+        self._en_curso.discard(identidad)
+        self._publicado.pop(identidad, None)
+        self._casi_duplicados_en_curso.eliminar(identidad)
+
+    async def _etapa_dedup(self) -> None:
+        while True:
+            fuente, ofertas, publicado, futuro = await self.cola_scrapeadas.get()
+            try:
+                nuevas = (await self.bot._filter_new_deals({fuente: ofertas})).get(fuente, [])
+                aceptadas = []
+                for oferta in nuevas:
+                    identidad = oferta.identidad
+                    # Descarta ofertas ya en camino al canal, iguales o publicadas por otra fuente
+                    if (identidad in self._en_curso or self.bot.db_manager.en_outbox(identidad)
+                            or self._casi_duplicados_en_curso.buscar(oferta.titulo, fuente)):
+                        continue
+                    self._en_curso.add(identidad)
+                    self._casi_duplicados_en_curso.agregar(identidad, oferta.titulo, fuente)
+                    aceptadas.append(oferta)
+                self.estadisticas['nuevas'] += len(aceptadas)
+                if not futuro.done():
+                    futuro.set_result(len(aceptadas))
+                for oferta in aceptadas:
+                    await self.cola_candidatas.put((fuente, oferta, publicado))
+                self._fuentes_periodo.add(fuente)
+            except Exception as e:
+                self.logger.error(f"Error en la etapa de deduplicación ({fuente}): {e}", exc_info=True)
+                if not futuro.done():
+                    futuro.set_exception(e)
+            finally:
+                self.cola_scrapeadas.task_done()
+
+    async def _etapa_seleccion(self) -> None:
+        while True:
+            # Toma todas las candidatas disponibles y elige las mejores de forma equilibrada
+            # dentro de lo que queda del cupo del periodo
+            ventana = [await self.cola_candidatas.get()]
+            while not self.cola_candidatas.empty():
+                ventana.append(self.cola_candidatas.get_nowait())
+            try:
+                publicado_por_oferta = {oferta: publicado for _, oferta, publicado in ventana}
+                fuente_por_oferta = {oferta: fuente for fuente, oferta, _ in ventana}
+                por_fuente: Dict[str, List[Deal]] = {}
+                for fuente, oferta, _ in ventana:
+                    por_fuente.setdefault(fuente, []).append(oferta)
+                presupuesto = self._presupuesto_periodo(por_fuente)
+                primeras_vistas = await self.bot.db_manager.obtener_primeras_vistas(
+                    oferta.identidad for _, oferta, _ in ventana
+                )
+                seleccionadas = self.bot.seleccionar_ofertas_equilibradas(
+                    por_fuente, primeras_vistas=primeras_vistas, **presupuesto
+                )
+                conjunto_seleccionadas = set(seleccionadas)
+                for _, oferta, _ in ventana:
+                    if oferta not in conjunto_seleccionadas:
+                        # Se volverán a encontrar en un scraping posterior
+                        self._liberar(oferta.identidad)
+                        self.estadisticas['descartadas'] += 1
+                for oferta in seleccionadas:
+                    fuente = fuente_por_oferta[oferta]
+                    self._seleccionadas_periodo[fuente] = self._seleccionadas_periodo.get(fuente, 0) + 1
+                self.logger.info(
+                    f"Ofertas seleccionadas para enviar: {len(seleccionadas)} de {len(ventana)} candidatas "
+                    f"(cupo restante del periodo: {presupuesto['limite'] - len(seleccionadas)})"
+                )
+                if seleccionadas:
+                    for oferta in seleccionadas:
+                        self._publicado[oferta.identidad] = publicado_por_oferta[oferta]
+                    await self.bot.db_manager.encolar_outbox(seleccionadas)
+                    self._outbox_inactivo.clear()
+                    self._hay_envios.set()
+            except Exception as e:
+                self.logger.error(f"Error en la etapa de selección: {e}", exc_info=True)
+                for _, oferta, _ in ventana:
+                    self._liberar(oferta.identidad)
+            finally:
+                for _ in ventana:
+                    self.cola_candidatas.task_done()
+
+    async def _etapa_envio(self) -> None:
+        """Drena la outbox: envía lo que ya toca y espera al próximo intento programado."""
+        db = self.bot.db_manager
+        while True:
+            try:
+                self._hay_envios.clear()
+                pendientes = await db.obtener_outbox_pendientes(self.config.MAX_OFERTAS_POR_EJECUCION)
+                if not pendientes:
+                    if not self._hay_envios.is_set():
+                        self._outbox_inactivo.set()
+                    proximo = await db.proximo_intento_outbox()
+                    espera = None if proximo is None else max(1.0, proximo - time.time())
+                    try:
+                        await asyncio.wait_for(self._hay_envios.wait(), timeout=espera)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._outbox_inactivo.clear()
+                entregados = await db.canales_entregados([identidad for identidad, _, _ in pendientes])
+                entradas = []
+                for identidad, oferta, intentos in pendientes:
+                    # Solo los canales de destino que aún no recibieron la oferta
+                    canales = tuple(
+                        canal for canal in self.bot.canales_para(oferta)
+                        if canal not in entregados.get(identidad, ())
+                    )
+                    entradas.append((identidad, oferta, intentos, canales))
+                for grupo in self._agrupar_envios(entradas):
+                    if len(grupo) > 1:
+                        await self._enviar_album_desde_outbox(grupo)
+                    else:
+                        await self._enviar_desde_outbox(*grupo[0])
+            except Exception as e:
+                self.logger.error(f"Error en la etapa de envío: {e}", exc_info=True)
+                await asyncio.sleep(self.config.SEND_OFFER_RETRY_SLEEP_SECONDS)
+
+    def _agrupar_envios(self, entradas: List[tuple]) -> List[List[tuple]]:
+        """
+        Con ALBUM_BATCHING, reúne en álbumes las ofertas con imagen que van a los
+        mismos canales; el resto va suelto.
+        """
+        if not self.config.ALBUM_BATCHING:
+            return [[entrada] for entrada in entradas]
+        por_canales: Dict[tuple, List[tuple]] = {}
+        sueltas = []
+        for entrada in entradas:
+            if self.bot.tiene_imagen(entrada[1]) and entrada[3]:
+                por_canales.setdefault(entrada[3], []).append(entrada)
+            else:
+                sueltas.append([entrada])
+        tamano = max(1, self.config.ALBUM_MAX_OFERTAS)
+        grupos = [
+            con_imagen[i:i + tamano]
+            for con_imagen in por_canales.values()
+            for i in range(0, len(con_imagen), tamano)
+        ]
+        return grupos + sueltas
+
+    def _marcar_en_curso(self, identidad: str, oferta: Deal) -> None:
+        if identidad not in self._en_curso:
+            # Entrada recuperada tras un reinicio
+            self._en_curso.add(identidad)
+            self._casi_duplicados_en_curso.agregar(
+                identidad, oferta.titulo, oferta.fuente or oferta.tag.replace('#', '').lower()
+            )
+
+    async def _registrar_envio(self, identidad: str, oferta: Deal) -> None:
+        await self.bot.db_manager.marcar_outbox_enviada(identidad)
+        self.estadisticas['enviadas'] += 1
+        publicado = self._publicado.pop(identidad, None)
+        if publicado is not None:
+            self.latencias.append(time.monotonic() - publicado)
+        self.logger.info(f"Oferta enviada: {oferta.titulo} - Fuente: {oferta.tag}")
+        # Solo se registra tras una entrega exitosa
+        await self.cola_persistencia.put(oferta)
+
+    async def _difundir(self, canales: Iterable[str], enviar: Callable[[str], Awaitable[bool]]) -> Dict[str, bool]:
+        """Envía a todos los canales a la vez; cada canal consume su propio límite de velocidad."""
+        canales = list(canales)
+        resultados = await asyncio.gather(*(enviar(canal) for canal in canales), return_exceptions=True)
+        entregas = {}
+        for canal, resultado in zip(canales, resultados):
+            if isinstance(resultado, Exception):
+                self.logger.error(f"Error al enviar al canal {canal}: {resultado}", exc_info=resultado)
+            entregas[canal] = resultado is True
+        return entregas
+
+    async def _enviar_album_desde_outbox(self, grupo: List[tuple]) -> None:
+        db = self.bot.db_manager
+        for identidad, oferta, _, _ in grupo:
+            self._marcar_en_curso(identidad, oferta)
+        ofertas = [oferta for _, oferta, _, _ in grupo]
+        canales = grupo[0][3]
+        entregas = await self._difundir(canales, lambda canal: self.bot.enviar_album_con_reintento(ofertas, canal))
+        for identidad, _, _, _ in grupo:
+            await db.registrar_entregas(identidad, entregas)
+        if any(entregas.values()):
+            self.estadisticas['albumes'] += 1
+        # Los canales donde falló el álbum reciben las ofertas por separado
+        pendientes = tuple(canal for canal in canales if not entregas[canal])
+        for identidad, oferta, intentos, _ in grupo:
+            await self._enviar_desde_outbox(identidad, oferta, intentos, pendientes)
+
+    async def _enviar_desde_outbox(self, identidad: str, oferta: Deal, intentos: int,
+                                   canales: Tuple[str, ...]) -> None:
+        db = self.bot.db_manager
+        self._marcar_en_curso(identidad, oferta)
+        entregas = await self._difundir(canales, lambda canal: self.bot.enviar_oferta_con_reintento(oferta, canal))
+        if entregas:
+            await db.registrar_entregas(identidad, entregas)
+        fallidos = [canal for canal, entregada in entregas.items() if not entregada]
+        if not fallidos:
+            await self._registrar_envio(identidad, oferta)
+        elif await db.reprogramar_outbox(identidad, intentos, f"no se pudo enviar a: {', '.join(fallidos)}"):
+            self.estadisticas['reintentos'] += 1
+            self.logger.warning(f"Envío fallido en {len(fallidos)} canal(es), se reintentará más tarde: {oferta.titulo}")
+        else:
+            self.estadisticas['fallidas'] += 1
+            self._liberar(identidad)
+            self.logger.error(f"No se pudo enviar la oferta tras {intentos + 1} intentos: {oferta.titulo}")
+
+    async def _etapa_persistencia(self) -> None:
+        while True:
+            oferta = await self.cola_persistencia.get()
+            try:
+                identidad = oferta.identidad
+                await self.bot.db_manager.encolar_oferta(oferta)
+                self.bot.casi_duplicados.agregar(
+                    identidad, oferta.titulo, oferta.fuente or oferta.tag.replace('#', '').lower()
+                )
+                self._liberar(identidad)
+                # Sin más envíos pendientes, se persiste el lote en una única transacción
+                if self.cola_persistencia.empty():
+                    guardadas = await self.bot.db_manager.vaciar_buffer()
+                    if guardadas:
+                        self.logger.info(f"Se guardaron {guardadas} ofertas enviadas en la base de datos.")
+            except Exception as e:
+                self.logger.error(f"Error al persistir la oferta '{oferta.titulo}': {e}", exc_info=True)
+            finally:
+                self.cola_persistencia.task_done()
+
+    def percentil_latencia(self, percentil: float) -> Optional[float]:
+        if not self.latencias:
+            return None
+        ordenadas = sorted(self.latencias)
+        indice = min(len(ordenadas) - 1, int(round(percentil / 100 * (len(ordenadas) - 1))))
+        return ordenadas[indice]
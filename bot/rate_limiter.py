@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from typing import Union
+
+from cachetools import TTLCache
+
+
+class TokenBucket:
+    """Cubeta de tokens asíncrona: `tasa` tokens por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, capacidad: float, tasa: float):
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self.tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _rellenar(self) -> None:
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    async def adquirir(self) -> None:
+        # El lock mantiene el orden de llegada entre las corrutinas que esperan
+        async with self._lock:
+            while True:
+                self._rellenar()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+
+class TelegramRateLimiter:
+    """
+    Limitador compartido para todas las llamadas que envían mensajes a Telegram.
+    Aplica el límite global del bot y uno por chat (más estricto en grupos y
+    canales que en chats privados). Un `RetryAfter` pausa todos los envíos
+    durante el tiempo que indica Telegram.
+    """
+
+    def __init__(self, global_por_segundo: float = 30, grupo_por_minuto: float = 20,
+                 privado_por_segundo: float = 1, rafaga_chat: float = 3):
+        self.global_bucket = TokenBucket(capacidad=global_por_segundo, tasa=global_por_segundo)
+        self.grupo_por_minuto = grupo_por_minuto
+        self.privado_por_segundo = privado_por_segundo
+        self.rafaga_chat = rafaga_chat
+        self._buckets_chat: TTLCache = TTLCache(maxsize=1000, ttl=3600)
+        self._pausa_hasta = 0.0
+        self.logger = logging.getLogger("OfertasBot")
+
+    @staticmethod
+    def _es_grupo_o_canal(chat_id: Union[int, str]) -> bool:
+        chat = str(chat_id)
+        return chat.startswith('-') or chat.startswith('@')
+
+    def _bucket_chat(self, chat_id: Union[int, str]) -> TokenBucket:
+        clave = str(chat_id)
+        bucket = self._buckets_chat.get(clave)
+        if bucket is None:
+            if self._es_grupo_o_canal(chat_id):
+                bucket = TokenBucket(capacidad=self.rafaga_chat, tasa=self.grupo_por_minuto / 60)
+            else:
+                bucket = TokenBucket(capacidad=self.rafaga_chat, tasa=self.privado_por_segundo)
+            self._buckets_chat[clave] = bucket
+        return bucket
+
+    def pausar(self, segundos: float) -> None:
+        """Pausa globalmente los envíos (p. ej. tras un RetryAfter de Telegram)."""
+        hasta = time.monotonic() + segundos
+        if hasta > self._pausa_hasta:
+            self._pausa_hasta = hasta
+            self.logger.warning(f"Límite de velocidad de Telegram: envíos pausados {segundos:.0f} segundos.")
+
+    async def esperar(self, chat_id: Union[int, str]) -> None:
+        """Espera hasta que se pueda enviar un mensaje al chat sin superar los límites."""
+        await self._bucket_chat(chat_id).adquirir()
+        while True:
+            restante = self._pausa_hasta - time.monotonic()
+            if restante <= 0:
+                break
+            await asyncio.sleep(restante)
+        await self.global_bucket.adquirir()
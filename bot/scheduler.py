@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class FuenteProgramada:
+    __slots__ = ('nombre', 'intervalo', 'minimo', 'maximo', 'ultima_ejecucion', 'ultimo_rendimiento')
+
+    def __init__(self, nombre: str, intervalo: float, minimo: float, maximo: float):
+        self.nombre = nombre
+        self.minimo = minimo
+        self.maximo = maximo
+        self.intervalo = min(max(intervalo, minimo), maximo)
+        self.ultima_ejecucion: Optional[float] = None
+        self.ultimo_rendimiento: Optional[int] = None
+
+
+class SourceScheduler:
+    """
+    Ejecuta cada fuente en su propia tarea con un intervalo independiente.
+    El intervalo se adapta al rendimiento de cada ejecución: se acorta cuando
+    la fuente trae ofertas nuevas y se alarga cuando no trae nada o falla,
+    siempre dentro de los límites [minimo, maximo] de la fuente.
+    """
+
+    def __init__(self, ejecutar: Callable[[str], Awaitable[int]],
+                 esta_habilitada: Callable[[str], bool],
+                 factor_aceleracion: float = 0.5, factor_frenado: float = 1.5,
+                 al_fallar: Optional[Callable[[str, Exception], Awaitable[None]]] = None):
+        self.ejecutar = ejecutar
+        self.esta_habilitada = esta_habilitada
+        self.factor_aceleracion = factor_aceleracion
+        self.factor_frenado = factor_frenado
+        self.al_fallar = al_fallar
+        self.fuentes: Dict[str, FuenteProgramada] = {}
+        self._tareas: Dict[str, asyncio.Task] = {}
+        self.logger = logging.getLogger("OfertasBot")
+
+    def agregar_fuente(self, nombre: str, intervalo: float, minimo: float, maximo: float) -> None:
+        self.fuentes[nombre] = FuenteProgramada(nombre, intervalo, minimo, maximo)
+
+    def ajustar_intervalo(self, nombre: str, nuevas: Optional[int]) -> float:
+        """Recalcula el intervalo de la fuente; `nuevas` es None si la ejecución falló."""
+        fuente = self.fuentes[nombre]
+        fuente.ultimo_rendimiento = nuevas
+        if nuevas:
+            fuente.intervalo = max(fuente.minimo, fuente.intervalo * self.factor_aceleracion)
+        else:
+            fuente.intervalo = min(fuente.maximo, fuente.intervalo * self.factor_frenado)
+        return fuente.intervalo
+
+    async def _bucle_fuente(self, nombre: str) -> None:
+        fuente = self.fuentes[nombre]
+        while True:
+            if not self.esta_habilitada(nombre):
+                await asyncio.sleep(fuente.minimo)
+                continue
+
+            fuente.ultima_ejecucion = time.time()
+            try:
+                nuevas = await self.ejecutar(nombre)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                nuevas = None
+                self.logger.error(f"Error al procesar la fuente {nombre}: {e}", exc_info=True)
+                if self.al_fallar:
+                    await self.al_fallar(nombre, e)
+
+            intervalo = self.ajustar_intervalo(nombre, nuevas)
+            self.logger.info(
+                f"Fuente {nombre}: {nuevas if nuevas is not None else 'error'} ofertas nuevas; "
+                f"próxima ejecución en {intervalo:.0f} segundos."
+            )
+            await asyncio.sleep(intervalo)
+
+    def iniciar(self) -> None:
+        for nombre in self.fuentes:
+            if nombre not in self._tareas or self._tareas[nombre].done():
+                self._tareas[nombre] = asyncio.create_task(self._bucle_fuente(nombre), name=f"fuente-{nombre}")
+
+    async def detener(self) -> None:
+        for tarea in self._tareas.values():
+            tarea.cancel()
+        await asyncio.gather(*self._tareas.values(), return_exceptions=True)
+        self._tareas.clear()
+
+    def estado(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            nombre: {
+                'intervalo': fuente.intervalo,
+                'ultima_ejecucion': fuente.ultima_ejecucion,
+                'ultimo_rendimiento': fuente.ultimo_rendimiento,
+            }
+            for nombre, fuente in self.fuentes.items()
+        }
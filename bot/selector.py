@@ -0,0 +1,84 @@
+import heapq
+import math
+import time
+from typing import Dict, Iterable, List, Optional
+
+from utils.deal import Deal
+
+
+class DealSelector:
+    """
+    Selección top-K de ofertas por puntuación (descuento y frescura) con cuotas
+    por fuente para que ninguna acapare el envío. Usa montículos acotados, así
+    que cuesta O(n log k) aunque el conjunto de candidatas sea grande.
+    """
+
+    def __init__(self, max_ofertas: int, cuota_por_fuente: int = 0, peso_descuento: float = 1.0,
+                 peso_frescura: float = 0.5, vida_media_segundos: float = 6 * 3600,
+                 descuento_desconocido: float = 10.0):
+        self.max_ofertas = max_ofertas
+        # 0 = reparto equitativo entre las fuentes con candidatas
+        self.cuota_por_fuente = cuota_por_fuente
+        self.peso_descuento = peso_descuento
+        self.peso_frescura = peso_frescura
+        self.vida_media_segundos = vida_media_segundos
+        self.descuento_desconocido = descuento_desconocido
+
+    def puntuar(self, oferta: Deal, ahora: float, primera_vista: Optional[float] = None) -> float:
+        descuento = oferta.descuento if oferta.descuento is not None else self.descuento_desconocido
+        # La frescura cuenta desde la primera vez que se vio la oferta; el timestamp es el del scraping
+        edad = max(0.0, ahora - (oferta.timestamp if primera_vista is None else primera_vista))
+        frescura = 0.5 ** (edad / self.vida_media_segundos) if self.vida_media_segundos > 0 else 1.0
+        return self.peso_descuento * min(descuento, 100.0) / 100 + self.peso_frescura * frescura
+
+    def cuota(self, num_fuentes: int) -> int:
+        """Cupo de cada fuente cuando compiten `num_fuentes` fuentes."""
+        return self.cuota_por_fuente or math.ceil(self.max_ofertas / max(1, num_fuentes))
+
+    def seleccionar(self, ofertas_por_fuente: Dict[str, Iterable[Deal]], ahora: Optional[float] = None,
+                    limite: Optional[int] = None, cuotas: Optional[Dict[str, int]] = None,
+                    rellenar: bool = True, primeras_vistas: Optional[Dict[str, float]] = None) -> List[Deal]:
+        """
+        Devuelve hasta `limite` (por defecto `max_ofertas`) ofertas distintas, de
+        mayor a menor puntuación. `cuotas` da el cupo que le queda a cada fuente
+        (por defecto, `cuota` entre las fuentes con candidatas); con reparto
+        equitativo y `rellenar`, los huecos se cubren con las mejores restantes.
+        `primeras_vistas` (identidad -> timestamp) fija la edad de las ofertas ya vistas.
+        """
+        ahora = time.time() if ahora is None else ahora
+        primeras_vistas = primeras_vistas or {}
+        limite = self.max_ofertas if limite is None else limite
+        candidatas: Dict[str, List[tuple]] = {}
+        vistas = set()
+        orden = 0
+        for fuente, ofertas in ofertas_por_fuente.items():
+            puntuadas = []
+            for oferta in ofertas:
+                if oferta in vistas:
+                    continue
+                vistas.add(oferta)
+                # El orden de llegada desempata sin comparar ofertas
+                orden -= 1
+                primera_vista = primeras_vistas.get(oferta.identidad)
+                puntuadas.append((self.puntuar(oferta, ahora, primera_vista), orden, oferta))
+            if puntuadas:
+                candidatas[fuente] = puntuadas
+        if not candidatas or limite <= 0:
+            return []
+
+        cuota = self.cuota(len(candidatas))
+        elegidas: List[tuple] = []
+        for fuente, puntuadas in candidatas.items():
+            elegidas.extend(heapq.nlargest(cuota if cuotas is None else cuotas.get(fuente, cuota), puntuadas))
+        elegidas = heapq.nlargest(limite, elegidas)
+
+        # Huecos que dejan las fuentes con pocas candidatas: los mejores restantes
+        faltan = limite - len(elegidas)
+        if faltan > 0 and rellenar and not self.cuota_por_fuente:
+            ya_elegidas = {oferta for _, _, oferta in elegidas}
+            restantes = (
+                entrada for puntuadas in candidatas.values() for entrada in puntuadas
+                if entrada[2] not in ya_elegidas
+            )
+            elegidas = sorted(elegidas + heapq.nlargest(faltan, restantes), reverse=True)
+        return [oferta for _, _, oferta in elegidas]
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,16 +7,50 @@ load_dotenv()
 class Config:
     TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     CHANNEL_ID = os.getenv('TELEGRAM_CHANNEL_ID')
+    # Rutas de publicación: {"slickdeals": ["@canal_a"], "#DealNews": ["@canal_b"], "*": ["@todas"]}
+    CHANNEL_ROUTES = json.loads(os.getenv('CHANNEL_ROUTES', '{}'))
     DATABASE = os.getenv('DATABASE_NAME', 'ofertas.db')
     USER_ID = os.getenv('TELEGRAM_USER_ID')
     OFERTA_COOLDOWN = int(os.getenv('OFERTA_COOLDOWN', 72 * 3600))  # 72 horas por defecto
 
     # Bot settings
     MAX_OFERTAS_POR_EJECUCION = int(os.getenv('MAX_OFERTAS_POR_EJECUCION', 20))
-    LOOP_INTERVAL_SECONDS = int(os.getenv('LOOP_INTERVAL_SECONDS', 1200)) # 20 minutes
-    SEND_OFFER_INTERVAL_SECONDS = int(os.getenv('SEND_OFFER_INTERVAL_SECONDS', 5))
+    LOOP_INTERVAL_SECONDS = int(os.getenv('LOOP_INTERVAL_SECONDS', 1200)) # 20 minutes, intervalo inicial por fuente
+    LIMPIEZA_INTERVAL_SECONDS = int(os.getenv('LIMPIEZA_INTERVAL_SECONDS', 1200))
     SEND_OFFER_MAX_RETRIES = int(os.getenv('SEND_OFFER_MAX_RETRIES', 3))
     SEND_OFFER_RETRY_SLEEP_SECONDS = int(os.getenv('SEND_OFFER_RETRY_SLEEP_SECONDS', 5))
+    # Selección de ofertas: puntuación por descuento y frescura con cuota por fuente
+    SELECCION_CUOTA_POR_FUENTE = int(os.getenv('SELECCION_CUOTA_POR_FUENTE', 0))  # 0 = reparto equitativo
+    SELECCION_PESO_DESCUENTO = float(os.getenv('SELECCION_PESO_DESCUENTO', 1.0))
+    SELECCION_PESO_FRESCURA = float(os.getenv('SELECCION_PESO_FRESCURA', 0.5))
+    SELECCION_VIDA_MEDIA_SECONDS = float(os.getenv('SELECCION_VIDA_MEDIA_SECONDS', 6 * 3600))
+    # Periodo al que se aplica MAX_OFERTAS_POR_EJECUCION cuando las fuentes publican por su cuenta (scheduler)
+    SELECCION_PERIODO_SECONDS = int(os.getenv('SELECCION_PERIODO_SECONDS', LOOP_INTERVAL_SECONDS))
+    # Agrupar ofertas con imagen en álbumes (send_media_group) de 2 a 10 ofertas
+    ALBUM_BATCHING = os.getenv('ALBUM_BATCHING', 'false').lower() == 'true'
+    ALBUM_MAX_OFERTAS = min(10, int(os.getenv('ALBUM_MAX_OFERTAS', 10)))
+
+    # Scheduler settings (intervalo adaptativo por fuente)
+    SCHEDULER_MIN_INTERVAL_SECONDS = int(os.getenv('SCHEDULER_MIN_INTERVAL_SECONDS', 300))
+    SCHEDULER_MAX_INTERVAL_SECONDS = int(os.getenv('SCHEDULER_MAX_INTERVAL_SECONDS', 3600))
+    SCHEDULER_FACTOR_ACELERACION = float(os.getenv('SCHEDULER_FACTOR_ACELERACION', 0.5))
+    SCHEDULER_FACTOR_FRENADO = float(os.getenv('SCHEDULER_FACTOR_FRENADO', 1.5))
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))
+
+    # Near-duplicate detection settings (MinHash + LSH sobre títulos)
+    # Umbral elegido con python -m benchmarks.bench_near_duplicates (pares de títulos etiquetados)
+    NEAR_DUP_UMBRAL = float(os.getenv('NEAR_DUP_UMBRAL', 0.6))
+    NEAR_DUP_PERMUTACIONES = int(os.getenv('NEAR_DUP_PERMUTACIONES', 128))
+    NEAR_DUP_BANDAS = int(os.getenv('NEAR_DUP_BANDAS', 32))
+
+    # Telegram rate limit settings (límites documentados de la Bot API)
+    TELEGRAM_GLOBAL_MSG_POR_SEGUNDO = float(os.getenv('TELEGRAM_GLOBAL_MSG_POR_SEGUNDO', 30))
+    TELEGRAM_GRUPO_MSG_POR_MINUTO = float(os.getenv('TELEGRAM_GRUPO_MSG_POR_MINUTO', 20))  # grupos y canales
+    TELEGRAM_PRIVADO_MSG_POR_SEGUNDO = float(os.getenv('TELEGRAM_PRIVADO_MSG_POR_SEGUNDO', 1))
+    TELEGRAM_RAFAGA_POR_CHAT = float(os.getenv('TELEGRAM_RAFAGA_POR_CHAT', 3))
+
+    # URL base de la Bot API (el token se añade detrás); permite apuntar a un servidor local de pruebas
+    TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL', 'https://api.telegram.org/bot')
 
     # Telegram polling settings
     TELEGRAM_POLLING_TIMEOUT = int(os.getenv('TELEGRAM_POLLING_TIMEOUT', 30))  # segundos
@@ -24,6 +59,28 @@ class Config:
 
     # Database settings
     DIAS_LIMPIEZA_OFERTAS_ANTIGUAS = int(os.getenv('DIAS_LIMPIEZA_OFERTAS_ANTIGUAS', 30))
+    LIMPIEZA_LOTE_TAMANO = int(os.getenv('LIMPIEZA_LOTE_TAMANO', 500))
+    LIMPIEZA_MAX_LOTES = int(os.getenv('LIMPIEZA_MAX_LOTES', 20))
+    DEDUP_CACHE_MAX_IDS = int(os.getenv('DEDUP_CACHE_MAX_IDS', 50000))
+    BLOOM_CAPACIDAD = int(os.getenv('BLOOM_CAPACIDAD', 100000))
+    BLOOM_TASA_ERROR = float(os.getenv('BLOOM_TASA_ERROR', 0.01))
+    DB_WRITE_BUFFER_SIZE = int(os.getenv('DB_WRITE_BUFFER_SIZE', 20))
+    DB_WRITE_BUFFER_MAX_SECONDS = float(os.getenv('DB_WRITE_BUFFER_MAX_SECONDS', 60))
+    HISTORIAL_PRECIOS_DIAS = int(os.getenv('HISTORIAL_PRECIOS_DIAS', 90))
+    BAJADA_PRECIO_MARGEN = float(os.getenv('BAJADA_PRECIO_MARGEN', 0.10))  # 0 = no republicar por bajada
+    OUTBOX_MAX_INTENTOS = int(os.getenv('OUTBOX_MAX_INTENTOS', 8))
+    OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv('OUTBOX_BACKOFF_BASE_SECONDS', 30))
+    OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+
+    # Scraping settings
+    HTTP_CACHE_FILE = os.getenv('HTTP_CACHE_FILE', 'http_cache.json')
+    HTML_PARSER_BACKEND = os.getenv('HTML_PARSER_BACKEND', 'auto')  # auto, selectolax, lxml, html.parser
+    PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 2))  # 0 = parsear en un hilo
+
+    # Browser settings (Playwright)
+    BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', 'true').lower() == 'true'
+    BROWSER_MAX_PAGINAS = int(os.getenv('BROWSER_MAX_PAGINAS', 50))  # reciclar tras N páginas (0 = nunca)
+    BROWSER_MAX_RSS_MB = int(os.getenv('BROWSER_MAX_RSS_MB', 800))  # reciclar por memoria (0 = nunca, requiere psutil)
 
     # Logging settingss
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -37,6 +94,7 @@ class Config:
             "name": "slickdeals",
             "url": os.getenv('SLICKDEALS_URL', 'https://slickdeals.net/'),
             "tag": "#Slickdeals",
+            "timeout": float(os.getenv('SLICKDEALS_TIMEOUT', 30)),
             "enabled": True
         },
         {
@@ -45,6 +103,7 @@ class Config:
             "name": "dealnews",
             "url": os.getenv('DEALSNEWS_URL', 'https://www.dealnews.com/'),
             "tag": "#DealNews",
+            "timeout": float(os.getenv('DEALSNEWS_TIMEOUT', 30)),
             "enabled": True
         },
         {
@@ -53,6 +112,12 @@ class Config:
             "name": "dealsofamerica",
             "url": os.getenv('DEALSOFAMERICA_URL', 'https://www.dealsofamerica.com/'),
             "tag": "#DealsOfAmerica",
+            "timeout": float(os.getenv('DEALSOFAMERICA_TIMEOUT', 90)),
+            "options": {
+                "modo_ligero": os.getenv('PLAYWRIGHT_LEAN_MODE', 'true').lower() == 'true',
+                "estado_navegador": os.getenv('PLAYWRIGHT_STORAGE_STATE', 'playwright_state.json'),
+                "extraccion_dom": os.getenv('DEALSOFAMERICA_DOM_EXTRACTION', 'true').lower() == 'true',
+            },
             "enabled": True
         }
     ]
@@ -0,0 +1,38 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom compacto sobre un bytearray. Responde "seguro que no está"
+    o "probablemente está" con una tasa de falsos positivos acotada.
+    """
+
+    def __init__(self, capacidad: int, tasa_error: float = 0.01, bits: bytes | None = None):
+        self.capacidad = capacidad
+        self.tasa_error = tasa_error
+        self.num_bits = max(8, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        tamano = (self.num_bits + 7) // 8
+        if bits is not None and len(bits) == tamano:
+            self.bits = bytearray(bits)
+        else:
+            self.bits = bytearray(tamano)
+
+    def _posiciones(self, clave: str):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un único digest
+        digest = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, clave: str) -> None:
+        for pos in self._posiciones(clave):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, clave: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(clave))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
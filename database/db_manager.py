@@ -1,15 +1,125 @@
 import aiosqlite
-import hashlib
+import asyncio
+import json
 import time
 import logging
-from typing import Dict, Any, List
+from cachetools import TLRUCache
+from .bloom_filter import BloomFilter
+from utils.deal import Deal
+from utils.prices import parsear_precio
+from typing import Dict, Any, List, Optional, Iterable, Tuple
 
 class DBManager:
-    def __init__(self, database: str):
+    # PRAGMAs aplicados a la conexión persistente. WAL permite lecturas concurrentes
+    # con una escritura y, junto con synchronous=NORMAL, evita un fsync por cada commit.
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-8000",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    # Migraciones de esquema, aplicadas en orden y registradas en PRAGMA user_version
+    MIGRACIONES = (
+        (1, (
+            "CREATE INDEX IF NOT EXISTS idx_ofertas_timestamp ON ofertas (timestamp)",
+        )),
+        (2, (
+            "ALTER TABLE ofertas ADD COLUMN fuente TEXT",
+            "UPDATE ofertas SET fuente = lower(replace(tag, '#', '')) WHERE fuente IS NULL",
+            "CREATE INDEX IF NOT EXISTS idx_ofertas_fuente_timestamp ON ofertas (fuente, timestamp)",
+        )),
+        (3, (
+            "CREATE TABLE IF NOT EXISTS filtro_bloom ("
+            "nombre TEXT PRIMARY KEY, capacidad INTEGER, tasa_error REAL, datos BLOB, creado INTEGER)",
+        )),
+        (4, (
+            "ALTER TABLE ofertas ADD COLUMN identidad TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_ofertas_identidad ON ofertas (identidad)",
+        )),
+        (5, (
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "identidad TEXT PRIMARY KEY, oferta TEXT NOT NULL, estado TEXT NOT NULL, "
+            "intentos INTEGER NOT NULL DEFAULT 0, proximo_intento INTEGER NOT NULL, "
+            "creado INTEGER NOT NULL, ultimo_error TEXT)",
+            "CREATE INDEX IF NOT EXISTS idx_outbox_estado_proximo ON outbox (estado, proximo_intento)",
+        )),
+        (6, (
+            "CREATE TABLE IF NOT EXISTS entregas ("
+            "identidad TEXT NOT NULL, canal TEXT NOT NULL, entregada INTEGER NOT NULL, "
+            "intentos INTEGER NOT NULL DEFAULT 1, actualizado INTEGER NOT NULL, "
+            "PRIMARY KEY (identidad, canal))",
+        )),
+        (7, (
+            "CREATE TABLE IF NOT EXISTS historial_precios ("
+            "identidad TEXT NOT NULL, precio_centavos INTEGER NOT NULL, fuente TEXT, timestamp INTEGER NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS idx_historial_precios_identidad_timestamp "
+            "ON historial_precios (identidad, timestamp)",
+        )),
+        (8, (
+            "ALTER TABLE filtro_bloom ADD COLUMN guardado INTEGER",
+        )),
+    )
+
+    # Estados de la outbox: pendiente de envío, enviada (pendiente de registrar en
+    # ofertas) y fallida tras agotar los intentos
+    OUTBOX_PENDIENTE = 'pendiente'
+    OUTBOX_ENVIADA = 'enviada'
+    OUTBOX_FALLIDA = 'fallida'
+
+    def __init__(self, database: str, buffer_max_ofertas: int = 20, buffer_max_segundos: float = 60.0,
+                 limpieza_lote: int = 500, limpieza_max_lotes: int = 20,
+                 cooldown_segundos: int = 72 * 3600, cache_max_ids: int = 50000,
+                 retencion_dias: int = 30, bloom_capacidad: int = 100000, bloom_tasa_error: float = 0.01,
+                 outbox_max_intentos: int = 8, outbox_backoff_base: float = 30.0,
+                 outbox_backoff_max: float = 3600.0, historial_precios_dias: int = 90):
         self.database = database
+        self.retencion_dias = retencion_dias
+        self.bloom_capacidad = bloom_capacidad
+        self.bloom_tasa_error = bloom_tasa_error
+        self._bloom: Optional[BloomFilter] = None
+        self._bloom_creado = 0
+        # Identidades guardadas mientras se reconstruye el filtro (None si no hay reconstrucción)
+        self._bloom_pendientes: Optional[set] = None
+        self.cooldown_segundos = cooldown_segundos
+        # Caché de IDs enviados: el valor es el timestamp de envío y cada entrada
+        # expira cuando se cumple el cooldown contado desde ese momento.
+        self._ids_recientes = TLRUCache(
+            maxsize=cache_max_ids,
+            ttu=lambda _id, enviado, _ahora: enviado + self.cooldown_segundos,
+            timer=time.time,
+        )
+        # Límites del barrido incremental de retención
+        self.limpieza_lote = limpieza_lote
+        self.limpieza_max_lotes = limpieza_max_lotes
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        # Buffer de escritura diferida para ofertas ya enviadas
+        self.buffer_max_ofertas = buffer_max_ofertas
+        self.buffer_max_segundos = buffer_max_segundos
+        self._buffer: List[Deal] = []
+        self._buffer_desde = 0.0
+        # Outbox persistente de mensajes pendientes de enviar
+        self.outbox_max_intentos = outbox_max_intentos
+        self.outbox_backoff_base = outbox_backoff_base
+        self.outbox_backoff_max = outbox_backoff_max
+        self._ids_outbox: set = set()
+        # Ventana del historial de precios usada para detectar bajadas
+        self.historial_precios_dias = historial_precios_dias
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """Devuelve la conexión persistente, abriéndola si aún no existe."""
+        if self._conn is None:
+            self._conn = await aiosqlite.connect(self.database)
+            for pragma in self.PRAGMAS:
+                await self._conn.execute(pragma)
+            logging.info(f"Conexión persistente a la base de datos abierta: {self.database}")
+        return self._conn
 
     async def init_db(self) -> None:
-        async with aiosqlite.connect(self.database) as conn:
+        conn = await self._get_conn()
+        async with self._write_lock:
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS ofertas (
                     id TEXT PRIMARY KEY,
@@ -24,61 +134,531 @@ class DBManager:
                 )
             ''')
             await conn.commit()
+            await self._aplicar_migraciones(conn)
+            await self._rellenar_identidades(conn)
+            await self._activar_auto_vacuum_incremental(conn)
+        await self._precargar_cache_ids()
+        await self._cargar_filtro_bloom()
+        await self._cargar_outbox()
 
-    def generar_id_oferta(self, oferta: Dict[str, Any]) -> str:
-        campos = [
-            oferta['titulo'],
-            oferta['precio'],
-            oferta['link'],
-            oferta.get('imagen', ''),
-            oferta.get('precio_original', '')
-        ]
-        contenido = '|'.join([str(campo) for campo in campos if campo])
-        return hashlib.sha256(contenido.encode()).hexdigest()
-
+    async def _cargar_filtro_bloom(self) -> None:
+        """
+        Carga el filtro de Bloom persistido y le añade las ofertas guardadas
+        después de persistirlo (p. ej. antes de una caída). Como un filtro de
+        Bloom no admite borrados, se reconstruye desde la tabla cuando supera
+        la ventana de retención o cambian sus parámetros.
+        """
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT capacidad, tasa_error, datos, creado, guardado FROM filtro_bloom WHERE nombre = 'identidades'"
+        ) as cursor:
+            fila = await cursor.fetchone()
+        limite = int(time.time()) - self.retencion_dias * 24 * 60 * 60
+        if (fila and fila[0] == self.bloom_capacidad and fila[1] == self.bloom_tasa_error and fila[3] >= limite
+                and fila[4] is not None):
+            bloom = BloomFilter(self.bloom_capacidad, self.bloom_tasa_error, bits=fila[2])
+            posteriores = 0
+            async with conn.execute("SELECT identidad FROM ofertas WHERE timestamp >= ?", (fila[4],)) as cursor:
+                async for (identidad,) in cursor:
+                    bloom.add(identidad)
+                    posteriores += 1
+            self._bloom = bloom
+            self._bloom_creado = fila[3]
+            logging.info(f"Filtro de Bloom de ofertas cargado desde la base de datos "
+                         f"({posteriores} ofertas guardadas después de persistirlo).")
+        else:
+            await self._reconstruir_filtro_bloom()
 
+    async def _reconstruir_filtro_bloom(self) -> None:
+        bloom = BloomFilter(self.bloom_capacidad, self.bloom_tasa_error)
+        conn = await self._get_conn()
+        total = 0
+        # Lo que guarde guardar_ofertas durante el recorrido va al filtro viejo y aquí
+        self._bloom_pendientes = set()
+        try:
+            async with conn.execute("SELECT DISTINCT identidad FROM ofertas") as cursor:
+                async for (identidad,) in cursor:
+                    bloom.add(identidad)
+                    total += 1
+            for identidad in self._bloom_pendientes:
+                bloom.add(identidad)
+        finally:
+            self._bloom_pendientes = None
+        self._bloom = bloom
+        self._bloom_creado = int(time.time())
+        if total > self.bloom_capacidad:
+            logging.warning(
+                f"El filtro de Bloom contiene {total} identidades, por encima de su capacidad "
+                f"({self.bloom_capacidad}); aumente BLOOM_CAPACIDAD."
+            )
+        logging.info(f"Filtro de Bloom reconstruido con {total} identidades.")
+        await self.guardar_filtro_bloom()
 
-    async def guardar_oferta(self, oferta: Dict[str, Any]) -> None:
-        oferta_id = self.generar_id_oferta(oferta)
-        async with aiosqlite.connect(self.database) as conn:
+    async def guardar_filtro_bloom(self) -> None:
+        if self._bloom is None:
+            return
+        conn = await self._get_conn()
+        async with self._write_lock:
+            # Bajo el mismo cerrojo que guardar_ofertas: toda oferta con timestamp
+            # anterior a `guardado` ya está en los bits que se guardan
             await conn.execute(
-                "INSERT OR REPLACE INTO ofertas (id, titulo, precio, precio_original, link, imagen, tag, cupon, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (
-                    oferta_id,
-                    oferta['titulo'],
-                    oferta['precio'],
-                    oferta.get('precio_original'),
-                    oferta['link'],
-                    oferta.get('imagen'),
-                    oferta['tag'],
-                    oferta.get('cupon'),
-                    int(time.time())
-                )
+                "INSERT OR REPLACE INTO filtro_bloom (nombre, capacidad, tasa_error, datos, creado, guardado) "
+                "VALUES ('identidades', ?, ?, ?, ?, ?)",
+                (self.bloom_capacidad, self.bloom_tasa_error, self._bloom.to_bytes(), self._bloom_creado,
+                 int(time.time()))
             )
             await conn.commit()
 
+    async def es_oferta_duplicada(self, identidad: str) -> bool:
+        """
+        Comprueba si la identidad ya se envió dentro de la ventana de retención:
+        primero la caché de recientes, luego el filtro de Bloom y, solo ante
+        un positivo del filtro, una búsqueda indexada por identidad.
+        """
+        if self.es_oferta_reciente(identidad):
+            return True
+        if self._bloom is not None and identidad not in self._bloom:
+            return False
+        conn = await self._get_conn()
+        async with conn.execute("SELECT 1 FROM ofertas WHERE identidad = ? LIMIT 1", (identidad,)) as cursor:
+            return await cursor.fetchone() is not None
+
+    async def _precargar_cache_ids(self) -> None:
+        """Carga una única vez las identidades dentro del cooldown en la caché en memoria."""
+        tiempo_limite = int(time.time()) - self.cooldown_segundos
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT identidad, timestamp FROM ofertas WHERE timestamp >= ? ORDER BY timestamp",
+            (tiempo_limite,)
+        ) as cursor:
+            async for identidad, timestamp in cursor:
+                self._ids_recientes[identidad] = timestamp
+        logging.info(f"Caché de duplicados precargada con {len(self._ids_recientes)} identidades.")
+
+    def es_oferta_reciente(self, identidad: str) -> bool:
+        """Indica si la identidad se envió dentro del cooldown, sin consultar la base de datos."""
+        return identidad in self._ids_recientes
+
+    async def _aplicar_migraciones(self, conn: aiosqlite.Connection) -> None:
+        async with conn.execute("PRAGMA user_version") as cursor:
+            version_actual = (await cursor.fetchone())[0]
+        for version, sentencias in self.MIGRACIONES:
+            if version <= version_actual:
+                continue
+            try:
+                # Transacción explícita: en el modo heredado de sqlite3 un ALTER TABLE
+                # se confirmaría al instante y un fallo posterior dejaría la migración a medias
+                await conn.execute("BEGIN")
+                for sentencia in sentencias:
+                    await conn.execute(sentencia)
+                await self._rellenar_datos_migracion(conn, version)
+                await conn.execute(f"PRAGMA user_version = {version}")
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            logging.info(f"Migración de esquema {version} aplicada.")
+
+    async def _rellenar_datos_migracion(self, conn: aiosqlite.Connection, version: int) -> None:
+        """Rellenos de datos de una migración; corren en su misma transacción y solo una vez."""
+        if version == 7:
+            await self._rellenar_historial_precios(conn)
+
+    async def _activar_auto_vacuum_incremental(self, conn: aiosqlite.Connection) -> None:
+        # auto_vacuum solo cambia tras un VACUUM completo; se hace una única vez
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            modo = (await cursor.fetchone())[0]
+        if modo != 2:
+            logging.info("Activando auto_vacuum incremental (VACUUM único)...")
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute("VACUUM")
+
+    async def _liberar_paginas(self, conn: aiosqlite.Connection) -> None:
+        # incremental_vacuum libera una página por cada fila recorrida: con execute()
+        # solo se avanza la primera, así que se ejecuta como script para completarlo
+        async with conn.execute("PRAGMA freelist_count") as cursor:
+            libres = (await cursor.fetchone())[0]
+        if libres:
+            async with self._write_lock:
+                await conn.executescript("PRAGMA incremental_vacuum")
+            logging.info(f"incremental_vacuum: {libres} páginas libres devueltas al sistema.")
+
+    async def close(self) -> None:
+        """Vacía el buffer pendiente y cierra la conexión persistente si está abierta."""
+        if self._conn is not None:
+            try:
+                await self.vaciar_buffer()
+            except Exception as e:
+                logging.error(f"No se pudieron guardar {len(self._buffer)} ofertas pendientes: {e}", exc_info=True)
+            try:
+                await self.guardar_filtro_bloom()
+            except Exception as e:
+                logging.warning(f"No se pudo persistir el filtro de Bloom: {e}")
+            try:
+                await self._conn.close()
+                logging.info("Conexión a la base de datos cerrada.")
+            except Exception as e:
+                logging.warning(f"Error al cerrar la conexión a la base de datos: {e}")
+            finally:
+                self._conn = None
+
+    async def _rellenar_identidades(self, conn: aiosqlite.Connection) -> None:
+        # Calcula la identidad canónica de filas anteriores a la columna
+        async with conn.execute("SELECT id, link, titulo FROM ofertas WHERE identidad IS NULL") as cursor:
+            filas = await cursor.fetchall()
+        if not filas:
+            return
+        await conn.executemany(
+            "UPDATE ofertas SET identidad = ? WHERE id = ?",
+            [(Deal(titulo=titulo or '', link=link or '').identidad, oferta_id) for oferta_id, link, titulo in filas]
+        )
+        await conn.commit()
+        logging.info(f"Identidad canónica calculada para {len(filas)} ofertas existentes.")
+
+    async def _rellenar_historial_precios(self, conn: aiosqlite.Connection) -> None:
+        # Siembra el historial con los precios de las ofertas ya enviadas (migración 7).
+        # Las filas anteriores a la migración 4 aún no tienen identidad: se calcula aquí
+        async with conn.execute("SELECT identidad, link, titulo, precio, fuente, timestamp FROM ofertas") as cursor:
+            filas = [
+                (identidad or Deal(titulo=titulo or '', link=link or '').identidad, centavos, fuente, timestamp)
+                for identidad, link, titulo, precio, fuente, timestamp in await cursor.fetchall()
+                if (centavos := parsear_precio(precio)) is not None
+            ]
+        if not filas:
+            return
+        await conn.executemany(self.INSERT_HISTORIAL_SQL, filas)
+        logging.info(f"Historial de precios inicializado con {len(filas)} precios de ofertas existentes.")
+
+    INSERT_HISTORIAL_SQL = (
+        "INSERT INTO historial_precios (identidad, precio_centavos, fuente, timestamp) VALUES (?, ?, ?, ?)"
+    )
+
+    INSERT_OFERTA_SQL = (
+        "INSERT OR REPLACE INTO ofertas (id, titulo, precio, precio_original, link, imagen, tag, cupon, timestamp, fuente, identidad) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def _fila_oferta(self, oferta: Deal, timestamp: int) -> tuple:
+        return (
+            oferta.id,
+            oferta.titulo,
+            oferta.precio,
+            oferta.precio_original,
+            oferta.link,
+            oferta.imagen,
+            oferta.tag,
+            oferta.cupon,
+            timestamp,
+            oferta.fuente or oferta.tag.replace('#', '').lower(),
+            oferta.identidad
+        )
+
+    async def guardar_oferta(self, oferta: Deal) -> None:
+        await self.guardar_ofertas([oferta])
+
+    async def guardar_ofertas(self, ofertas: Iterable[Deal]) -> int:
+        """Guarda varias ofertas en una sola transacción con executemany."""
+        ofertas = list(ofertas)
+        if not ofertas:
+            return 0
+        conn = await self._get_conn()
+        async with self._write_lock:
+            # El timestamp se toma con el cerrojo para que no quede por detrás del
+            # último guardado del filtro de Bloom
+            ahora = int(time.time())
+            filas = [self._fila_oferta(oferta, ahora) for oferta in ofertas]
+            try:
+                await conn.executemany(self.INSERT_OFERTA_SQL, filas)
+                await conn.executemany(self.INSERT_HISTORIAL_SQL, [
+                    (oferta.identidad, oferta.precio_centavos, fila[9], ahora)
+                    for oferta, fila in zip(ofertas, filas) if oferta.precio_centavos is not None
+                ])
+                # Registrada la oferta, su entrada de la outbox ya no es necesaria
+                await conn.executemany("DELETE FROM outbox WHERE identidad = ?", [(fila[-1],) for fila in filas])
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        for fila in filas:
+            identidad = fila[-1]
+            self._ids_outbox.discard(identidad)
+            self._ids_recientes[identidad] = ahora
+            if self._bloom is not None:
+                self._bloom.add(identidad)
+            if self._bloom_pendientes is not None:
+                self._bloom_pendientes.add(identidad)
+        return len(filas)
+
+    async def encolar_oferta(self, oferta: Deal) -> None:
+        """
+        Añade una oferta ya enviada al buffer de escritura diferida.
+        El buffer se vacía al alcanzar el tamaño o la antigüedad configurados.
+        """
+        if not self._buffer:
+            self._buffer_desde = time.monotonic()
+        self._buffer.append(oferta)
+        if (len(self._buffer) >= self.buffer_max_ofertas
+                or time.monotonic() - self._buffer_desde >= self.buffer_max_segundos):
+            await self.vaciar_buffer()
+
+    async def vaciar_buffer(self) -> int:
+        """Persiste todas las ofertas pendientes del buffer en una única transacción."""
+        if not self._buffer:
+            return 0
+        pendientes, self._buffer = self._buffer, []
+        try:
+            guardadas = await self.guardar_ofertas(pendientes)
+        except Exception:
+            # Devolver las ofertas al buffer para no perderlas en el siguiente intento
+            self._buffer = pendientes + self._buffer
+            raise
+        logging.debug(f"Buffer de escritura vaciado: {guardadas} ofertas guardadas")
+        return guardadas
+
     async def limpiar_ofertas_antiguas(self, dias: int) -> int:
+        """
+        Elimina ofertas anteriores a la ventana de retención en lotes acotados,
+        liberando páginas con incremental_vacuum. Lo que no se alcance a borrar
+        en este ciclo se eliminará en los siguientes.
+        """
         tiempo_limite = int(time.time()) - (dias * 24 * 60 * 60)
-        async with aiosqlite.connect(self.database) as conn:
-            cursor = await conn.cursor()
-            await cursor.execute("DELETE FROM ofertas WHERE timestamp < ?", (tiempo_limite,))
-            ofertas_eliminadas = cursor.rowcount
+        conn = await self._get_conn()
+        ofertas_eliminadas = 0
+        for _ in range(self.limpieza_max_lotes):
+            async with self._write_lock:
+                cursor = await conn.execute(
+                    "DELETE FROM ofertas WHERE rowid IN "
+                    "(SELECT rowid FROM ofertas WHERE timestamp < ? LIMIT ?)",
+                    (tiempo_limite, self.limpieza_lote)
+                )
+                eliminadas_lote = cursor.rowcount
+                await cursor.close()
+                await conn.commit()
+            ofertas_eliminadas += eliminadas_lote
+            if eliminadas_lote < self.limpieza_lote:
+                break
+        async with self._write_lock:
+            await conn.execute(
+                "DELETE FROM outbox WHERE estado = ? AND creado < ?", (self.OUTBOX_FALLIDA, tiempo_limite)
+            )
+            await conn.execute("DELETE FROM entregas WHERE actualizado < ?", (tiempo_limite,))
             await conn.commit()
+        await self._limpiar_historial_precios(conn)
+        await self._liberar_paginas(conn)
+        if int(time.time()) - self._bloom_creado > dias * 24 * 60 * 60:
+            await self._reconstruir_filtro_bloom()
+        else:
+            await self.guardar_filtro_bloom()
         logging.info(f"Se eliminaron {ofertas_eliminadas} ofertas antiguas")
         return ofertas_eliminadas
 
-    async def obtener_ids_recientes(self) -> set:
-        # Obtiene IDs de las últimas 48 horas para una verificación rápida en memoria
-        tiempo_limite = int(time.time()) - (2 * 24 * 60 * 60)
-        async with aiosqlite.connect(self.database) as conn:
-            cursor = await conn.cursor()
-            await cursor.execute("SELECT id FROM ofertas WHERE timestamp >= ?", (tiempo_limite,))
-            return {row[0] for row in await cursor.fetchall()}
+    async def _cargar_outbox(self) -> None:
+        """
+        Recupera la outbox tras un reinicio: registra las ofertas que se enviaron
+        sin llegar a guardarse y deja las pendientes listas para reanudar el envío.
+        """
+        conn = await self._get_conn()
+        async with conn.execute("SELECT oferta FROM outbox WHERE estado = ?", (self.OUTBOX_ENVIADA,)) as cursor:
+            enviadas = [Deal.desde_dict(json.loads(fila[0])) for fila in await cursor.fetchall()]
+        if enviadas:
+            await self.guardar_ofertas(enviadas)
+            logging.info(f"Se registraron {len(enviadas)} ofertas enviadas antes del último cierre.")
+        async with conn.execute("SELECT identidad FROM outbox WHERE estado = ?", (self.OUTBOX_PENDIENTE,)) as cursor:
+            self._ids_outbox = {fila[0] for fila in await cursor.fetchall()}
+        if self._ids_outbox:
+            logging.info(f"Outbox con {len(self._ids_outbox)} ofertas pendientes de envío.")
+
+    def en_outbox(self, identidad: str) -> bool:
+        """Indica si la oferta ya está en la outbox a la espera de enviarse o registrarse."""
+        return identidad in self._ids_outbox
+
+    async def encolar_outbox(self, ofertas: Iterable[Deal]) -> int:
+        """Añade ofertas a la outbox; las fallidas se reactivan y las ya pendientes se ignoran."""
+        ahora = int(time.time())
+        filas = []
+        for oferta in ofertas:
+            if oferta.identidad not in self._ids_outbox:
+                filas.append((
+                    oferta.identidad, json.dumps(oferta.a_dict(), ensure_ascii=False), self.OUTBOX_PENDIENTE, ahora, ahora
+                ))
+        if not filas:
+            return 0
+        conn = await self._get_conn()
+        async with self._write_lock:
+            try:
+                await conn.executemany(
+                    "INSERT INTO outbox (identidad, oferta, estado, intentos, proximo_intento, creado) "
+                    "VALUES (?, ?, ?, 0, ?, ?) "
+                    "ON CONFLICT(identidad) DO UPDATE SET oferta = excluded.oferta, estado = excluded.estado, "
+                    "intentos = 0, proximo_intento = excluded.proximo_intento, ultimo_error = NULL "
+                    f"WHERE outbox.estado = '{self.OUTBOX_FALLIDA}'",
+                    filas
+                )
+                # Una nueva publicación empieza sin entregas previas
+                await conn.executemany("DELETE FROM entregas WHERE identidad = ?", [(fila[0],) for fila in filas])
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        self._ids_outbox.update(fila[0] for fila in filas)
+        return len(filas)
+
+    async def obtener_outbox_pendientes(self, limite: int) -> List[Tuple[str, Deal, int]]:
+        """Devuelve (identidad, oferta, intentos) de las entradas cuyo próximo intento ya venció."""
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT identidad, oferta, intentos FROM outbox WHERE estado = ? AND proximo_intento <= ? "
+            "ORDER BY proximo_intento, creado LIMIT ?",
+            (self.OUTBOX_PENDIENTE, int(time.time()), limite)
+        ) as cursor:
+            return [
+                (identidad, Deal.desde_dict(json.loads(oferta)), intentos)
+                for identidad, oferta, intentos in await cursor.fetchall()
+            ]
+
+    async def proximo_intento_outbox(self) -> Optional[int]:
+        """Momento (epoch) del próximo envío programado, o None si la outbox está vacía."""
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT MIN(proximo_intento) FROM outbox WHERE estado = ?", (self.OUTBOX_PENDIENTE,)
+        ) as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def marcar_outbox_enviada(self, identidad: str) -> None:
+        conn = await self._get_conn()
+        async with self._write_lock:
+            await conn.execute("UPDATE outbox SET estado = ? WHERE identidad = ?", (self.OUTBOX_ENVIADA, identidad))
+            await conn.commit()
+
+    async def reprogramar_outbox(self, identidad: str, intentos: int, error: str) -> bool:
+        """
+        Registra un envío fallido y programa el siguiente con backoff exponencial.
+        Devuelve False si se agotaron los intentos y la entrada queda como fallida.
+        """
+        intentos += 1
+        pendiente = intentos < self.outbox_max_intentos
+        espera = min(self.outbox_backoff_max, self.outbox_backoff_base * 2 ** (intentos - 1))
+        conn = await self._get_conn()
+        async with self._write_lock:
+            await conn.execute(
+                "UPDATE outbox SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ? WHERE identidad = ?",
+                (self.OUTBOX_PENDIENTE if pendiente else self.OUTBOX_FALLIDA, intentos,
+                 int(time.time() + espera), error[:500], identidad)
+            )
+            await conn.commit()
+        if not pendiente:
+            self._ids_outbox.discard(identidad)
+        return pendiente
+
+    async def canales_entregados(self, identidades: List[str]) -> Dict[str, set]:
+        """Canales que ya recibieron cada oferta, para no repetir entregas al reintentar."""
+        if not identidades:
+            return {}
+        conn = await self._get_conn()
+        marcadores = ", ".join("?" * len(identidades))
+        entregados: Dict[str, set] = {}
+        async with conn.execute(
+            f"SELECT identidad, canal FROM entregas WHERE entregada = 1 AND identidad IN ({marcadores})",
+            identidades
+        ) as cursor:
+            async for identidad, canal in cursor:
+                entregados.setdefault(identidad, set()).add(canal)
+        return entregados
+
+    async def registrar_entregas(self, identidad: str, entregas: Dict[str, bool]) -> None:
+        """Registra el resultado del envío de una oferta a cada canal."""
+        if not entregas:
+            return
+        ahora = int(time.time())
+        conn = await self._get_conn()
+        async with self._write_lock:
+            try:
+                await conn.executemany(
+                    "INSERT INTO entregas (identidad, canal, entregada, actualizado) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(identidad, canal) DO UPDATE SET entregada = max(entregada, excluded.entregada), "
+                    "intentos = intentos + 1, actualizado = excluded.actualizado",
+                    [(identidad, canal, int(entregada), ahora) for canal, entregada in entregas.items()]
+                )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    async def contar_outbox(self) -> Dict[str, int]:
+        conn = await self._get_conn()
+        async with conn.execute("SELECT estado, COUNT(*) FROM outbox GROUP BY estado") as cursor:
+            return {estado: total for estado, total in await cursor.fetchall()}
+
+    async def _limpiar_historial_precios(self, conn: aiosqlite.Connection) -> None:
+        # Mismo barrido por lotes que las ofertas, con su propia ventana
+        tiempo_limite = int(time.time()) - self.historial_precios_dias * 24 * 60 * 60
+        for _ in range(self.limpieza_max_lotes):
+            async with self._write_lock:
+                cursor = await conn.execute(
+                    "DELETE FROM historial_precios WHERE rowid IN "
+                    "(SELECT rowid FROM historial_precios WHERE timestamp < ? LIMIT ?)",
+                    (tiempo_limite, self.limpieza_lote)
+                )
+                eliminadas_lote = cursor.rowcount
+                await cursor.close()
+                await conn.commit()
+            if eliminadas_lote < self.limpieza_lote:
+                break
+
+    async def obtener_minimos_precio(self, identidades: Iterable[str]) -> Dict[str, int]:
+        """
+        Precio mínimo registrado (en centavos) de cada identidad dentro de la
+        ventana del historial. Usa el índice (identidad, timestamp).
+        """
+        identidades = list(dict.fromkeys(identidades))
+        tiempo_limite = int(time.time()) - self.historial_precios_dias * 24 * 60 * 60
+        conn = await self._get_conn()
+        minimos: Dict[str, int] = {}
+        # Por bloques para no superar el límite de parámetros de SQLite
+        for inicio in range(0, len(identidades), 500):
+            bloque = identidades[inicio:inicio + 500]
+            marcadores = ", ".join("?" * len(bloque))
+            async with conn.execute(
+                f"SELECT identidad, MIN(precio_centavos) FROM historial_precios "
+                f"WHERE identidad IN ({marcadores}) AND timestamp >= ? GROUP BY identidad",
+                (*bloque, tiempo_limite)
+            ) as cursor:
+                async for identidad, minimo in cursor:
+                    minimos[identidad] = minimo
+        return minimos
+
+    async def obtener_primeras_vistas(self, identidades: Iterable[str]) -> Dict[str, int]:
+        """
+        Primera vez (timestamp) que se registró cada identidad en el historial
+        de precios; las que no aparecen no se han publicado antes.
+        """
+        identidades = list(dict.fromkeys(identidades))
+        conn = await self._get_conn()
+        primeras: Dict[str, int] = {}
+        for inicio in range(0, len(identidades), 500):
+            bloque = identidades[inicio:inicio + 500]
+            marcadores = ", ".join("?" * len(bloque))
+            async with conn.execute(
+                f"SELECT identidad, MIN(timestamp) FROM historial_precios "
+                f"WHERE identidad IN ({marcadores}) GROUP BY identidad",
+                bloque
+            ) as cursor:
+                async for identidad, primera in cursor:
+                    primeras[identidad] = primera
+        return primeras
+
+    async def obtener_titulos_recientes(self, segundos: int) -> List[tuple]:
+        """Devuelve (identidad, titulo, fuente, timestamp) de las ofertas enviadas en la ventana indicada."""
+        tiempo_limite = int(time.time()) - segundos
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT identidad, titulo, fuente, timestamp FROM ofertas WHERE timestamp >= ?", (tiempo_limite,)
+        ) as cursor:
+            return list(await cursor.fetchall())
 
     async def obtener_todas_las_ofertas(self) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self.database) as conn:
-            cursor = await conn.cursor()
-            await cursor.execute("SELECT id, titulo, precio, link, timestamp FROM ofertas")
+        conn = await self._get_conn()
+        async with conn.execute("SELECT id, titulo, precio, link, timestamp FROM ofertas") as cursor:
             return [
                 {
                     'id': row[0],
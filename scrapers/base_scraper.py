@@ -1,15 +1,335 @@
+import asyncio
+import hashlib
+import importlib
+import logging
+import logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from abc import ABC, abstractmethod
+from typing import Optional, Dict, List, Any
+
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .http_cache import ResponseCache
+from utils.deal import Deal
+
+try:
+    import h2  # noqa: F401  (necesario para HTTP/2 en httpx)
+    HTTP2_DISPONIBLE = True
+except ImportError:
+    HTTP2_DISPONIBLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401  (backend de BeautifulSoup)
+    LXML_DISPONIBLE = True
+except ImportError:
+    LXML_DISPONIBLE = False
+
+PARSER_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+class NodoHTML:
+    """
+    Adaptador mínimo de un nodo de selectolax con la interfaz de BeautifulSoup
+    que usan los `extraer_oferta` (find, find_all, text, get_text, get, [] y
+    attrs), para extraer sin construir un árbol de BeautifulSoup.
+    """
+    __slots__ = ('_nodo',)
+
+    def __init__(self, nodo):
+        self._nodo = nodo
+
+    @staticmethod
+    def _selector(nombre: Optional[str], class_: Optional[str], attrs: Optional[Dict[str, str]]) -> str:
+        clase = class_ or (attrs or {}).get('class')
+        selector = nombre or '*'
+        if clase:
+            # Igual que BeautifulSoup: una clase con espacios compara el atributo completo
+            selector += f'[class="{clase}"]' if ' ' in clase else f'.{clase}'
+        return selector
+
+    def find_all(self, nombre: Optional[str] = None, attrs: Optional[Dict[str, str]] = None,
+                 class_: Optional[str] = None) -> List['NodoHTML']:
+        propio = self._nodo.mem_id
+        return [
+            NodoHTML(nodo) for nodo in self._nodo.css(self._selector(nombre, class_, attrs))
+            if nodo.mem_id != propio
+        ]
+
+    def find(self, nombre: Optional[str] = None, attrs: Optional[Dict[str, str]] = None,
+             class_: Optional[str] = None) -> Optional['NodoHTML']:
+        propio = self._nodo.mem_id
+        for nodo in self._nodo.css(self._selector(nombre, class_, attrs)):
+            if nodo.mem_id != propio:
+                return NodoHTML(nodo)
+        return None
+
+    @property
+    def text(self) -> str:
+        return self._nodo.text(deep=True)
+
+    def get_text(self, separator: str = '', strip: bool = False) -> str:
+        return self._nodo.text(deep=True, separator=separator, strip=strip)
+
+    @property
+    def attrs(self) -> Dict[str, Optional[str]]:
+        return self._nodo.attributes
+
+    def get(self, clave: str, defecto: Any = None) -> Any:
+        return self._nodo.attributes.get(clave, defecto)
+
+    def __getitem__(self, clave: str) -> Optional[str]:
+        return self._nodo.attributes[clave]
+
+
+# Instancias de scrapers reutilizadas dentro de cada proceso del pool de parseo
+_scrapers_worker: Dict[tuple, 'BaseScraper'] = {}
+
+
+def _inicializar_worker(cola_logs, nivel: int) -> None:
+    """
+    Inicializador de los procesos de parseo: con 'spawn' no heredan la
+    configuración de logging, así que sus registros se envían al proceso
+    principal por una cola y allí pasan por los handlers configurados.
+    """
+    raiz = logging.getLogger()
+    raiz.handlers = [logging.handlers.QueueHandler(cola_logs)]
+    raiz.setLevel(nivel)
+
+
+class _ReenvioLogs(logging.Handler):
+    """Reenvía en el proceso principal los registros de los workers a su logger."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def _parsear_en_worker(modulo: str, clase: str, name: str, url: str, tag: str,
+                       backend: str, html: str) -> List[Deal]:
+    """Punto de entrada del pool de procesos: parsea el HTML y devuelve las ofertas."""
+    clave = (modulo, clase, name, url, tag)
+    scraper = _scrapers_worker.get(clave)
+    if scraper is None:
+        scraper_class = getattr(importlib.import_module(modulo), clase)
+        scraper = scraper_class(name=name, url=url, tag=tag)
+        _scrapers_worker[clave] = scraper
+    BaseScraper.parser_backend = backend
+    return scraper.parsear_ofertas(html)
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
 
 class BaseScraper(ABC):
-    def __init__(self, name: str, url: str, tag: str):
+    # Cliente HTTP compartido por todos los scrapers estáticos (keep-alive entre ciclos)
+    _cliente_http: Optional[httpx.AsyncClient] = None
+    # Caché de peticiones condicionales compartida (ETag / Last-Modified / hash del cuerpo)
+    _cache_respuestas: Optional[ResponseCache] = None
+    HTTP_MAX_CONEXIONES = 20
+    HTTP_MAX_KEEPALIVE = 10
+    HTTP_REINTENTOS = 3
+    HTTP_ESPERA_REINTENTO = 5
+    # Backend de parseo HTML: 'selectolax', 'lxml', 'html.parser' o 'auto'
+    parser_backend = 'auto'
+    # Pool de procesos para parsear fuera del event loop y del GIL (None = hilos)
+    _pool_parseo: Optional[ProcessPoolExecutor] = None
+    _pool_workers = 0
+    _escucha_logs: Optional[logging.handlers.QueueListener] = None
+
+    def __init__(self, name: str, url: str, tag: str, timeout: float = 30.0):
         self.name = name
         self.url = url
         self.tag = tag
+        self.timeout = timeout
 
     @staticmethod
     def limpiar_texto(texto: str) -> str:
         return ' '.join(texto.strip().split())
 
+    @classmethod
+    def obtener_cliente_http(cls) -> httpx.AsyncClient:
+        if BaseScraper._cliente_http is None or BaseScraper._cliente_http.is_closed:
+            BaseScraper._cliente_http = httpx.AsyncClient(
+                http2=HTTP2_DISPONIBLE,
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=cls.HTTP_MAX_CONEXIONES,
+                    max_keepalive_connections=cls.HTTP_MAX_KEEPALIVE,
+                ),
+                timeout=httpx.Timeout(30.0, connect=10.0),
+            )
+        return BaseScraper._cliente_http
+
+    @classmethod
+    async def cerrar_cliente_http(cls) -> None:
+        if BaseScraper._cliente_http is not None:
+            try:
+                await BaseScraper._cliente_http.aclose()
+            except Exception as e:
+                logging.warning(f"Error al cerrar el cliente HTTP compartido: {e}")
+            finally:
+                BaseScraper._cliente_http = None
+
+    @classmethod
+    def configurar_parser(cls, backend: str) -> None:
+        if backend != 'auto' and backend not in PARSER_BACKENDS:
+            raise ValueError(f"Backend de parseo desconocido: {backend}. Opciones: auto, {', '.join(PARSER_BACKENDS)}")
+        BaseScraper.parser_backend = backend
+
+    @staticmethod
+    def resolver_parser(backend: str = 'auto') -> str:
+        """Devuelve el backend efectivo, descartando los que no están instalados."""
+        if backend in ('auto', 'selectolax') and LexborHTMLParser is not None:
+            return 'selectolax'
+        if backend in ('auto', 'selectolax', 'lxml') and LXML_DISPONIBLE:
+            return 'lxml'
+        return 'html.parser'
+
+    def extraer_contenedores(self, html: str, etiqueta: str, clase: str, backend: Optional[str] = None) -> list:
+        """
+        Parsea solo los contenedores de ofertas de la página. Con selectolax
+        devuelve adaptadores `NodoHTML`; con lxml/html.parser, elementos de
+        BeautifulSoup construidos solo para esos contenedores (SoupStrainer).
+        En ambos casos `extraer_oferta` funciona igual. `etiqueta`/`clase`
+        siguen la semántica de `find_all`.
+        """
+        backend = self.resolver_parser(backend or self.parser_backend)
+        if backend == 'selectolax':
+            selector = NodoHTML._selector(etiqueta, clase, None)
+            arbol = LexborHTMLParser(html)
+            # text() de lexbor incluye el contenido de estas etiquetas y get_text de BeautifulSoup no
+            arbol.strip_tags(['script', 'style', 'template'])
+            return [NodoHTML(nodo) for nodo in arbol.css(selector)]
+        soup = BeautifulSoup(html, backend, parse_only=SoupStrainer(etiqueta, class_=clase))
+        return soup.find_all(etiqueta, class_=clase)
+
+    @classmethod
+    def configurar_pool_parseo(cls, workers: int) -> None:
+        """Configura el pool de procesos de parseo; con 0 workers se parsea en un hilo."""
+        BaseScraper._pool_workers = max(0, workers)
+
+    @classmethod
+    def _obtener_pool_parseo(cls) -> Optional[ProcessPoolExecutor]:
+        if BaseScraper._pool_workers and BaseScraper._pool_parseo is None:
+            # 'spawn' evita heredar hilos y conexiones abiertas del proceso principal
+            contexto = multiprocessing.get_context('spawn')
+            cola_logs = contexto.Queue()
+            BaseScraper._escucha_logs = logging.handlers.QueueListener(cola_logs, _ReenvioLogs())
+            BaseScraper._escucha_logs.start()
+            BaseScraper._pool_parseo = ProcessPoolExecutor(
+                max_workers=BaseScraper._pool_workers,
+                mp_context=contexto,
+                initializer=_inicializar_worker,
+                initargs=(cola_logs, logging.getLogger().getEffectiveLevel()),
+            )
+        return BaseScraper._pool_parseo
+
+    @classmethod
+    def cerrar_pool_parseo(cls) -> None:
+        if BaseScraper._pool_parseo is not None:
+            # Se espera a que los workers terminen (solo el parseo en curso): al salir
+            # vacían su cola de logs y así no se pierde ningún registro
+            BaseScraper._pool_parseo.shutdown(wait=True, cancel_futures=True)
+            BaseScraper._pool_parseo = None
+        if BaseScraper._escucha_logs is not None:
+            # Procesa lo que quede en la cola antes de parar
+            BaseScraper._escucha_logs.stop()
+            BaseScraper._escucha_logs = None
+
+    async def parsear_en_pool(self, html: str) -> List[Deal]:
+        """
+        Ejecuta `parsear_ofertas` en el pool de procesos y devuelve las ofertas
+        (objetos `Deal`). Sin pool configurado, o si el pool se rompe,
+        parsea en un hilo para no bloquear el event loop.
+        """
+        pool = self._obtener_pool_parseo()
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    pool, _parsear_en_worker, type(self).__module__, type(self).__name__,
+                    self.name, self.url, self.tag, self.parser_backend, html,
+                )
+            except BrokenProcessPool as e:
+                logging.error(f"{self.name}: El pool de parseo dejó de funcionar ({e}); se recreará.")
+                self.cerrar_pool_parseo()
+        return await asyncio.to_thread(self.parsear_ofertas, html)
+
+    @classmethod
+    def configurar_cache_respuestas(cls, ruta: Optional[str]) -> None:
+        BaseScraper._cache_respuestas = ResponseCache(ruta)
+
+    @classmethod
+    def obtener_cache_respuestas(cls) -> ResponseCache:
+        if BaseScraper._cache_respuestas is None:
+            BaseScraper._cache_respuestas = ResponseCache()
+        return BaseScraper._cache_respuestas
+
+    async def obtener_ofertas_http(self) -> List[Deal]:
+        """
+        Descarga la página de la fuente con una petición condicional y la parsea
+        con `parsear_ofertas`. Si el servidor responde 304 o el cuerpo no cambió
+        desde la última vez, reutiliza las ofertas ya parseadas sin volver a parsear.
+        """
+        cache = self.obtener_cache_respuestas()
+        response = await self._get(self.url, headers=cache.validadores(self.url))
+        if response.status_code == 304:
+            logging.info(f"{self.name}: Página sin cambios (304), se reutilizan las ofertas en caché.")
+            return cache.ofertas(self.url)
+
+        hash_cuerpo = hashlib.sha256(response.content).hexdigest()
+        if cache.mismo_contenido(self.url, hash_cuerpo):
+            logging.info(f"{self.name}: Contenido idéntico al anterior, se reutilizan las ofertas en caché.")
+            return cache.ofertas(self.url)
+
+        # El parseo es CPU intensivo; se ejecuta fuera del event loop
+        ofertas = await self.parsear_en_pool(response.text)
+        cache.actualizar(
+            self.url,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            hash_cuerpo,
+            ofertas,
+        )
+        return ofertas
+
+    @abstractmethod
+    def parsear_ofertas(self, html: str) -> List[Deal]:
+        pass
+
+    async def _get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """
+        Descarga una página con el cliente compartido, aplicando el timeout de la
+        fuente y reintentando errores de red o respuestas 5xx.
+        """
+        cliente = self.obtener_cliente_http()
+        for intento in range(1, self.HTTP_REINTENTOS + 1):
+            try:
+                response = await cliente.get(url, headers=headers, timeout=self.timeout)
+                logging.info(f"{self.name}: Respuesta obtenida. Código de estado: {response.status_code}")
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                reintentable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500
+                if not reintentable or intento == self.HTTP_REINTENTOS:
+                    raise
+                logging.warning(
+                    f"{self.name}: Error al obtener {url} (intento {intento}/{self.HTTP_REINTENTOS}): {e}"
+                )
+                await asyncio.sleep(self.HTTP_ESPERA_REINTENTO)
+
     @abstractmethod
     async def obtener_ofertas(self):
         pass
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from playwright.async_api import async_playwright
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class BrowserManager:
+    """
+    Gestiona el ciclo de vida del driver de Playwright y de Chromium: lanza el
+    navegador bajo demanda, comprueba que sigue vivo antes de cada uso, lo
+    recicla tras N páginas o al superar un umbral de memoria, lo relanza si se
+    cae y lo cierra todo (incluido el driver) al apagar el bot.
+    """
+
+    def __init__(self, headless: bool = True, max_paginas: int = 50, max_rss_mb: int = 0):
+        self.headless = headless
+        self.max_paginas = max_paginas
+        self.max_rss_mb = max_rss_mb
+        self._playwright = None
+        self._browser = None
+        self._paginas = 0
+        self._en_uso = 0
+        self._lock = asyncio.Lock()
+        self.logger = logging.getLogger("OfertasBot")
+
+    @property
+    def activo(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def iniciar(self):
+        async with self._lock:
+            return await self._asegurar_navegador()
+
+    async def _asegurar_navegador(self):
+        if self.activo:
+            return self._browser
+        if self._browser is not None:
+            self.logger.warning("El navegador Playwright no responde; se relanzará.")
+            await self._cerrar_navegador()
+        for intento in range(2):
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self.logger.info("Lanzando navegador Playwright...")
+            try:
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                break
+            except Exception as e:
+                # Si el driver de Playwright murió, todos los launch siguientes fallarían:
+                # se detiene y se vuelve a arrancar una vez antes de rendirse
+                await self._detener_playwright()
+                if intento:
+                    raise
+                self.logger.warning(f"No se pudo lanzar el navegador ({e}); se reinicia el driver de Playwright.")
+        self._paginas = 0
+        self.logger.info("Navegador Playwright lanzado exitosamente.")
+        return self._browser
+
+    def _rss_navegador_mb(self) -> float:
+        """Memoria residente de los procesos hijos de Chromium, si psutil está disponible."""
+        if psutil is None:
+            return 0.0
+        try:
+            hijos = psutil.Process(os.getpid()).children(recursive=True)
+        except psutil.Error:
+            return 0.0
+        total = 0
+        for hijo in hijos:
+            try:
+                if 'chrom' in hijo.name().lower():
+                    total += hijo.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def _debe_reciclar(self) -> Optional[str]:
+        if self.max_paginas and self._paginas >= self.max_paginas:
+            return f"{self._paginas} páginas procesadas"
+        if self.max_rss_mb:
+            rss = self._rss_navegador_mb()
+            if rss > self.max_rss_mb:
+                return f"uso de memoria de {rss:.0f} MB"
+        return None
+
+    @asynccontextmanager
+    async def usar(self):
+        """
+        Entrega un navegador sano para procesar una página. Si no hay otros
+        usos en curso y se alcanzó el límite de páginas o memoria, lo recicla antes.
+        """
+        async with self._lock:
+            if self.activo and self._en_uso == 0:
+                motivo = self._debe_reciclar()
+                if motivo:
+                    self.logger.info(f"Reciclando el navegador Playwright ({motivo}).")
+                    await self._cerrar_navegador()
+            browser = await self._asegurar_navegador()
+            self._en_uso += 1
+        try:
+            yield browser
+        finally:
+            self._en_uso -= 1
+            self._paginas += 1
+
+    async def _cerrar_navegador(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                self.logger.warning(f"Error al cerrar el navegador: {e}")
+            finally:
+                self._browser = None
+
+    async def cerrar(self) -> None:
+        """Cierra el navegador y detiene el driver de Playwright."""
+        async with self._lock:
+            if self._browser is not None:
+                self.logger.info("Cerrando el navegador Playwright...")
+            await self._cerrar_navegador()
+            await self._detener_playwright()
+
+    async def _detener_playwright(self) -> None:
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                self.logger.warning(f"Error al detener Playwright: {e}")
+            finally:
+                self._playwright = None
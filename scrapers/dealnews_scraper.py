@@ -1,34 +1,28 @@
 import logging
-from bs4 import BeautifulSoup
-import requests
-from typing import List, Dict, Any
-from retrying import retry
-import hashlib
+import httpx
+from typing import List, Optional
 import time
 import re
 
 from .base_scraper import BaseScraper
+from utils.deal import Deal
 
 class DealsnewsScraper(BaseScraper):
-    def __init__(self, name: str, url: str, tag: str):
-        super().__init__(name, url, tag)
+    def __init__(self, name: str, url: str, tag: str, timeout: float = 30.0):
+        super().__init__(name, url, tag, timeout)
 
-    @retry(stop_max_attempt_number=3, wait_fixed=5000)
-    def obtener_ofertas(self) -> List[Dict[str, Any]]:
+    async def obtener_ofertas(self) -> List[Deal]:
         logging.info(f"DealNews: Iniciando scraping desde {self.url}")
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
         try:
-            response = requests.get(self.url, headers=headers, timeout=30)
-            response.raise_for_status()
-            logging.info(f"DealNews: Respuesta obtenida. Código de estado: {response.status_code}")
-        except requests.RequestException as e:
+            return await self.obtener_ofertas_http()
+        except httpx.HTTPError as e:
             logging.error(f"DealNews: Error al obtener la página: {e}")
             return []
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
+
+    def parsear_ofertas(self, html: str) -> List[Deal]:
         ofertas = []
-        
-        secciones_oferta = soup.find_all('div', class_='flex-cell flex-cell-size-1of1')
+
+        secciones_oferta = self.extraer_contenedores(html, 'div', 'flex-cell flex-cell-size-1of1')
         logging.info(f"DealNews: Se encontraron {len(secciones_oferta)} secciones de oferta")
         
         for i, seccion in enumerate(secciones_oferta):
@@ -37,7 +31,7 @@ class DealsnewsScraper(BaseScraper):
                 oferta = self.extraer_oferta(seccion)
                 if oferta:
                     ofertas.append(oferta)
-                    logging.info(f"DealNews: Oferta procesada: {oferta['titulo']}")
+                    logging.info(f"DealNews: Oferta procesada: {oferta.titulo}")
                 else:
                     logging.warning(f"DealNews: No se pudo extraer oferta de la sección {i+1}")
             except Exception as e:
@@ -50,7 +44,7 @@ class DealsnewsScraper(BaseScraper):
         
         return ofertas
 
-    def extraer_oferta(self, seccion):
+    def extraer_oferta(self, seccion) -> Optional[Deal]:
         oferta = {}
         
         titulo = seccion.find('div', class_='title limit-height limit-height-large-2 limit-height-small-2')
@@ -98,8 +92,9 @@ class DealsnewsScraper(BaseScraper):
         
         if all([oferta['titulo'], oferta['precio'], oferta['link']]):
             oferta['tag'] = self.tag
+            oferta['fuente'] = self.name
             oferta['timestamp'] = int(time.time())
-            return oferta
+            return Deal(**oferta)
         else:
             logging.warning("DealNews: Oferta incompleta ignorada")
             return None
@@ -1,56 +1,154 @@
 import logging
 from bs4 import BeautifulSoup
 from typing import List, Dict, Any
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-import asyncio
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import os
 import time
-import hashlib
 import re
 
 from .base_scraper import BaseScraper
+from utils.deal import Deal
+
+# Tipos de recurso y dominios que no aportan nada a la extracción de ofertas
+RECURSOS_BLOQUEADOS = {'image', 'media', 'font'}
+DOMINIOS_BLOQUEADOS = (
+    'doubleclick.net', 'googlesyndication.com', 'google-analytics.com', 'googletagmanager.com',
+    'googletagservices.com', 'adservice.google.com', 'amazon-adsystem.com', 'facebook.net',
+    'facebook.com/tr', 'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com',
+    'scorecardresearch.com', 'quantserve.com', 'adnxs.com', 'hotjar.com', 'pubmatic.com',
+    'rubiconproject.com', 'moatads.com', 'chartbeat.com', 'bing.com/bat', 'clarity.ms',
+)
+
+
+# Extracción en el navegador: devuelve solo los campos de cada 'section.deal.row'
+# con el mismo mapeo que `extraer_campos`, sin serializar todo el DOM.
+SCRIPT_EXTRACCION_DOM = """
+() => {
+    // Igual que get_text de BeautifulSoup: sin el texto de <script>, <style> ni <template>
+    const OMITIDAS = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+    const textos = (el) => {
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+            acceptNode: (n) => OMITIDAS.has(n.nodeName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT,
+        });
+        const partes = [];
+        while (walker.nextNode()) {
+            if (walker.currentNode.nodeType === Node.TEXT_NODE) partes.push(walker.currentNode.nodeValue);
+        }
+        return partes;
+    };
+    const texto = (el) => el ? textos(el).join('') : null;
+    const textoSeparado = (el) => el ? textos(el).join(' ') : null;
+    return Array.from(document.querySelectorAll('section.deal.row')).map((seccion) => {
+        const titleSection = seccion.querySelector('div.title');
+        const tituloElem = titleSection ? titleSection.querySelector('a') : null;
+        const imageSection = seccion.querySelector('div.start_div');
+        const precioElem = imageSection ? imageSection.querySelector('span.our-price') : null;
+        const precioOriginalElem = imageSection ? imageSection.querySelector('span.list-price') : null;
+        const imagenElem = imageSection ? imageSection.querySelector('img') : null;
+        const infoCuponElem = seccion.querySelector('section.more_details');
+        return {
+            titulo: texto(tituloElem),
+            link: tituloElem ? tituloElem.getAttribute('href') : null,
+            precio: texto(precioElem),
+            precio_original: texto(precioOriginalElem),
+            imagen: imagenElem ? imagenElem.getAttribute('src') : null,
+            info_cupon: textoSeparado(infoCuponElem),
+        };
+    });
+}
+"""
+
 
 class DealsOfAmericaScraper(BaseScraper):
-    def __init__(self, name: str, url: str, tag: str):
-        super().__init__(name, url, tag)
+    def __init__(self, name: str, url: str, tag: str, timeout: float = 90.0,
+                 modo_ligero: bool = True, estado_navegador: str | None = None,
+                 extraccion_dom: bool = True):
+        super().__init__(name, url, tag, timeout)
+        # Extraer los campos con page.evaluate en lugar de serializar y reparsear la página
+        self.extraccion_dom = extraccion_dom
+        # En modo ligero se reutiliza un BrowserContext que bloquea recursos pesados
+        self.modo_ligero = modo_ligero
+        self.estado_navegador = estado_navegador
+        self._context = None
+        self._context_browser = None
+
+    async def _filtrar_peticion(self, route) -> None:
+        request = route.request
+        if request.resource_type in RECURSOS_BLOQUEADOS or any(d in request.url for d in DOMINIOS_BLOQUEADOS):
+            await route.abort()
+        else:
+            await route.continue_()
 
-    async def launch_browser(self):
-        logging.info("DealsOfAmerica: Lanzando un nuevo navegador Playwright...")
+    async def _obtener_contexto(self, browser):
+        """Devuelve el contexto reutilizable, creándolo si no existe o si cambió el navegador."""
+        if self._context is not None and self._context_browser is browser and browser.is_connected():
+            return self._context
+        await self.cerrar_contexto()
+        estado = self.estado_navegador if self.estado_navegador and os.path.exists(self.estado_navegador) else None
+        self._context = await browser.new_context(
+            storage_state=estado,
+            viewport={'width': 1280, 'height': 900},
+        )
+        await self._context.route('**/*', self._filtrar_peticion)
+        self._context_browser = browser
+        logging.info(
+            f"DealsOfAmerica: Contexto ligero creado{' con consentimiento de cookies guardado' if estado else ''}."
+        )
+        return self._context
+
+    async def cerrar_contexto(self) -> None:
+        if self._context is not None:
+            try:
+                await self._context.close()
+            except Exception as e:
+                logging.warning(f"DealsOfAmerica: Error al cerrar el contexto del navegador: {e}")
+            finally:
+                self._context = None
+                self._context_browser = None
+
+    async def _aceptar_cookies(self, page) -> None:
+        # Con el consentimiento ya persistido en el contexto no hace falta esperar el banner
+        if self.modo_ligero and self.estado_navegador and os.path.exists(self.estado_navegador):
+            return
         try:
-            p = await async_playwright().start()
-            browser = await p.chromium.launch(headless=True)
-            return browser
-        except Exception as e:
-            logging.error(f"DealsOfAmerica: Error al lanzar Playwright: {e}", exc_info=True)
-            raise
+            logging.info("DealsOfAmerica: Buscando banner de cookies...")
+            # Usar una espera más flexible para el botón
+            accept_button = page.locator('#onetrust-accept-btn-handler')
+            await accept_button.wait_for(timeout=7000)
+            await accept_button.click()
+            logging.info("DealsOfAmerica: Banner de cookies aceptado.")
+            # Esperar un poco para que la acción se procese
+            await page.wait_for_timeout(2000)
+            if self.modo_ligero and self.estado_navegador:
+                await page.context.storage_state(path=self.estado_navegador)
+                logging.info(f"DealsOfAmerica: Consentimiento de cookies guardado en {self.estado_navegador}")
+        except PlaywrightTimeoutError:
+            logging.info("DealsOfAmerica: No se encontró el banner de cookies o ya estaba aceptado.")
 
-    async def obtener_ofertas(self, browser) -> List[Dict[str, Any]]:
+    async def obtener_ofertas(self, browser) -> List[Deal]:
         logging.info(f"DealsOfAmerica: Iniciando scraping con Playwright desde {self.url}")
-        ofertas = []
         page = None
         
         try:
-            page = await browser.new_page()
+            if self.modo_ligero:
+                context = await self._obtener_contexto(browser)
+                page = await context.new_page()
+            else:
+                page = await browser.new_page()
             
             # Aumentar el tiempo de espera para la navegación
-            await page.goto(self.url, timeout=90000, wait_until='domcontentloaded')
+            await page.goto(self.url, timeout=self.timeout * 1000, wait_until='domcontentloaded')
 
             # Intentar aceptar el banner de cookies si aparece
-            try:
-                logging.info("DealsOfAmerica: Buscando banner de cookies...")
-                # Usar una espera más flexible para el botón
-                accept_button = page.locator('#onetrust-accept-btn-handler')
-                await accept_button.wait_for(timeout=7000)
-                await accept_button.click()
-                logging.info("DealsOfAmerica: Banner de cookies aceptado.")
-                # Esperar un poco para que la acción se procese
-                await page.wait_for_timeout(2000)
-            except PlaywrightTimeoutError:
-                logging.info("DealsOfAmerica: No se encontró el banner de cookies o ya estaba aceptado.")
+            await self._aceptar_cookies(page)
             
             # Esperar a que los contenedores de las ofertas estén presentes
             await page.wait_for_selector('section.deal.row', timeout=45000)
-            
-            content = await page.content()
+
+            if self.extraccion_dom:
+                campos_ofertas = await page.evaluate(SCRIPT_EXTRACCION_DOM)
+            else:
+                content = await page.content()
             
         except PlaywrightTimeoutError as e:
             logging.error(f"DealsOfAmerica: Timeout con Playwright: {e}")
@@ -67,8 +165,32 @@ class DealsOfAmericaScraper(BaseScraper):
             if page:
                 await page.close()
 
-        soup = BeautifulSoup(content, 'html.parser')
-        secciones_oferta = soup.find_all('section', class_='deal row')
+        if self.extraccion_dom:
+            return self.construir_ofertas(campos_ofertas)
+
+        # Parsear fuera del event loop para no bloquear el polling de Telegram
+        return await self.parsear_en_pool(content)
+
+    def construir_ofertas(self, campos_ofertas: List[Dict[str, Any]]) -> List[Deal]:
+        logging.info(f"DealsOfAmerica: Se encontraron {len(campos_ofertas)} secciones de oferta tras renderizado.")
+        ofertas = []
+        for campos in campos_ofertas:
+            try:
+                oferta = self.construir_oferta(campos)
+                if oferta:
+                    ofertas.append(oferta)
+            except Exception as e:
+                logging.error(f"DealsOfAmerica: Error al procesar una oferta: {e}", exc_info=True)
+
+        if not ofertas:
+            logging.warning(f"DealsOfAmerica: No se encontraron ofertas en {self.url} después de usar Playwright.")
+        else:
+            logging.info(f"DealsOfAmerica: Se encontraron {len(ofertas)} ofertas en total.")
+        return ofertas
+
+    def parsear_ofertas(self, html: str) -> List[Deal]:
+        ofertas = []
+        secciones_oferta = self.extraer_contenedores(html, 'section', 'deal row')
         logging.info(f"DealsOfAmerica: Se encontraron {len(secciones_oferta)} secciones de oferta tras renderizado.")
         
         for seccion in secciones_oferta:
@@ -76,7 +198,7 @@ class DealsOfAmericaScraper(BaseScraper):
                 oferta = self.extraer_oferta(seccion)
                 if oferta:
                     ofertas.append(oferta)
-                    logging.debug(f"DealsOfAmerica: Oferta procesada: {oferta['titulo']}")
+                    logging.debug(f"DealsOfAmerica: Oferta procesada: {oferta.titulo}")
             except Exception as e:
                 logging.error(f"DealsOfAmerica: Error al procesar una oferta: {e}", exc_info=True)
         
@@ -87,57 +209,74 @@ class DealsOfAmericaScraper(BaseScraper):
         
         return ofertas
 
-    def extraer_oferta(self, seccion: BeautifulSoup) -> Dict[str, Any] | None:
-        try:
-            # El título y el enlace están en la sección principal de detalles
-            title_section = seccion.find('div', class_='title')
-            titulo_elem = title_section.find('a') if title_section else None
-            titulo = self.limpiar_texto(titulo_elem.text) if titulo_elem else None
-
-            if not titulo:
-                return None
-
-            link = titulo_elem.get('href') if titulo_elem else None
-            if link and not link.startswith('http'):
-                link = f"https://www.dealsofamerica.com{link}"
-
-            # El precio está en la sección de la imagen y en la principal. Usamos la de la imagen.
-            image_section = seccion.find('div', class_='start_div')
-            precio_elem = image_section.find('span', class_='our-price') if image_section else None
-            precio = self.limpiar_texto(precio_elem.text) if precio_elem else 'No disponible'
-
-            precio_original_elem = image_section.find('span', class_='list-price') if image_section else None
-            precio_original = self.limpiar_texto(precio_original_elem.text) if precio_original_elem else None
-
-            imagen_elem = image_section.find('img') if image_section else None
-            imagen = imagen_elem.get('src') if imagen_elem else None
-
-            # La información del cupón o detalles adicionales están en 'more_details'
-            cupon = None
-            info_cupon_elem = seccion.find('section', class_='more_details')
-            info_cupon = self.limpiar_texto(info_cupon_elem.get_text(separator=' ')) if info_cupon_elem else None
-
-            # Intentar extraer el código del cupón de forma más específica
-            if info_cupon:
-                # Patrón para buscar "w/Coupon CODIGO", "coupon CODIGO", "code CODIGO", etc.
-                # El código suele ser alfanumérico y de 4+ caracteres.
-                match = re.search(r'(?:w/coupon|coupon|code)\s+([A-Z0-9]{4,})', info_cupon, re.IGNORECASE)
-                if match:
-                    cupon = match.group(1)
-
-            if all([titulo, link]):
-                return {
-                    'titulo': titulo,
-                    'precio': precio,
-                    'precio_original': precio_original,
-                    'link': link,
-                    'imagen': imagen,
-                    'tag': self.tag,
-                    'timestamp': int(time.time()),
-                    'cupon': cupon,
-                    'info_cupon': info_cupon
-                }
+    def extraer_campos(self, seccion: BeautifulSoup) -> Dict[str, Any]:
+        """Extrae los campos en bruto de una sección; `SCRIPT_EXTRACCION_DOM` replica este mapeo."""
+        # El título y el enlace están en la sección principal de detalles
+        title_section = seccion.find('div', class_='title')
+        titulo_elem = title_section.find('a') if title_section else None
+
+        # El precio está en la sección de la imagen y en la principal. Usamos la de la imagen.
+        image_section = seccion.find('div', class_='start_div')
+        precio_elem = image_section.find('span', class_='our-price') if image_section else None
+        precio_original_elem = image_section.find('span', class_='list-price') if image_section else None
+        imagen_elem = image_section.find('img') if image_section else None
+
+        # La información del cupón o detalles adicionales están en 'more_details'
+        info_cupon_elem = seccion.find('section', class_='more_details')
+
+        return {
+            'titulo': titulo_elem.text if titulo_elem else None,
+            'link': titulo_elem.get('href') if titulo_elem else None,
+            'precio': precio_elem.text if precio_elem else None,
+            'precio_original': precio_original_elem.text if precio_original_elem else None,
+            'imagen': imagen_elem.get('src') if imagen_elem else None,
+            'info_cupon': info_cupon_elem.get_text(separator=' ') if info_cupon_elem else None,
+        }
+
+    def construir_oferta(self, campos: Dict[str, Any]) -> Deal | None:
+        """Limpia los campos en bruto y construye la oferta."""
+        titulo = self.limpiar_texto(campos['titulo']) if campos.get('titulo') else None
+        if not titulo:
             return None
+
+        link = campos.get('link')
+        if link and not link.startswith('http'):
+            link = f"https://www.dealsofamerica.com{link}"
+
+        precio = self.limpiar_texto(campos['precio']) if campos.get('precio') is not None else 'No disponible'
+        precio_original = (
+            self.limpiar_texto(campos['precio_original']) if campos.get('precio_original') is not None else None
+        )
+        imagen = campos.get('imagen')
+        info_cupon = self.limpiar_texto(campos['info_cupon']) if campos.get('info_cupon') is not None else None
+
+        # Intentar extraer el código del cupón de forma más específica
+        cupon = None
+        if info_cupon:
+            # Patrón para buscar "w/Coupon CODIGO", "coupon CODIGO", "code CODIGO", etc.
+            # El código suele ser alfanumérico y de 4+ caracteres.
+            match = re.search(r'(?:w/coupon|coupon|code)\s+([A-Z0-9]{4,})', info_cupon, re.IGNORECASE)
+            if match:
+                cupon = match.group(1)
+
+        if all([titulo, link]):
+            return Deal(
+                titulo=titulo,
+                precio=precio,
+                precio_original=precio_original,
+                link=link,
+                imagen=imagen,
+                tag=self.tag,
+                fuente=self.name,
+                timestamp=int(time.time()),
+                cupon=cupon,
+                info_cupon=info_cupon,
+            )
+        return None
+
+    def extraer_oferta(self, seccion: BeautifulSoup) -> Deal | None:
+        try:
+            return self.construir_oferta(self.extraer_campos(seccion))
         except Exception as e:
             logging.error(f"DealsOfAmerica: Error al extraer datos de una sección: {e}")
-            return None
\ No newline at end of file
+            return None
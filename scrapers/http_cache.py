@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+from typing import Dict, Any, List, Optional
+
+from utils.deal import Deal
+
+
+class ResponseCache:
+    """
+    Caché de respuestas por URL para peticiones condicionales. Guarda los
+    validadores (ETag / Last-Modified), el hash del cuerpo y las ofertas ya
+    parseadas, en memoria y en un fichero JSON, para no volver a descargar ni
+    parsear páginas que no han cambiado.
+    """
+
+    def __init__(self, ruta: Optional[str] = None):
+        self.ruta = ruta
+        self._entradas: Dict[str, Dict[str, Any]] = {}
+        self._cargar()
+
+    def _cargar(self) -> None:
+        if not self.ruta or not os.path.exists(self.ruta):
+            return
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                self._entradas = json.load(f)
+            logging.info(f"Caché HTTP cargada con {len(self._entradas)} URLs desde {self.ruta}")
+        except (OSError, ValueError) as e:
+            logging.warning(f"No se pudo cargar la caché HTTP desde {self.ruta}: {e}")
+            self._entradas = {}
+
+    def _guardar(self) -> None:
+        if not self.ruta:
+            return
+        temporal = f"{self.ruta}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._entradas, f)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            logging.warning(f"No se pudo guardar la caché HTTP en {self.ruta}: {e}")
+
+    def validadores(self, url: str) -> Dict[str, str]:
+        """Cabeceras condicionales para la URL; vacías si no hay ofertas que reutilizar."""
+        entrada = self._entradas.get(url)
+        if not entrada or not entrada.get('ofertas'):
+            return {}
+        headers = {}
+        if entrada.get('etag'):
+            headers['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            headers['If-Modified-Since'] = entrada['last_modified']
+        return headers
+
+    def mismo_contenido(self, url: str, hash_cuerpo: str) -> bool:
+        entrada = self._entradas.get(url)
+        return bool(entrada and entrada.get('ofertas') and entrada.get('hash') == hash_cuerpo)
+
+    def ofertas(self, url: str) -> List[Deal]:
+        entrada = self._entradas.get(url) or {}
+        return [Deal.desde_dict(oferta) for oferta in entrada.get('ofertas', [])]
+
+    def actualizar(self, url: str, etag: Optional[str], last_modified: Optional[str],
+                   hash_cuerpo: str, ofertas: List[Deal]) -> None:
+        self._entradas[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'hash': hash_cuerpo,
+            'ofertas': [oferta.a_dict() for oferta in ofertas],
+        }
+        self._guardar()
@@ -1,26 +1,23 @@
 import logging
-from bs4 import BeautifulSoup
-import requests
-from typing import List, Dict, Any
-from retrying import retry
-import hashlib
+from typing import List
 import time
 
 from .base_scraper import BaseScraper
+from utils.deal import Deal
 
 class SlickdealsScraper(BaseScraper):
-    def __init__(self, name: str, url: str, tag: str):
-        super().__init__(name, url, tag)
+    def __init__(self, name: str, url: str, tag: str, timeout: float = 30.0):
+        super().__init__(name, url, tag, timeout)
 
-    @retry(stop_max_attempt_number=3, wait_fixed=5000)
-    def obtener_ofertas(self) -> List[Dict[str, Any]]:
+    async def obtener_ofertas(self) -> List[Deal]:
         logging.info(f"Slickdeals: Iniciando scraping desde {self.url}")
-        response = requests.get(self.url)
-        logging.info(f"Slickdeals: Respuesta obtenida. Código de estado: {response.status_code}")
-        soup = BeautifulSoup(response.content, 'html.parser')
+        return await self.obtener_ofertas_http()
+
+    def parsear_ofertas(self, html: str) -> List[Deal]:
         ofertas = []
-        
-        for oferta in soup.find_all('div', {'class': 'dealCard__content'}):
+        contenedores = self.extraer_contenedores(html, 'div', 'dealCard__content')
+
+        for oferta in contenedores:
             try:
                 titulo = self.limpiar_texto(oferta.find('a', {'class': 'dealCard__title'}).text)
                 link = 'https://slickdeals.net' + oferta.find('a', {'class': 'dealCard__title'})['href']
@@ -39,17 +36,16 @@ class SlickdealsScraper(BaseScraper):
                     logging.warning("Se detectó una tarjeta de carga, ignorando...")
                     continue
                 
-                nueva_oferta = {
-                    'titulo': titulo,
-                    'precio': precio,
-                    'precio_original': precio_original,
-                    'link': link,
-                    'imagen': imagen,
-                    'tag': self.tag,
-                    'timestamp': int(time.time()),
-                    'cupon': None,
-                    'info_cupon': None
-                }
+                nueva_oferta = Deal(
+                    titulo=titulo,
+                    precio=precio,
+                    precio_original=precio_original,
+                    link=link,
+                    imagen=imagen,
+                    tag=self.tag,
+                    fuente=self.name,
+                    timestamp=int(time.time()),
+                )
                 
                 ofertas.append(nueva_oferta)
                 logging.info(f"Slickdeals: Oferta procesada: {titulo}")
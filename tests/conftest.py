@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite importar los paquetes del bot al ejecutar pytest desde cualquier directorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
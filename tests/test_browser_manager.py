@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from scrapers import browser_manager
+from scrapers.browser_manager import BrowserManager
+
+
+class NavegadorFalso:
+    def __init__(self):
+        self.conectado = True
+
+    def is_connected(self):
+        return self.conectado
+
+    async def close(self):
+        self.conectado = False
+
+
+class DriverFalso:
+    """Driver de Playwright; `muerto` simula que el proceso del driver terminó."""
+
+    def __init__(self, muerto: bool = False):
+        self.muerto = muerto
+        self.detenido = False
+        self.chromium = self
+
+    async def launch(self, headless=True):
+        if self.muerto:
+            raise ConnectionError('Connection closed')
+        return NavegadorFalso()
+
+    async def stop(self):
+        self.detenido = True
+
+
+def _arrancar_drivers(monkeypatch, drivers):
+    class Arranque:
+        async def start(self):
+            return drivers.pop(0)
+
+    monkeypatch.setattr(browser_manager, 'async_playwright', Arranque)
+
+
+def test_relanza_el_driver_si_murio(monkeypatch):
+    primero, segundo = DriverFalso(), DriverFalso()
+    _arrancar_drivers(monkeypatch, [primero, segundo])
+
+    async def escenario():
+        manager = BrowserManager()
+        navegador = await manager.iniciar()
+        # Se caen el navegador y el driver: el siguiente uso arranca un driver nuevo
+        navegador.conectado = False
+        primero.muerto = True
+        async with manager.usar() as relanzado:
+            assert relanzado.is_connected()
+        return manager
+
+    manager = asyncio.run(escenario())
+    assert primero.detenido
+    assert manager._playwright is segundo
+
+
+def test_reintenta_una_sola_vez(monkeypatch):
+    drivers = [DriverFalso(muerto=True), DriverFalso(muerto=True), DriverFalso()]
+    _arrancar_drivers(monkeypatch, drivers)
+
+    async def escenario():
+        manager = BrowserManager()
+        with pytest.raises(ConnectionError):
+            await manager.iniciar()
+        assert manager._playwright is None
+        # El siguiente uso vuelve a intentarlo desde cero
+        async with manager.usar() as navegador:
+            return navegador.is_connected()
+
+    assert asyncio.run(escenario())
+    assert drivers == []
@@ -0,0 +1,176 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from database import db_manager
+from database.bloom_filter import BloomFilter
+from database.db_manager import DBManager
+from utils.deal import Deal
+
+
+def _oferta(i: int) -> Deal:
+    return Deal(titulo=f'Oferta {i} ' + 'x' * 200, link=f'https://tienda.example/p/{i}',
+                precio=f'${i}.99', fuente='tienda', tag='#tienda')
+
+
+def test_limpieza_devuelve_todas_las_paginas_libres(tmp_path):
+    async def escenario():
+        db = DBManager(str(tmp_path / 'ofertas.db'), limpieza_lote=1000, limpieza_max_lotes=10)
+        await db.init_db()
+        await db.guardar_ofertas([_oferta(i) for i in range(2000)])
+        conn = await db._get_conn()
+        await conn.execute("UPDATE ofertas SET timestamp = ?", (int(time.time()) - 40 * 24 * 3600,))
+        await conn.commit()
+        eliminadas = await db.limpiar_ofertas_antiguas(dias=30)
+        async with conn.execute("PRAGMA freelist_count") as cursor:
+            libres = (await cursor.fetchone())[0]
+        await db.close()
+        return eliminadas, libres
+
+    eliminadas, libres = asyncio.run(escenario())
+    assert eliminadas == 2000
+    assert libres == 0
+
+
+def test_migracion_fallida_no_deja_cambios_a_medias(tmp_path, monkeypatch):
+    ruta = str(tmp_path / 'ofertas.db')
+    # Base de datos anterior a la migración 2, con una fila que hará fallar el relleno
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE ofertas (id TEXT PRIMARY KEY, titulo TEXT, precio TEXT, precio_original TEXT, "
+                 "link TEXT, imagen TEXT, tag TEXT, cupon TEXT, timestamp INTEGER)")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    migraciones = list(DBManager.MIGRACIONES)
+    migraciones[1] = (2, migraciones[1][1][:1] + ("UPDATE tabla_inexistente SET x = 1",))
+    monkeypatch.setattr(DBManager, 'MIGRACIONES', tuple(migraciones))
+
+    async def iniciar():
+        db = DBManager(ruta)
+        try:
+            await db.init_db()
+        finally:
+            await db.close()
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(iniciar())
+    conn = sqlite3.connect(ruta)
+    columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(ofertas)")]
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    assert 'fuente' not in columnas
+    assert version == 1
+
+    # Con la migración corregida, el siguiente arranque la aplica sin columnas duplicadas
+    monkeypatch.undo()
+    asyncio.run(iniciar())
+
+
+def test_primeras_vistas_desde_el_historial(tmp_path):
+    async def escenario():
+        db = DBManager(str(tmp_path / 'ofertas.db'))
+        await db.init_db()
+        await db.guardar_ofertas([_oferta(1)])
+        conn = await db._get_conn()
+        await conn.execute("UPDATE historial_precios SET timestamp = 1000")
+        await conn.commit()
+        await db.guardar_ofertas([_oferta(1)])
+        primeras = await db.obtener_primeras_vistas([_oferta(1).identidad, _oferta(2).identidad])
+        await db.close()
+        return primeras
+
+    assert asyncio.run(escenario()) == {_oferta(1).identidad: 1000}
+
+
+def test_historial_se_siembra_solo_en_la_migracion(tmp_path):
+    ruta = str(tmp_path / 'ofertas.db')
+    # Base de datos de antes de las migraciones, con ofertas ya enviadas
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE ofertas (id TEXT PRIMARY KEY, titulo TEXT, precio TEXT, precio_original TEXT, "
+                 "link TEXT, imagen TEXT, tag TEXT, cupon TEXT, timestamp INTEGER)")
+    conn.executemany("INSERT INTO ofertas (id, titulo, precio, link, tag, timestamp) VALUES (?, ?, ?, ?, ?, ?)", [
+        ('a', 'Oferta a', '$10.00', 'https://tienda.example/a', '#tienda', 1000),
+        ('b', 'Oferta b', 'No disponible', 'https://tienda.example/b', '#tienda', 1000),
+    ])
+    conn.commit()
+    conn.close()
+
+    async def arrancar():
+        db = DBManager(ruta)
+        await db.init_db()
+        await db.close()
+
+    def historial():
+        conn = sqlite3.connect(ruta)
+        filas = conn.execute("SELECT identidad, precio_centavos, fuente FROM historial_precios").fetchall()
+        conn.close()
+        return filas
+
+    asyncio.run(arrancar())
+    identidad = Deal(titulo='Oferta a', link='https://tienda.example/a').identidad
+    assert historial() == [(identidad, 1000, 'tienda')]
+
+    # Un historial vacío (p. ej. tras la limpieza) no se vuelve a sembrar en el siguiente arranque
+    conn = sqlite3.connect(ruta)
+    conn.execute("DELETE FROM historial_precios")
+    conn.commit()
+    conn.close()
+    asyncio.run(arrancar())
+    assert historial() == []
+
+
+def test_filtro_bloom_incluye_lo_guardado_antes_de_una_caida(tmp_path):
+    ruta = str(tmp_path / 'ofertas.db')
+
+    async def escenario():
+        db = DBManager(ruta)
+        await db.init_db()
+        await db.guardar_ofertas([_oferta(1)])
+        await db.guardar_filtro_bloom()
+        await db.guardar_ofertas([_oferta(2)])
+        # Caída: la conexión se cierra sin volver a persistir el filtro
+        await db._conn.close()
+
+        db = DBManager(ruta, cooldown_segundos=0)
+        await db.init_db()
+        en_filtro = [_oferta(i).identidad in db._bloom for i in (1, 2)]
+        duplicada = await db.es_oferta_duplicada(_oferta(2).identidad)
+        await db.close()
+        return en_filtro, duplicada
+
+    en_filtro, duplicada = asyncio.run(escenario())
+    assert en_filtro == [True, True]
+    assert duplicada
+
+
+def test_reconstruccion_conserva_lo_guardado_durante_el_recorrido(tmp_path, monkeypatch):
+    async def escenario():
+        db = DBManager(str(tmp_path / 'ofertas.db'))
+        await db.init_db()
+        await db.guardar_ofertas([_oferta(i) for i in range(5000)])
+        recorriendo = asyncio.Event()
+
+        class BloomObservado(BloomFilter):
+            def add(self, elemento):
+                self.vistas = getattr(self, 'vistas', 0) + 1
+                if self.vistas == 2500:
+                    recorriendo.set()
+                super().add(elemento)
+
+        monkeypatch.setattr(db_manager, 'BloomFilter', BloomObservado)
+        reconstruccion = asyncio.create_task(db._reconstruir_filtro_bloom())
+        # A mitad del recorrido (por el índice de identidad) se guarda una oferta
+        # cuya identidad queda por detrás del cursor
+        await recorriendo.wait()
+        nueva = next(o for o in map(_oferta, range(9000, 10000)) if o.identidad < '1')
+        await db.guardar_ofertas([nueva])
+        assert not reconstruccion.done()
+        await reconstruccion
+        en_filtro = nueva.identidad in db._bloom
+        await db.close()
+        return en_filtro
+
+    assert asyncio.run(escenario())
@@ -0,0 +1,32 @@
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.deal import Deal
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _oferta() -> Deal:
+    return Deal(titulo='Ninja 4-Qt Air Fryer AF101', link='https://tienda.example/p/1', precio='$69.99',
+                precio_original='$129.99', fuente='tienda', timestamp=1000)
+
+
+def test_oferta_de_otro_proceso_es_igual_a_la_local():
+    # Como en el pool de parseo: la oferta se crea en otro proceso (otra semilla de hash) y viaja con pickle
+    codigo = ("import pickle, sys; from tests.test_deal import _oferta; "
+              "sys.stdout.buffer.write(pickle.dumps(_oferta()))")
+    entorno = dict(os.environ, PYTHONHASHSEED='12345')
+    remota = pickle.loads(subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, env=entorno,
+                                         capture_output=True, check=True).stdout)
+    local = _oferta()
+    assert remota == local
+    assert hash(remota) == hash(local)
+    assert len({remota, local}) == 1
+
+
+def test_igualdad_por_id():
+    assert _oferta() == _oferta()
+    assert _oferta() != Deal(titulo='Ninja 4-Qt Air Fryer AF101', link='https://tienda.example/p/1', precio='$59.99')
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from benchmarks.bench_scrapers import FIXTURES, campos_navegador, _backends
+from scrapers.dealsofamerica_scraper import DealsOfAmericaScraper
+
+SECCION = """
+<section class="deal row">
+  <div class="start_div"><span class="our-price">$5<script>var p = 1;</script></span></div>
+  <div class="title"><a href="/deal/1">Thing <style>.x{}</style>One</a></div>
+  <section class="more_details">Use <b>code ABCD</b><script>track("x")</script> now <!-- c --></section>
+</section>
+"""
+
+
+def _campos(html: str, backend: str):
+    scraper = DealsOfAmericaScraper('dealsofamerica', 'https://dealsofamerica.example/', '#dealsofamerica')
+    secciones = scraper.extraer_contenedores(html, 'section', 'deal row', backend)
+    return [scraper.extraer_campos(seccion) for seccion in secciones]
+
+
+@pytest.mark.parametrize('backend', _backends('todos'))
+def test_extraer_campos_omite_script_y_style(backend):
+    campos, = _campos(SECCION, backend)
+    assert campos['titulo'] == 'Thing One'
+    assert campos['precio'] == '$5'
+    assert campos['info_cupon'] == 'Use  code ABCD  now '
+
+
+@pytest.mark.parametrize('html', [SECCION, (FIXTURES / 'dealsofamerica.html').read_text(encoding='utf-8')])
+def test_extraccion_en_navegador_coincide_con_extraer_campos(html):
+    navegador = asyncio.run(campos_navegador([html]))
+    if navegador is None:
+        pytest.skip('Chromium de Playwright no instalado')
+    for backend in _backends('todos'):
+        assert navegador[0] == _campos(html, backend)
@@ -0,0 +1,27 @@
+from utils.near_duplicates import NearDuplicateIndex, tokenizar_titulo
+
+
+def _es_duplicado(titulo_a: str, titulo_b: str) -> bool:
+    indice = NearDuplicateIndex()
+    indice.agregar('a', titulo_a, 'slickdeals')
+    return indice.buscar(titulo_b, 'dealnews') is not None
+
+
+def test_misma_oferta_en_otra_fuente_es_duplicada():
+    assert _es_duplicado("Samsung 65\" Class QLED 4K Q80C Smart TV",
+                         "Samsung Q80C 65-Inch QLED 4K Smart TV for $999.99 + free shipping")
+    assert _es_duplicado("Apple AirPods Pro 2nd Gen with USB-C MagSafe Case $189",
+                         "Apple AirPods Pro (2nd Generation) w/ MagSafe USB-C Case")
+
+
+def test_otra_medida_o_modelo_no_es_duplicado():
+    assert not _es_duplicado("Samsung 65\" Class QLED 4K Q80C Smart TV",
+                             "Samsung 55\" Class QLED 4K Q80C Smart TV")
+    assert not _es_duplicado("Sony WH-1000XM5 Wireless Noise Canceling Headphones",
+                             "Sony WH-1000XM4 Wireless Noise Canceling Headphones")
+
+
+def test_las_medidas_son_un_solo_token():
+    assert {'65in', '1tb', '6qt'} <= tokenizar_titulo('TV 65" + 1 TB drive + 6-Qt pot')
+    assert '20in' not in tokenizar_titulo('Buy 20 in cart')
+    assert '24000mah' in tokenizar_titulo('Power Bank 24,000mAh')
@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.pipeline import DealPipeline
+from bot.selector import DealSelector
+from utils.deal import Deal
+
+FUENTES = ('slickdeals', 'dealnews', 'dealsofamerica')
+
+
+class IndiceNulo:
+    def agregar(self, *args):
+        pass
+
+    def buscar(self, *args):
+        return None
+
+    def eliminar(self, *args):
+        pass
+
+
+class BotFalso:
+    def __init__(self, max_ofertas: int):
+        self.config = SimpleNamespace(MAX_OFERTAS_POR_EJECUCION=max_ofertas, SELECCION_PERIODO_SECONDS=3600)
+        self.scrapers = {fuente: {'enabled': True} for fuente in FUENTES}
+        self.selector = DealSelector(max_ofertas)
+        self.encoladas = []
+        self.db_manager = SimpleNamespace(en_outbox=lambda identidad: False, encolar_outbox=self._encolar_outbox,
+                                          obtener_primeras_vistas=self._obtener_primeras_vistas)
+
+    async def _encolar_outbox(self, ofertas):
+        self.encoladas.extend(ofertas)
+
+    async def _obtener_primeras_vistas(self, identidades):
+        return {}
+
+    def _crear_indice_casi_duplicados(self):
+        return IndiceNulo()
+
+    async def _filter_new_deals(self, ofertas_por_fuente):
+        return ofertas_por_fuente
+
+    def seleccionar_ofertas_equilibradas(self, ofertas_por_fuente, primeras_vistas=None, **presupuesto):
+        return self.selector.seleccionar(ofertas_por_fuente, primeras_vistas=primeras_vistas, **presupuesto)
+
+
+def _ofertas(fuente: str, cantidad: int):
+    return [Deal(titulo=f"{fuente} oferta {i}", link=f"https://{fuente}.example/{i}", precio=f"${i + 1}.00",
+                 precio_original=f"${2 * i + 10}.00", fuente=fuente) for i in range(cantidad)]
+
+
+async def _publicar_escalonado(bot: BotFalso, periodos: int = 1):
+    pipeline = DealPipeline(bot)
+    tareas = [asyncio.create_task(pipeline._etapa_dedup()), asyncio.create_task(pipeline._etapa_seleccion())]
+    try:
+        for _ in range(periodos):
+            pipeline.nuevo_periodo()
+            for fuente in FUENTES:
+                # Cada fuente termina su scraping cuando la anterior ya pasó la selección
+                await pipeline.publicar(fuente, _ofertas(fuente, 50))
+                await pipeline.cola_candidatas.join()
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def test_cupo_por_periodo_con_fuentes_escalonadas():
+    bot = BotFalso(max_ofertas=20)
+    asyncio.run(_publicar_escalonado(bot))
+    assert len(bot.encoladas) == 20
+    por_fuente = {fuente: sum(oferta.fuente == fuente for oferta in bot.encoladas) for fuente in FUENTES}
+    # La primera fuente en llegar no acapara el cupo: ceil(20 / 3) cada una, la última rellena
+    assert por_fuente == {'slickdeals': 7, 'dealnews': 7, 'dealsofamerica': 6}
+
+
+def test_cada_periodo_tiene_su_cupo():
+    bot = BotFalso(max_ofertas=20)
+    asyncio.run(_publicar_escalonado(bot, periodos=2))
+    assert len(bot.encoladas) == 40
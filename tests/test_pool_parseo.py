@@ -0,0 +1,21 @@
+import asyncio
+import logging
+
+from benchmarks.bench_scrapers import FIXTURES
+from scrapers.base_scraper import BaseScraper
+from scrapers.dealsofamerica_scraper import DealsOfAmericaScraper
+
+
+def test_los_logs_de_los_workers_llegan_al_proceso_principal(caplog):
+    caplog.set_level(logging.INFO)
+    html = (FIXTURES / 'dealsofamerica.html').read_text(encoding='utf-8')
+    scraper = DealsOfAmericaScraper('dealsofamerica', 'https://dealsofamerica.example/', '#dealsofamerica')
+    BaseScraper.configurar_pool_parseo(1)
+    try:
+        ofertas = asyncio.run(scraper.parsear_en_pool(html))
+    finally:
+        BaseScraper.cerrar_pool_parseo()
+        BaseScraper.configurar_pool_parseo(0)
+    assert len(ofertas) == 3
+    mensajes = [registro.getMessage() for registro in caplog.records]
+    assert "DealsOfAmerica: Se encontraron 3 ofertas en total." in mensajes
@@ -0,0 +1,26 @@
+from utils.prices import calcular_descuento, parsear_precio
+
+
+def test_parsear_precio():
+    assert parsear_precio('$19.99') == 1999
+    assert parsear_precio('$ 1,299.00') == 129900
+    assert parsear_precio('$1299') == 129900
+    assert parsear_precio('2 for $10, 3 for $15') == 1000
+    assert parsear_precio('Free') == 0
+    assert parsear_precio('19.99') == 1999
+    assert parsear_precio('No disponible') is None
+
+
+def test_miles_en_grupos_exactos_de_tres_cifras():
+    assert parsear_precio('$1,2345') is None
+    assert parsear_precio('$10,5') is None
+    assert parsear_precio('$5,000') == 500000
+
+
+def test_calcular_descuento():
+    assert calcular_descuento(5000, 10000) == 50.0
+    assert calcular_descuento(None, None, '40% off') == 40.0
+    assert calcular_descuento(None, None, '100% off') == 100.0
+    assert calcular_descuento(None, None, '150% off') == 100.0
+    assert calcular_descuento(None, None, '12.5% off') == 12.5
+    assert calcular_descuento(10000, 5000) is None
@@ -0,0 +1,27 @@
+from bot.selector import DealSelector
+from utils.deal import Deal
+
+AHORA = 1_700_000_000
+
+
+def _oferta(nombre: str) -> Deal:
+    # Mismo descuento y mismo timestamp de scraping: solo difiere la primera vez que se vieron
+    return Deal(titulo=nombre, link=f'https://tienda.example/{nombre}', precio='$50.00', precio_original='$100.00',
+                fuente='tienda', timestamp=AHORA)
+
+
+def test_frescura_desde_la_primera_vista():
+    vieja, nueva = _oferta('vieja'), _oferta('nueva')
+    selector = DealSelector(max_ofertas=1)
+    elegidas = selector.seleccionar({'tienda': [vieja, nueva]}, ahora=AHORA,
+                                    primeras_vistas={vieja.identidad: AHORA - 2 * 24 * 3600})
+    assert elegidas == [nueva]
+    assert selector.puntuar(vieja, AHORA, AHORA - 2 * 24 * 3600) < selector.puntuar(nueva, AHORA)
+
+
+def test_cuota_por_fuente_sin_presupuesto():
+    selector = DealSelector(max_ofertas=4)
+    ofertas = {fuente: [_oferta(f'{fuente}{i}') for i in range(5)] for fuente in ('a', 'b')}
+    elegidas = selector.seleccionar(ofertas, ahora=AHORA)
+    assert len(elegidas) == 4
+    assert sum(oferta.titulo.startswith('a') for oferta in elegidas) == 2
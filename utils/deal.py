@@ -0,0 +1,73 @@
+import hashlib
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+from utils.deal_identity import generar_identidad
+from utils.prices import calcular_descuento, parsear_precio
+
+
+def calcular_id_oferta(titulo: str, precio: Optional[str], link: str,
+                       imagen: Optional[str] = None, precio_original: Optional[str] = None) -> str:
+    """ID de contenido de una oferta: cambia si cambia el precio, la imagen o el título."""
+    campos = [titulo, precio, link, imagen or '', precio_original or '']
+    contenido = '|'.join([str(campo) for campo in campos if campo])
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Deal:
+    """
+    Oferta scrapeada. Inmutable y con `__slots__`; el ID, la identidad canónica,
+    los precios en centavos y el descuento se calculan una sola vez al crearla.
+    Se compara y se hashea por ID, así que guardarla en conjuntos es O(1).
+    """
+    titulo: str
+    link: str
+    precio: Optional[str] = 'No disponible'
+    precio_original: Optional[str] = None
+    imagen: Optional[str] = None
+    tag: str = ''
+    fuente: Optional[str] = None
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+    cupon: Optional[str] = None
+    info_cupon: Optional[str] = None
+    # Mínimo anterior en centavos cuando la oferta se vuelve a publicar por una bajada de precio
+    precio_minimo_anterior: Optional[int] = None
+    id: str = field(init=False, repr=False)
+    identidad: str = field(init=False, repr=False)
+    precio_centavos: Optional[int] = field(init=False, repr=False)
+    precio_original_centavos: Optional[int] = field(init=False, repr=False)
+    descuento: Optional[float] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        id_oferta = calcular_id_oferta(self.titulo, self.precio, self.link, self.imagen, self.precio_original)
+        object.__setattr__(self, 'id', id_oferta)
+        object.__setattr__(self, 'identidad', generar_identidad(self))
+        precio = parsear_precio(self.precio)
+        precio_original = parsear_precio(self.precio_original)
+        object.__setattr__(self, 'precio_centavos', precio)
+        object.__setattr__(self, 'precio_original_centavos', precio_original)
+        object.__setattr__(self, 'descuento', calcular_descuento(precio, precio_original, self.precio))
+
+    def __hash__(self) -> int:
+        # No se guarda el hash en un campo: viajaría con pickle desde los procesos
+        # de parseo, donde el hash de las cadenas usa otra semilla; str ya lo cachea
+        return hash(self.id)
+
+    def __eq__(self, otra: object) -> bool:
+        if not isinstance(otra, Deal):
+            return NotImplemented
+        return self.id == otra.id
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Campos de la oferta como diccionario plano (para JSON)."""
+        return {campo: getattr(self, campo) for campo in CAMPOS_DEAL}
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'Deal':
+        return cls(**{campo: datos[campo] for campo in CAMPOS_DEAL if campo in datos})
+
+
+# Campos de datos de la oferta, sin los derivados que se calculan al crearla
+CAMPOS_DEAL = tuple(f.name for f in fields(Deal) if f.init)
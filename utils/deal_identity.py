@@ -0,0 +1,78 @@
+import hashlib
+import re
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+
+if TYPE_CHECKING:
+    from utils.deal import Deal  # utils.deal importa este módulo
+
+# Parámetros de seguimiento/afiliados que no cambian el producto enlazado
+PARAMETROS_SEGUIMIENTO = {
+    'ref', 'ref_', 'tag', 'affid', 'aff_id', 'affiliate', 'clickid', 'irclickid', 'irgwc',
+    'gclid', 'fbclid', 'msclkid', 'dclid', 'mc_cid', 'mc_eid', 'cjevent', 'subid', 'sid',
+    'ascsubtag', 'linkcode', 'linkid', 'camp', 'creative', 'creativeasin', 'psc', 'th',
+    'src', 'source', 'campaign', 'wmlspartner', 'veh', 'sourceid', 'u1', 'mkevt', 'mkcid',
+    'mkrid', 'campid', 'toolid', 'customid', 'sdtid', 'sdfid', 'sdop', 'attrsrc', 'pv',
+}
+PREFIJOS_SEGUIMIENTO = ('utm_', 'pf_rd_', 'pd_rd_', 'sd_', 'mkt_', '_encoding')
+
+# Claves de producto por comercio: (patrón de host, regex sobre ruta+query, prefijo)
+CLAVES_PRODUCTO = (
+    (r'(^|\.)amazon\.', re.compile(r'/(?:dp|gp/product|gp/aw/d|exec/obidos/asin)/([A-Z0-9]{10})(?:[/?]|$)', re.I), 'amazon'),
+    (r'(^|\.)walmart\.com$', re.compile(r'/ip/(?:[^/]+/)?(\d+)'), 'walmart'),
+    (r'(^|\.)bestbuy\.com$', re.compile(r'(?:skuId=|/)(\d{7})(?:\.p|&|$)'), 'bestbuy'),
+    (r'(^|\.)ebay\.com$', re.compile(r'/itm/(?:[^/]+/)?(\d{9,})'), 'ebay'),
+    (r'(^|\.)target\.com$', re.compile(r'/A-(\d+)'), 'target'),
+    (r'(^|\.)newegg\.com$', re.compile(r'/p/([A-Z0-9-]+)', re.I), 'newegg'),
+    (r'(^|\.)slickdeals\.net$', re.compile(r'/f/(\d+)'), 'slickdeals'),
+    (r'(^|\.)dealnews\.com$', re.compile(r'click\.html\?(?:\d+,)*(\d+)'), 'dealnews'),
+)
+
+
+def normalizar_url(url: str) -> str:
+    """
+    Normaliza un enlace: esquema y host en minúsculas, sin 'www.', sin fragmento,
+    sin parámetros de seguimiento y con la query ordenada.
+    """
+    if not url:
+        return ''
+    partes = urlsplit(url.strip())
+    host = partes.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True)
+        if clave.lower() not in PARAMETROS_SEGUIMIENTO
+        and not clave.lower().startswith(PREFIJOS_SEGUIMIENTO)
+    )
+    ruta = partes.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, ruta, urlencode(query), ''))
+
+
+def extraer_clave_producto(url: str) -> Optional[str]:
+    """Devuelve una clave de producto del comercio (p. ej. 'amazon:B0XXXXXXXX') si se reconoce."""
+    if not url:
+        return None
+    partes = urlsplit(url)
+    host = partes.netloc.lower()
+    objetivo = unquote(partes.path) + ('?' + partes.query if partes.query else '')
+    for patron_host, patron_ruta, prefijo in CLAVES_PRODUCTO:
+        if re.search(patron_host, host):
+            coincidencia = patron_ruta.search(objetivo)
+            if coincidencia:
+                return f"{prefijo}:{coincidencia.group(1).upper()}"
+    # Enlaces de redirección con la URL del comercio embebida en la query
+    for _, valor in parse_qsl(partes.query):
+        if valor.startswith('http'):
+            return extraer_clave_producto(valor)
+    return None
+
+
+def generar_identidad(oferta: 'Deal') -> str:
+    """
+    Identidad estable de una oferta: la clave de producto del comercio si existe
+    o, si no, el enlace normalizado. No depende de precio, imagen ni título.
+    """
+    link = oferta.link or ''
+    base = extraer_clave_producto(link) or normalizar_url(link) or (oferta.titulo or '').lower()
+    return hashlib.sha256(base.encode()).hexdigest()
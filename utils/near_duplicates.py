@@ -0,0 +1,192 @@
+import functools
+import hashlib
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Palabras frecuentes en títulos de ofertas que no ayudan a identificar el producto
+PALABRAS_VACIAS = {
+    'a', 'an', 'and', 'at', 'by', 'for', 'from', 'in', 'of', 'on', 'or', 'the', 'to', 'w', 'with',
+    'free', 'shipping', 'ship', 'deal', 'deals', 'new', 'only', 'off', 'sale', 'save', 'now',
+    'via', 'plus', 'shipped', 'prime', 'members', 'coupon', 'code', 'more',
+}
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+# Precios del título ("$279.99"): cambian entre fuentes y no identifican el producto
+_PRECIO_RE = re.compile(r'\$\s*\d[\d,]*(?:\.\d+)?')
+# Medidas y capacidades ("65\"", "55-Inch", "1 TB", "6-Qt", "2-Pack"), con la unidad normalizada
+_UNIDADES = {
+    '"': 'in', "''": 'in', '”': 'in', 'in': 'in', 'inch': 'in', 'inches': 'in',
+    'tb': 'tb', 'gb': 'gb', 'mb': 'mb', 'qt': 'qt', 'quart': 'qt', 'oz': 'oz', 'lb': 'lb', 'lbs': 'lb',
+    'mah': 'mah', 'w': 'w', 'watt': 'w', 'hz': 'hz', 'mm': 'mm', 'ft': 'ft', 'l': 'l', 'liter': 'l',
+    'pack': 'pack', 'pk': 'pack', 'count': 'pack', 'ct': 'pack', 'pc': 'pc', 'pcs': 'pc', 'piece': 'pc',
+}
+# "in", "w" y "l" solo cuentan pegadas al número ("65in", "20W"): sueltas son palabras ("2 in cart")
+_PEGADAS = ('in', 'w', 'l')
+_MEDIDA_RE = re.compile(
+    r'(\d+(?:\.\d+)?)(?:\s*-?\s*("|\'\'|”|(?:'
+    + '|'.join(sorted((u for u in _UNIDADES if u.isalpha() and u not in _PEGADAS), key=len, reverse=True))
+    + r')\b)|(' + '|'.join(_PEGADAS) + r')\b)'
+)
+# Primo de Mersenne 2^61 - 1 para los hashes universales (a*x + b) mod p
+_PRIMO = (1 << 61) - 1
+
+
+# Separadores de miles ("24,000mAh") y ordinales ("2nd Gen"), que cada fuente escribe a su manera
+_MILES_RE = re.compile(r'(?<=\d),(?=\d{3}(?!\d))')
+_ORDINAL_RE = re.compile(r'\b(\d+)(?:st|nd|rd|th)\b')
+
+# Medidas por unidad ({'in': {'65'}}) y códigos con dígitos (modelos: "1000xm5", "af101")
+Rasgos = Tuple[Dict[str, FrozenSet[str]], FrozenSet[str]]
+
+
+def _numero(valor: str) -> str:
+    return valor.rstrip('0').rstrip('.') if '.' in valor else valor
+
+
+def analizar_titulo(titulo: str) -> Tuple[Set[str], Rasgos]:
+    """
+    Tokens normalizados del título (sin palabras vacías ni precios) y sus rasgos
+    distintivos: las medidas y los códigos de modelo. Cada medida es un único
+    token con su unidad ("65in", "1tb") para que no se confunda con otros números.
+    """
+    medidas: Dict[str, Set[str]] = defaultdict(set)
+
+    def _registrar(coincidencia: re.Match) -> str:
+        medidas[_UNIDADES[coincidencia.group(2) or coincidencia.group(3)]].add(_numero(coincidencia.group(1)))
+        return ' '
+
+    texto = _PRECIO_RE.sub(' ', titulo.lower())
+    texto = _ORDINAL_RE.sub(r'\1', _MILES_RE.sub('', texto))
+    texto = _MEDIDA_RE.sub(_registrar, texto)
+    tokens = {_numero(t) for t in _TOKEN_RE.findall(texto) if t not in PALABRAS_VACIAS}
+    codigos = frozenset(t for t in tokens if any(c.isdigit() for c in t))
+    tokens.update(f"{valor}{unidad}" for unidad, valores in medidas.items() for valor in valores)
+    return tokens, ({unidad: frozenset(valores) for unidad, valores in medidas.items()}, codigos)
+
+
+def tokenizar_titulo(titulo: str) -> Set[str]:
+    """Conjunto de palabras normalizadas del título (ver analizar_titulo)."""
+    return analizar_titulo(titulo)[0]
+
+
+@functools.lru_cache(maxsize=8)
+def _coeficientes(permutaciones: int, semilla: int) -> Tuple[Tuple[int, int], ...]:
+    generador = random.Random(semilla)
+    return tuple((generador.randrange(1, _PRIMO), generador.randrange(0, _PRIMO)) for _ in range(permutaciones))
+
+
+@functools.lru_cache(maxsize=50000)
+def _hashes_token(token: str, permutaciones: int, semilla: int) -> Tuple[int, ...]:
+    """Valor de cada hash universal para un token; los tokens se repiten mucho entre títulos."""
+    x = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little') % _PRIMO
+    return tuple((a * x + b) % _PRIMO for a, b in _coeficientes(permutaciones, semilla))
+
+
+def rasgos_incompatibles(rasgos_a: Rasgos, rasgos_b: Rasgos) -> bool:
+    """
+    Indica si los títulos describen variantes distintas aunque compartan casi
+    todas las palabras: otra medida para la misma unidad (65" frente a 55") o
+    un código de modelo que cada uno tiene y el otro no (XM5 frente a XM4).
+    """
+    (medidas_a, codigos_a), (medidas_b, codigos_b) = rasgos_a, rasgos_b
+    if any(unidad in medidas_b and not valores & medidas_b[unidad] for unidad, valores in medidas_a.items()):
+        return True
+    return bool(codigos_a - codigos_b) and bool(codigos_b - codigos_a)
+
+
+class NearDuplicateIndex:
+    """
+    Índice MinHash + LSH por bandas sobre títulos de ofertas. Solo compara
+    contra los candidatos que comparten alguna banda, sin comparar por pares,
+    y confirma con la similitud de Jaccard estimada por las firmas. Dos títulos
+    con medidas o códigos de modelo distintos nunca se consideran duplicados.
+    """
+
+    def __init__(self, permutaciones: int = 128, bandas: int = 32, umbral: float = 0.6,
+                 ttl_segundos: Optional[int] = None, semilla: int = 0):
+        if permutaciones % bandas:
+            raise ValueError("El número de permutaciones debe ser múltiplo del número de bandas.")
+        self.permutaciones = permutaciones
+        self.bandas = bandas
+        self.filas_por_banda = permutaciones // bandas
+        self.umbral = umbral
+        self.ttl_segundos = ttl_segundos
+        # Hashes universales independientes (a*x + b) mod p; la semilla fija hace que
+        # las firmas de índices distintos sean comparables entre sí
+        self.semilla = semilla
+        self._cubetas: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._entradas: Dict[str, Tuple[Tuple[int, ...], str, float, Rasgos]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def firma(self, titulo: str) -> Optional[Tuple[int, ...]]:
+        tokens = tokenizar_titulo(titulo)
+        if not tokens:
+            return None
+        return tuple(map(min, zip(*(_hashes_token(t, self.permutaciones, self.semilla) for t in tokens))))
+
+    def _bandas(self, firma: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        r = self.filas_por_banda
+        for i in range(self.bandas):
+            yield i, firma[i * r:(i + 1) * r]
+
+    def similitud(self, firma_a: Tuple[int, ...], firma_b: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(firma_a, firma_b) if x == y) / self.permutaciones
+
+    def buscar(self, titulo: str, fuente: Optional[str] = None,
+               firma: Optional[Tuple[int, ...]] = None) -> Optional[str]:
+        """
+        Devuelve la clave de una entrada casi duplicada de otra fuente, o None.
+        Si no se indica fuente, se consideran todas las entradas.
+        """
+        firma = firma or self.firma(titulo)
+        if firma is None:
+            return None
+        candidatos: Set[str] = set()
+        for banda in self._bandas(firma):
+            candidatos.update(self._cubetas.get(banda, ()))
+        rasgos = None
+        for clave in candidatos:
+            firma_candidato, fuente_candidato, _, rasgos_candidato = self._entradas[clave]
+            if fuente is not None and fuente_candidato == fuente:
+                continue
+            if self.similitud(firma, firma_candidato) < self.umbral:
+                continue
+            rasgos = analizar_titulo(titulo)[1] if rasgos is None else rasgos
+            if not rasgos_incompatibles(rasgos, rasgos_candidato):
+                return clave
+        return None
+
+    def agregar(self, clave: str, titulo: str, fuente: str, timestamp: Optional[float] = None,
+                firma: Optional[Tuple[int, ...]] = None) -> None:
+        firma = firma or self.firma(titulo)
+        if firma is None or clave in self._entradas:
+            return
+        self._entradas[clave] = (
+            firma, fuente, timestamp if timestamp is not None else time.time(), analizar_titulo(titulo)[1]
+        )
+        for banda in self._bandas(firma):
+            self._cubetas[banda].add(clave)
+
+    def eliminar(self, clave: str) -> None:
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        for banda in self._bandas(entrada[0]):
+            cubeta = self._cubetas.get(banda)
+            if cubeta is not None:
+                cubeta.discard(clave)
+                if not cubeta:
+                    del self._cubetas[banda]
+
+    def purgar_expirados(self) -> int:
+        if self.ttl_segundos is None:
+            return 0
+        limite = time.time() - self.ttl_segundos
+        expiradas: List[str] = [clave for clave, (_, _, ts, _) in self._entradas.items() if ts < limite]
+        for clave in expiradas:
+            self.eliminar(clave)
+        return len(expiradas)
@@ -0,0 +1,38 @@
+import re
+from typing import Optional
+
+# "$19.99", "$ 1,299.00", "From $5", "2 for $10" (se toma el primer importe). Los miles van
+# en grupos exactos de 3 cifras: "$1,2345" no es un importe
+_PRECIO_RE = re.compile(r'\$\s*(\d{1,3}(?:,\d{3})*|\d+)(?:\.(\d{1,2}))?(?!,?\d)')
+_NUMERO_RE = re.compile(r'(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?')
+_PORCENTAJE_RE = re.compile(r'(?<![\d.])(\d{1,3}(?:\.\d+)?)\s*%\s*off', re.IGNORECASE)
+_GRATIS_RE = re.compile(r'^\s*(free|gratis)\b(?!\s+(shipping|envío))', re.IGNORECASE)
+
+
+def parsear_precio(texto: Optional[str]) -> Optional[int]:
+    """Convierte un precio en texto a centavos; None si no contiene un importe."""
+    if not texto:
+        return None
+    if _GRATIS_RE.match(texto):
+        return 0
+    coincidencia = _PRECIO_RE.search(texto) or _NUMERO_RE.fullmatch(texto.strip())
+    if not coincidencia:
+        return None
+    enteros = int(coincidencia.group(1).replace(',', ''))
+    centavos = int((coincidencia.group(2) or '0').ljust(2, '0'))
+    return enteros * 100 + centavos
+
+
+def calcular_descuento(precio: Optional[int], precio_original: Optional[int],
+                       texto: Optional[str] = None) -> Optional[float]:
+    """
+    Porcentaje de descuento a partir de los precios en centavos o, si faltan,
+    de un "NN% off" en el texto del precio. None si no se puede determinar.
+    """
+    if precio is not None and precio_original and precio_original > precio:
+        return round((1 - precio / precio_original) * 100, 1)
+    if texto:
+        coincidencia = _PORCENTAJE_RE.search(texto)
+        if coincidencia:
+            return min(float(coincidencia.group(1)), 100.0)
+    return None